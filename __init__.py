@@ -1,2 +1,21 @@
 from client import *
 from exceptions import *
+from pool import *
+from multi import *
+from async_client import *
+from ratelimit import *
+from retry import *
+from streaming import *
+from bulk import *
+from cache import *
+from coalesce import *
+from uploads import *
+from replica import *
+from resources import *
+from codec import *
+from records import *
+from timing import *
+from metrics import *
+from hooks import *
+from transport import *
+from replay import *
@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+
+"""
+iContact API Asynchronous Client
+================================
+Non-blocking client for iContact API
+"""
+
+from client import IContactClient
+from multi import CurlMultiRunner, Transfer
+from transport import CurlTransport
+
+
+__all__ = ['AsyncIContactClient', 'IContactFuture']
+
+class IContactFuture(object):
+    """
+    Result of an API call executed by L{AsyncIContactClient}
+    """
+
+    def __init__(self, client):
+        self._client = client
+        self._done = False
+        self._result = None
+        self._exception = None
+        self._callbacks = []
+
+        # Metadata of the call (L{RequestMeta}), set when the call has been performed
+        self.meta = None
+
+    def done(self):
+        """Returns True if the call has been completed"""
+        return self._done
+
+    def result(self):
+        """Returns call response. Waits for the call to complete, if needed.
+
+        @raise IContactException: Raises exception raised by the call.
+
+        @rtype: dict or list
+        @return: Call response
+        """
+        self._wait()
+
+        if self._exception != None:
+            raise self._exception
+
+        return self._result
+
+    def exception(self):
+        """Returns exception raised by the call. Waits for the call to complete, if needed.
+
+        @rtype: L{IContactException}
+        @return: Raised exception, or None if the call has succeeded
+        """
+        self._wait()
+
+        return self._exception
+
+    def add_done_callback(self, callback):
+        """Adds function called with the future as its only argument when the call completes.
+        If the call has already been completed, the function is called immediately.
+
+        @type callback: callable
+        @keyword callback: Callback function
+        """
+        if self._done:
+            callback(self)
+        else:
+            self._callbacks.append(callback)
+
+    def _wait(self):
+        """Runs client transfers until the call is completed"""
+        while not self._done:
+            self._client.poll(timeout=1.0)
+
+    def _set_result(self, result):
+        """Completes the future with call response, or raised exception"""
+        if isinstance(result, Exception):
+            self._exception = result
+        else:
+            self._result = result
+        self._done = True
+
+        callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            callback(self)
+
+class AsyncIContactClient(IContactClient):
+    """
+    iContact API Asynchronous Client
+    ================================
+    Client for iContact API, which doesn't block on network I/O or retries.
+
+    Methods get(), post(), put() and delete() return L{IContactFuture} immediately.
+    Calls are performed concurrently (using cURL multi interface) whenever the client
+    is polled, or a result of one of the futures is requested. Retries of "503 Service
+    Unavailable" responses, and calls waiting for the rate limiter, are scheduled
+    without sleeping.
+
+    The client is not thread-safe. It is meant to be driven by a single thread,
+    e.g. by a select() based event loop using L{AsyncIContactClient.fdset}.
+    """
+
+    def __init__(self, user_name=None, app_id=None, app_password=None, version='2.2',
+                 base_url=None, account_id=None, clientfolder_id=None, pool=None,
+                 rate_limiter=None, max_concurrency=10, retry_policy=None, cache=None, codec=None,
+                 metrics=None, connect_timeout=10, timeout=None, stall_timeout=60):
+        """Initialize client
+
+        See L{IContactClient.__init__} for the description of parameters.
+
+        @type max_concurrency: int
+        @keyword max_concurrency: (optional) Maximum number of calls in flight. Default is 10.
+        """
+        super(AsyncIContactClient, self).__init__(user_name, app_id, app_password, version,
+                base_url, account_id, clientfolder_id, pool, rate_limiter, retry_policy, cache,
+                codec=codec, metrics=metrics, transport=CurlTransport(pool),
+                connect_timeout=connect_timeout, timeout=timeout, stall_timeout=stall_timeout)
+
+        self._runner = CurlMultiRunner(max_concurrency)
+
+    def pending(self):
+        """Returns number of calls which haven't been completed yet"""
+        return len(self._runner)
+
+    def poll(self, timeout=0):
+        """Performs pending calls until at least one of them completes, or until timeout.
+        Futures of the completed calls are resolved from this method.
+
+        @type timeout: int or float
+        @keyword timeout: (optional) Maximum number of seconds to wait for network activity.
+                          Default is 0, i.e. doesn't wait.
+
+        @rtype: int
+        @return: Number of pending calls
+        """
+        return self._runner.perform(timeout)
+
+    def wait(self, futures=None):
+        """Waits for calls to complete
+
+        @type futures: list
+        @keyword futures: (optional) List of L{IContactFuture} to wait for. By default waits
+                          for all pending calls.
+
+        @rtype: list
+        @return: Given list of futures, all of them completed
+        """
+        if futures == None:
+            while self._runner.perform():
+                pass
+            return []
+
+        for future in futures:
+            future._wait()
+
+        return futures
+
+    def fdset(self):
+        """Returns file descriptors of the calls in flight, for use with select() based event loops.
+        L{AsyncIContactClient.poll} should be called when any of them is ready.
+
+        @rtype: tuple
+        @return: (read, write, exceptional) lists of file descriptors
+        """
+        return self._runner.fdset()
+
+    def close(self):
+        """Aborts pending calls and releases cURL multi handle, see also L{IContactClient.close}"""
+        self._runner.close()
+        super(AsyncIContactClient, self).close()
+
+    def _request(self, http_method, resource, resource_ids=None, params=dict(), verbose=False, timeout=None,
+                 deadline=None):
+        """Schedules API call
+
+        See L{IContactClient._request} for the description of parameters.
+
+        @rtype: L{IContactFuture}
+        @return: Future of the call response
+        """
+        future = IContactFuture(self)
+        transfer = Transfer(http_method, resource, resource_ids, params, timeout, deadline)
+
+        def callback(result):
+            future.meta = transfer.meta
+            future._set_result(result)
+
+        self._start_transfer(self._runner, transfer, verbose, callback)
+
+        return future
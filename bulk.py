@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+
+"""
+iContact API Client Bulk Operations
+===================================
+Chunked bulk writes of contacts and subscriptions
+"""
+
+import itertools
+
+from exceptions import IContactException
+
+
+__all__ = ['BulkResult']
+
+# Number of contacts (or subscriptions) sent in one call by default
+DEFAULT_CHUNK_SIZE = 1000
+
+class BulkResult(object):
+    """
+    Result of a single input row of a bulk operation
+    """
+
+    def __init__(self, index, row, item=None, error=None):
+        """Initialize result
+
+        @type index: int
+        @keyword index: Index of the row in the input
+
+        @type row: dict
+        @keyword row: Input row
+
+        @type item: dict
+        @keyword item: (optional) Item returned by the API for the row (e.g. contact)
+
+        @type error: L{IContactException} or str
+        @keyword error: (optional) Reason why the row has failed
+        """
+        self.index = index
+        self.row = row
+        self.item = item
+        self.error = error
+
+    @property
+    def succeeded(self):
+        """True if the row has been written"""
+        return (self.item != None) and (self.error == None)
+
+    @property
+    def contact_id(self):
+        """Contact ID of the row, or None"""
+        if self.item == None:
+            return None
+        return self.item.get('contactId')
+
+    def __repr__(self):
+        if self.succeeded:
+            return '<BulkResult %d: %r>' % (self.index, self.item)
+        return '<BulkResult %d: error %r>' % (self.index, self.error)
+
+def chunks(iterable, chunk_size):
+    """Splits iterable into lists of at most chunk_size items
+
+    @rtype: generator
+    @return: Lists of items
+    """
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+def upsert_contacts(client, contacts, chunk_size=DEFAULT_CHUNK_SIZE, concurrency=1, verbose=False):
+    """Adds or updates contacts in chunks. See L{IContactClient.upsert_contacts}."""
+    return _post_chunks(client, 'contacts', 'contact', enumerate(contacts), _contact_key,
+                        chunk_size, concurrency, verbose)
+
+def subscribe(client, subscriptions=None, contact_ids=None, list_ids=None, status='normal',
+              chunk_size=DEFAULT_CHUNK_SIZE, concurrency=4, verbose=False):
+    """Creates subscriptions in chunks. See L{IContactClient.subscribe}."""
+    if subscriptions == None:
+        subscriptions = ((contact_id, list_id, status)
+                         for contact_id in contact_ids for list_id in list_ids)
+
+    return _post_chunks(client, 'subscriptions', 'subscription', _unique_subscriptions(subscriptions, status),
+                        _subscription_key, chunk_size, concurrency, verbose)
+
+def _unique_subscriptions(subscriptions, status):
+    """Converts subscription tuples to rows, skipping repeated (contact ID, list ID) pairs
+
+    @rtype: generator
+    @return: (index, row) tuples
+    """
+    seen = set()
+    index = 0
+
+    for subscription in subscriptions:
+        row = {
+            'contactId': unicode(subscription[0]),
+            'listId': unicode(subscription[1]),
+            'status': subscription[2] if (len(subscription) > 2) else status,
+        }
+
+        key = _subscription_key(row)
+        if key in seen:
+            continue
+        seen.add(key)
+
+        yield index, row
+        index += 1
+
+def _post_chunks(client, resource, param, indexed_rows, key_function, chunk_size, concurrency, verbose):
+    """Posts rows in chunks and maps returned items back to the rows
+
+    @type client: L{IContactClient}
+    @keyword client: Client executing the calls
+
+    @type resource: str
+    @keyword resource: iContact API resource name
+
+    @type param: str
+    @keyword param: Name of the parameter holding the rows
+
+    @type indexed_rows: iterable
+    @keyword indexed_rows: (index, row) tuples
+
+    @type key_function: callable
+    @keyword key_function: Function returning key identifying a row or a returned item
+
+    @rtype: list
+    @return: List of L{BulkResult}
+    """
+    results = []
+
+    # Chunks are read from the input lazily, concurrency chunks at a time
+    for window in chunks(chunks(indexed_rows, chunk_size), concurrency):
+        requests = [('POST', resource, None, {param: [row for (index, row) in chunk]})
+                    for chunk in window]
+        responses = client.batch(requests, max_connections=concurrency, verbose=verbose)
+
+        for chunk, response in zip(window, responses):
+            results.extend(_match_items(chunk, response, resource, key_function))
+
+    return results
+
+def _match_items(chunk, response, collection_key, key_function):
+    """Maps items returned for a chunk to the input rows
+
+    @type chunk: list
+    @keyword chunk: List of (index, row) tuples
+
+    @type response: dict or L{IContactException}
+    @keyword response: Call response
+
+    @type collection_key: str
+    @keyword collection_key: Key of the returned items in the response
+
+    @type key_function: callable
+    @keyword key_function: Function returning key identifying a row or a returned item
+
+    @rtype: list
+    @return: List of L{BulkResult}
+    """
+    if isinstance(response, IContactException):
+        return [BulkResult(index, row, error=response) for (index, row) in chunk]
+
+    items_by_key = dict()
+    for item in response.get(collection_key) or []:
+        key = key_function(item)
+        if key:
+            items_by_key[key] = item
+
+    warnings = response.get('warnings') or []
+    if warnings:
+        error = u"Item not returned. Warnings: %s" % u'; '.join(unicode(w) for w in warnings)
+    else:
+        error = u"Item not returned"
+
+    results = []
+    for (index, row) in chunk:
+        item = items_by_key.get(key_function(row))
+        if item != None:
+            results.append(BulkResult(index, row, item))
+        else:
+            results.append(BulkResult(index, row, error=error))
+
+    return results
+
+def _contact_key(contact):
+    """Contacts are identified by their email addresses"""
+    return (contact.get('email') or '').lower()
+
+def _subscription_key(subscription):
+    """Subscriptions are identified by (contact ID, list ID) pairs"""
+    return (unicode(subscription.get('contactId')), unicode(subscription.get('listId')))
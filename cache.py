@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+
+"""
+iContact API Client Response Cache
+==================================
+TTL/LRU cache of GET call responses
+"""
+
+import collections
+import copy
+import threading
+import time
+try:
+    import json
+except ImportError:
+    import simplejson as json
+
+
+__all__ = ['ResponseCache']
+
+# Time to live of cached responses of slow-changing resources, in seconds
+DEFAULT_TTLS = {
+    'accounts': 300,
+    'client-folders': 300,
+    'customfields': 300,
+    'lists': 300,
+    'time': 0,
+}
+
+class ResponseCache(object):
+    """
+    Response Cache
+    ==============
+    Cache of GET call responses, keyed by resource URL and query parameters.
+    Entries expire after the time to live of their resource, and the least recently
+    used entries are evicted when the cache is full. All entries of a resource are
+    invalidated when the client issues a POST, PUT or DELETE call on the resource.
+
+    Cached responses are copied when stored and returned, so callers can modify them.
+    A cache is thread-safe and can be shared between several clients of the same
+    iContact account.
+    """
+
+    def __init__(self, max_entries=1000, ttl=0, ttls=None):
+        """Initialize cache
+
+        @type max_entries: int
+        @keyword max_entries: (optional) Maximum number of cached responses. Default is 1000.
+
+        @type ttl: int or float
+        @keyword ttl: (optional) Time to live in seconds for resources without their own
+                      time to live. 0 disables caching of such resources. Default is 0.
+
+        @type ttls: dict
+        @keyword ttls: (optional) Time to live in seconds by resource name. By default
+                       responses of accounts, client-folders, customfields and lists
+                       resources are cached for 5 minutes.
+        """
+        self._max_entries = max_entries
+        self._ttl = ttl
+        if ttls != None:
+            self._ttls = ttls
+        else:
+            self._ttls = DEFAULT_TTLS
+
+        # Cached entries as key: (resource, expiration time, response), least recently used first
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'evictions': 0,
+            'invalidations': 0,
+        }
+
+    def get_ttl(self, resource):
+        """Returns time to live of resource responses in seconds, 0 if they aren't cached"""
+        return self._ttls.get(resource, self._ttl)
+
+    def make_key(self, url, params):
+        """Returns cache key of a call
+
+        @type url: str
+        @keyword url: Resource URL
+
+        @type params: dict
+        @keyword params: Query parameters
+
+        @rtype: tuple
+        @return: Cache key
+        """
+        return (url, json.dumps(params or {}, sort_keys=True))
+
+    def get(self, key):
+        """Returns cached response
+
+        @type key: tuple
+        @keyword key: Cache key, see L{ResponseCache.make_key}
+
+        @rtype: dict or list
+        @return: Copy of the cached response, or None if there is no valid entry
+        """
+        with self._lock:
+            entry = self._entries.pop(key, None)
+
+            if (entry == None) or (entry[1] <= time.time()):
+                self._stats['misses'] += 1
+                return None
+
+            # Mark as the most recently used
+            self._entries[key] = entry
+            self._stats['hits'] += 1
+
+        return copy.deepcopy(entry[2])
+
+    def set(self, resource, key, response):
+        """Stores response, if the resource is cached
+
+        @type resource: str
+        @keyword resource: iContact API resource name
+
+        @type key: tuple
+        @keyword key: Cache key, see L{ResponseCache.make_key}
+
+        @type response: dict or list
+        @keyword response: Call response
+        """
+        ttl = self.get_ttl(resource)
+        if not ttl:
+            return
+
+        entry = (resource, time.time() + ttl, copy.deepcopy(response))
+
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = entry
+
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def invalidate(self, resource):
+        """Removes all cached responses of a resource
+
+        @type resource: str
+        @keyword resource: iContact API resource name
+        """
+        with self._lock:
+            for key, entry in self._entries.items():
+                if entry[0] == resource:
+                    del self._entries[key]
+                    self._stats['invalidations'] += 1
+
+    def clear(self):
+        """Removes all cached responses"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Returns cache statistics
+
+        @rtype: dict
+        @return: Dictionary with keys:
+                 - size : number of cached responses
+                 - hits : number of responses returned from the cache
+                 - misses : number of lookups without a valid entry
+                 - evictions : number of least recently used entries evicted
+                 - invalidations : number of entries removed by writes
+        """
+        with self._lock:
+            stats = self._stats.copy()
+            stats['size'] = len(self._entries)
+
+        return stats
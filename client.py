@@ -1,16 +1,29 @@
 # -*- coding: utf-8 -*-
 
+import functools
 import logging
+import threading
 import time
-import StringIO
-import urllib
-import pycurl
-try:
-    import json
-except ImportError:
-    import simplejson as json
 
 from exceptions import *
+from multi import CurlMultiRunner, Transfer
+from ratelimit import RateLimiter
+from retry import RetryPolicy
+from cache import ResponseCache
+from coalesce import SingleFlight
+from resources import RESOURCES
+from codec import get_codec
+from records import RecordFactory
+from timing import RequestMeta
+from metrics import cache_samples, quota_samples, connection_samples
+from hooks import BEFORE_REQUEST, AFTER_RESPONSE, ON_ERROR, ON_RETRY, EVENTS, SlowCallLog
+from streaming import JSONArrayStream
+from transport import HTTPRequest, CurlTransport, get_transport, prepare_curl, set_curl_timeouts, curl_error
+from lazy import LazyModule
+import bulk
+import uploads
+
+urllib = LazyModule('urllib')
 
 
 __all__ = ['IContactClient']
@@ -23,7 +36,9 @@ class IContactClient(object):
     """
 
     def __init__(self, user_name=None, app_id=None, app_password=None, version='2.2',
-                 base_url=None, account_id=None, clientfolder_id=None):
+                 base_url=None, account_id=None, clientfolder_id=None, pool=None,
+                 rate_limiter=None, retry_policy=None, cache=None, single_flight=None, codec=None,
+                 metrics=None, transport=None, connect_timeout=10, timeout=None, stall_timeout=60):
         """Initialize client
 
         @type user_name: str
@@ -48,6 +63,62 @@ class IContactClient(object):
 
         @type clientfolder_id: str
         @keyword clientfolder_id: iContact account client folder ID
+
+        @type pool: L{CurlPool}
+        @keyword pool: (optional) Pool of cURL handles used for the requests, if transport isn't
+                       given. A pool can be shared between several clients. By default each
+                       client creates its own pool.
+
+        @type rate_limiter: L{RateLimiter}
+        @keyword rate_limiter: (optional) Rate limiter pacing the requests. It should be shared
+                               between all clients of the same iContact account.
+                               By default requests are not paced.
+
+        @type retry_policy: L{RetryPolicy}
+        @keyword retry_policy: (optional) Policy deciding which failed requests are retried,
+                               and when. By default each client has its own L{RetryPolicy}
+                               with default settings.
+
+        @type cache: L{ResponseCache}
+        @keyword cache: (optional) Cache of GET call responses. A cache can be shared between
+                        several clients of the same iContact account.
+                        By default responses are not cached.
+
+        @type single_flight: L{SingleFlight}
+        @keyword single_flight: (optional) Coalescer of identical GET calls made concurrently
+                                by several threads. It can be shared between several clients.
+                                By default every call is performed.
+
+        @type codec: L{JSONCodec}
+        @keyword codec: (optional) JSON codec encoding request bodies and decoding responses.
+                        By default the fastest installed JSON library is used, see L{get_codec}.
+
+        @type metrics: L{MetricsRegistry}
+        @keyword metrics: (optional) Registry aggregating request counts, latencies, errors,
+                          retries, cache and quota statistics of the client. It can be shared
+                          between several clients, L{IContactClient.close} removes the client
+                          from it. By default metrics are not collected.
+
+        @type transport: L{Transport}
+        @keyword transport: (optional) Transport performing the requests, e.g. L{HTTPLibTransport},
+                            L{RecordingTransport} or L{ReplayTransport}. By default a L{CurlTransport}
+                            using the pool is created if pycurl is installed, otherwise
+                            a L{HTTPLibTransport}. See L{get_transport}.
+
+        @type connect_timeout: float
+        @keyword connect_timeout: (optional) Maximum number of seconds of establishing a connection.
+                                  None for no limit. Default is 10.
+
+        @type timeout: float
+        @keyword timeout: (optional) Maximum number of seconds of every request, from its start
+                          until the response has been received. Each retry gets the full timeout,
+                          a budget of the whole call can be given with deadline argument of the calls.
+                          None for no limit. Default is None.
+
+        @type stall_timeout: float
+        @keyword stall_timeout: (optional) Number of seconds without any data being sent or received,
+                                after which a request is aborted (e.g. on a stalled connection).
+                                None for no limit. Default is 60.
         """
 
         self._request_headers = dict()
@@ -69,7 +140,198 @@ class IContactClient(object):
         self._account_id = str(account_id)
         self._clientfolder_id = str(clientfolder_id)
 
-    def get(self, resource, resource_ids=None, params=dict(), verbose=False):
+        # Routes of the registered resources are compiled once
+        self._routes = dict()
+        for resource in RESOURCES.values():
+            self.register_resource(resource)
+
+        if transport != None:
+            self._transport = transport
+        elif pool != None:
+            self._transport = CurlTransport(pool)
+        else:
+            self._transport = get_transport()
+
+        # cURL handles of the transport, used by concurrent and streamed calls
+        self._pool = self._transport.pool
+
+        self._connect_timeout = connect_timeout
+        self._timeout = timeout
+        self._stall_timeout = stall_timeout
+
+        self._rate_limiter = rate_limiter
+
+        if retry_policy != None:
+            self._retry_policy = retry_policy
+        else:
+            self._retry_policy = RetryPolicy()
+
+        self._cache = cache
+        self._single_flight = single_flight
+
+        if codec != None:
+            self._codec = codec
+        else:
+            self._codec = get_codec()
+
+        # Metadata of the last call of each thread, and functions called with metadata of every call
+        self._local = threading.local()
+        self._meta_listeners = []
+
+        # Hook functions by event
+        self._hooks = dict((event, []) for event in EVENTS)
+
+        self._metrics = metrics
+        self._metrics_collectors = []
+        if metrics != None:
+            self.add_meta_listener(metrics.record_meta)
+
+            # Collectors hold the reported objects, not the client
+            if cache != None:
+                self._metrics_collectors.append((cache, functools.partial(cache_samples, cache)))
+            if rate_limiter != None:
+                self._metrics_collectors.append((rate_limiter,
+                                                 functools.partial(quota_samples, rate_limiter)))
+
+            # Transports sharing a pool of cURL handles report the same connections
+            transport_key = self._pool if (self._pool != None) else self._transport
+            self._metrics_collectors.append((transport_key, functools.partial(connection_samples,
+                                                                              self._transport)))
+
+            for (key, collector) in self._metrics_collectors:
+                metrics.add_collector(collector, key)
+
+    def close(self):
+        """Removes collectors of the client from its metrics registry, and closes idle
+        connections of its transport"""
+        if self._metrics != None:
+            for (key, collector) in self._metrics_collectors:
+                self._metrics.remove_collector(key)
+            self._metrics_collectors = []
+
+        self._transport.close()
+
+    def register_resource(self, resource):
+        """Registers API resource for this client, or replaces a registered one.
+        See also L{register_resource} for registering resources for all new clients.
+
+        Example: client.register_resource(Resource('tags', '/a/{account}/c/{folder}/tags/%s',
+                                                   'tags', 'tag'))
+
+        @type resource: L{Resource}
+        @keyword resource: Resource description
+        """
+        self._routes[resource.name] = resource.compile(self._api_base_url, self._account_id,
+                                                       self._clientfolder_id)
+
+    def pool_stats(self):
+        """Returns connection pool size and reuse statistics of the transport
+
+        @rtype: dict
+        @return: See L{CurlPool.stats}
+        """
+        return self._transport.stats()
+
+    def rate_limit_remaining(self):
+        """Returns how much of each rate limit is left
+
+        @rtype: dict
+        @return: See L{RateLimiter.remaining}, or None if requests are not paced
+        """
+        if self._rate_limiter == None:
+            return None
+
+        return self._rate_limiter.remaining()
+
+    def cache_stats(self):
+        """Returns response cache size and hit/miss statistics
+
+        @rtype: dict
+        @return: See L{ResponseCache.stats}, or None if responses are not cached
+        """
+        if self._cache == None:
+            return None
+
+        return self._cache.stats()
+
+    def last_meta(self):
+        """Returns metadata (timings, sizes, retries) of the last call completed by the current thread
+
+        @rtype: L{RequestMeta}
+        @return: Call metadata, or None if the thread hasn't completed any call
+        """
+        return getattr(self._local, 'last_meta', None)
+
+    def add_meta_listener(self, listener):
+        """Adds function called with L{RequestMeta} of every completed call, e.g. for
+        logging or exporting latencies. Exceptions raised by the function are logged.
+
+        @type listener: callable
+        @keyword listener: Listener function
+        """
+        self._meta_listeners.append(listener)
+
+    def remove_meta_listener(self, listener):
+        """Removes function added with L{IContactClient.add_meta_listener}
+
+        @type listener: callable
+        @keyword listener: Listener function
+        """
+        self._meta_listeners.remove(listener)
+
+    def add_hook(self, event, hook):
+        """Adds function called on a request lifecycle event, e.g. for tracing or profiling.
+        Hooks are called with the L{RequestMeta} of the call (method, resource, URL,
+        attempt number, timings and sizes), on_retry hooks also with the delay before
+        the retry. Exceptions raised by hooks are logged.
+
+        Events:
+         - before_request : before every attempt
+         - after_response : after the call has succeeded
+         - on_error : after the call has failed, meta.error is the raised exception
+         - on_retry : after a failed attempt which is going to be retried
+
+        @type event: str
+        @keyword event: Event name, see constants in L{hooks} module
+
+        @type hook: callable
+        @keyword hook: Hook function
+        """
+        if event not in self._hooks:
+            raise ValueError("Unknown hook event: %s" % event)
+
+        self._hooks[event].append(hook)
+
+    def remove_hook(self, event, hook):
+        """Removes function added with L{IContactClient.add_hook}
+
+        @type event: str
+        @keyword event: Event name
+
+        @type hook: callable
+        @keyword hook: Hook function
+        """
+        self._hooks[event].remove(hook)
+
+    def log_slow_calls(self, threshold=1.0, logger=None):
+        """Logs a warning with timings breakdown for every call taking longer than threshold
+
+        @type threshold: float
+        @keyword threshold: (optional) Minimum call duration logged, in seconds. Default is 1.0.
+
+        @type logger: logging.Logger
+        @keyword logger: (optional) Logger. Default is the root logger.
+
+        @rtype: L{SlowCallLog}
+        @return: Added hook, it can be removed for after_response and on_error events
+        """
+        hook = SlowCallLog(threshold, logger)
+        self.add_hook(AFTER_RESPONSE, hook)
+        self.add_hook(ON_ERROR, hook)
+
+        return hook
+
+    def get(self, resource, resource_ids=None, params=dict(), verbose=False, timeout=None, deadline=None):
         """Executes API call using HTTP GET method
 
         @type resource: str
@@ -89,12 +351,22 @@ class IContactClient(object):
                           - False : cURL verbose mode is disabled
                           Default is False.
 
+        @type timeout: float
+        @keyword timeout: (optional) Maximum number of seconds of every request of the call.
+                          Default is the timeout of the client.
+
+        @type deadline: float
+        @keyword deadline: (optional) Maximum number of seconds of the whole call, including
+                           rate limit waits, retries and backoff sleeps. L{DeadlineExceeded}
+                           is raised as soon as the call can't be completed in time.
+                           By default there is no limit.
+
         @rtype: dict or list
         @return: Call response
         """
-        return self._request('GET', resource, resource_ids, params, verbose)
+        return self._request('GET', resource, resource_ids, params, verbose, timeout, deadline)
 
-    def post(self, resource, resource_ids=None, params=dict(), verbose=False):
+    def post(self, resource, resource_ids=None, params=dict(), verbose=False, timeout=None, deadline=None):
         """Executes API call using HTTP POST method
 
         @type resource: str
@@ -114,12 +386,22 @@ class IContactClient(object):
                           - False : cURL verbose mode is disabled
                           Default is False.
 
+        @type timeout: float
+        @keyword timeout: (optional) Maximum number of seconds of every request of the call.
+                          Default is the timeout of the client.
+
+        @type deadline: float
+        @keyword deadline: (optional) Maximum number of seconds of the whole call, including
+                           rate limit waits, retries and backoff sleeps. L{DeadlineExceeded}
+                           is raised as soon as the call can't be completed in time.
+                           By default there is no limit.
+
         @rtype: dict or list
         @return: Call response
         """
-        return self._request('POST', resource, resource_ids, params, verbose)
+        return self._request('POST', resource, resource_ids, params, verbose, timeout, deadline)
 
-    def put(self, resource, resource_ids=None, params=dict(), verbose=False):
+    def put(self, resource, resource_ids=None, params=dict(), verbose=False, timeout=None, deadline=None):
         """Executes API call using HTTP PUT method
 
         @type resource: str
@@ -139,12 +421,22 @@ class IContactClient(object):
                           - False : cURL verbose mode is disabled
                           Default is False.
 
+        @type timeout: float
+        @keyword timeout: (optional) Maximum number of seconds of every request of the call.
+                          Default is the timeout of the client.
+
+        @type deadline: float
+        @keyword deadline: (optional) Maximum number of seconds of the whole call, including
+                           rate limit waits, retries and backoff sleeps. L{DeadlineExceeded}
+                           is raised as soon as the call can't be completed in time.
+                           By default there is no limit.
+
         @rtype: dict or list
         @return: Call response
         """
-        return self._request('PUT', resource, resource_ids, params, verbose)
+        return self._request('PUT', resource, resource_ids, params, verbose, timeout, deadline)
 
-    def delete(self, resource, resource_ids=None, params=dict(), verbose=False):
+    def delete(self, resource, resource_ids=None, params=dict(), verbose=False, timeout=None, deadline=None):
         """Executes API call using HTTP DELETE method
 
         @type resource: str
@@ -164,12 +456,526 @@ class IContactClient(object):
                           - False : cURL verbose mode is disabled
                           Default is False.
 
+        @type timeout: float
+        @keyword timeout: (optional) Maximum number of seconds of every request of the call.
+                          Default is the timeout of the client.
+
+        @type deadline: float
+        @keyword deadline: (optional) Maximum number of seconds of the whole call, including
+                           rate limit waits, retries and backoff sleeps. L{DeadlineExceeded}
+                           is raised as soon as the call can't be completed in time.
+                           By default there is no limit.
+
         @rtype: dict or list
         @return: Call response
         """
-        return self._request('DELETE', resource, resource_ids, params, verbose)
+        return self._request('DELETE', resource, resource_ids, params, verbose, timeout, deadline)
+
+    def batch(self, requests, max_connections=10, verbose=False):
+        """Executes a number of API calls concurrently
+
+        @type requests: list
+        @keyword requests: List of API calls. Each call is a tuple
+                           (http_method, resource[, resource_ids[, params[, timeout[, deadline]]]]),
+                           where the items have the same meaning as parameters of
+                           L{IContactClient._request}.
+
+        @type max_connections: int
+        @keyword max_connections: (optional) Maximum number of calls in flight. Default is 10.
+
+        @type verbose: bool
+        @keyword verbose: (optional) Specifies if cURL verbose mode should be used.
+                          Default is False.
+
+        @rtype: list
+        @return: List of call responses in the order of requests. If a call fails,
+                 its response is the raised L{IContactException}.
+        """
+        transfers = [Transfer(*request) for request in requests]
+
+        if not self._transport.multi:
+            # Calls are performed one by one by transports without cURL handles
+            return [self._try_request(transfer, verbose) for transfer in transfers]
+
+        results = [None] * len(transfers)
+
+        runner = CurlMultiRunner(max_connections)
+
+        try:
+            for (index, transfer) in enumerate(transfers):
+                self._start_transfer(runner, transfer, verbose,
+                                     functools.partial(results.__setitem__, index))
+            runner.run()
+        finally:
+            runner.close()
+
+        return results
+
+    def map(self, http_method, resource, resource_ids_list, params=dict(), max_connections=10,
+            verbose=False):
+        """Executes the same API call for a number of resource IDs concurrently
+
+        Example: client.map('GET', 'contacts', contact_ids)
+
+        @type http_method: str
+        @keyword http_method: HTTP method. One of: GET, POST, PUT or DELETE
+
+        @type resource: str
+        @keyword resource: iContact API resource name. See L{IContactClient._request} method
+                           for the list of available resources.
+
+        @type resource_ids_list: list
+        @keyword resource_ids_list: List of resource IDs. Each item is either a resource ID,
+                                    or a list of resource IDs used in resource URL.
+
+        @type params: dict
+        @keyword params: (optional) Dictionary of the resource query parameters used for all calls.
+
+        @type max_connections: int
+        @keyword max_connections: (optional) Maximum number of calls in flight. Default is 10.
+
+        @type verbose: bool
+        @keyword verbose: (optional) Specifies if cURL verbose mode should be used.
+                          Default is False.
+
+        @rtype: list
+        @return: See L{IContactClient.batch}
+        """
+        requests = []
+        for resource_ids in resource_ids_list:
+            if not isinstance(resource_ids, (list, tuple)):
+                resource_ids = [resource_ids]
+            requests.append((http_method.upper(), resource, resource_ids, params))
+
+        return self.batch(requests, max_connections, verbose)
+
+    def iter(self, resource, resource_ids=None, params=dict(), page_size=500, prefetch=0, stream=False,
+             records=False, verbose=False):
+        """Iterates over all items of a collection resource (e.g. contacts, lists or
+        subscriptions). Pages of items are requested lazily with HTTP GET method,
+        so only a single page is kept in memory.
+
+        Example: for contact in client.iter('contacts', params={'status': 'normal'}): ...
+
+        @type resource: str
+        @keyword resource: iContact API resource name. See L{IContactClient._request} method
+                           for the list of available resources.
+
+        @type resource_ids: list
+        @keyword resource_ids: (optional) List of resource IDs that should be used in resource URL,
+                               e.g. message ID for message-opens resource.
+
+        @type params: dict
+        @keyword params: (optional) Dictionary of the resource query parameters. 'offset'
+                         parameter sets the first item to return.
+
+        @type page_size: int
+        @keyword page_size: (optional) Number of items requested at once. Default is 500.
+
+        @type prefetch: int
+        @keyword prefetch: (optional) Number of next pages requested concurrently (read-ahead)
+                           while the current page is being consumed. Pages are still returned
+                           in order. Default is 0, i.e. a page is requested only when
+                           the previous one has been consumed.
+
+        @type stream: bool
+        @keyword stream: (optional) Specifies if pages should be decoded incrementally,
+                         see L{IContactClient.stream}. Can't be used with prefetch.
+                         Default is False.
+
+        @type records: bool
+        @keyword records: (optional) Specifies if items should be returned as compact read-only
+                          L{Record} objects with dictionary-like access, instead of dictionaries.
+                          Default is False.
+
+        @type verbose: bool
+        @keyword verbose: (optional) Specifies if cURL verbose mode should be used.
+                          Default is False.
+
+        @rtype: generator
+        @return: Collection items
+        """
+        if records:
+            items = self.iter(resource, resource_ids, params, page_size, prefetch, stream, verbose=verbose)
+            for record in RecordFactory().iter(items):
+                yield record
+            return
+
+        # Collection key is the one expected without item ID
+        collection_key = self._get_expected_response_key('GET', resource)
+
+        page_params = dict(params)
+        offset = int(page_params.pop('offset', 0))
+
+        if prefetch and stream:
+            raise ValueError("Prefetching of streamed pages is not supported")
+
+        if prefetch and self._transport.multi:
+            for item in self._iter_prefetch(resource, resource_ids, page_params, offset, page_size,
+                                            prefetch, collection_key, verbose):
+                yield item
+            return
+
+        while True:
+            page_params['offset'] = offset
+            page_params['limit'] = page_size
+
+            if stream:
+                response = dict()
+                nr_of_items = 0
+                for item in self._stream(resource, resource_ids, page_params, verbose, response):
+                    nr_of_items += 1
+                    yield item
+            else:
+                # Pages are requested synchronously, also by subclasses returning futures
+                response = IContactClient._request(self, 'GET', resource, resource_ids, page_params, verbose)
+
+                items = response.get(collection_key) or []
+                nr_of_items = len(items)
+                for item in items:
+                    yield item
+
+            offset += nr_of_items
+
+            if (nr_of_items < page_size) or (('total' in response) and (offset >= int(response['total']))):
+                break
+
+    def stream(self, resource, resource_ids=None, params=dict(), records=False, verbose=False):
+        """Executes API call using HTTP GET method and returns items of the returned collection
+        as soon as they are received. Response is decoded incrementally, so the whole
+        response is never kept in memory.
+
+        Example: for contact in client.stream('contacts', params={'limit': 10000}): ...
+
+        @type resource: str
+        @keyword resource: iContact API resource name of a collection. See L{IContactClient._request}
+                           method for the list of available resources.
+
+        @type resource_ids: list
+        @keyword resource_ids: (optional) List of resource IDs that should be used in resource URL.
+
+        @type params: dict
+        @keyword params: (optional) Dictionary of the resource query parameters.
+
+        @type records: bool
+        @keyword records: (optional) Specifies if items should be returned as compact read-only
+                          L{Record} objects, see L{IContactClient.iter}. Default is False.
+
+        @type verbose: bool
+        @keyword verbose: (optional) Specifies if cURL verbose mode should be used.
+                          Default is False.
+
+        @raise IContactException: Raises IContactException if the call fails, or the collection
+                                  hasn't been found in the response. The exception is raised
+                                  when the generator gets to it, i.e. possibly after some items
+                                  have already been returned.
+
+        @rtype: generator
+        @return: Collection items
+        """
+        items = self._stream(resource, resource_ids, params, verbose, dict())
+
+        if records:
+            return RecordFactory().iter(items)
+
+        return items
+
+    def upsert_contacts(self, contacts, chunk_size=bulk.DEFAULT_CHUNK_SIZE, concurrency=1, verbose=False):
+        """Adds or updates many contacts, sending them in chunks with HTTP POST method
+
+        Contacts are matched by email address, the same way as by a single contacts call.
+
+        @type contacts: iterable
+        @keyword contacts: Contacts (dictionaries with at least 'email' key). Any iterable,
+                           e.g. a generator, can be used. It is read chunk by chunk.
+
+        @type chunk_size: int
+        @keyword chunk_size: (optional) Maximum number of contacts sent in one call.
+                             Default is 1000.
+
+        @type concurrency: int
+        @keyword concurrency: (optional) Number of chunks sent concurrently. Default is 1.
+
+        @type verbose: bool
+        @keyword verbose: (optional) Specifies if cURL verbose mode should be used.
+                          Default is False.
+
+        @rtype: list
+        @return: List of L{BulkResult} in the order of contacts. Successful results hold the
+                 returned contact (and its contactId), failed ones the reason of the failure,
+                 i.e. the exception raised by the chunk call, or API warnings.
+        """
+        return bulk.upsert_contacts(self, contacts, chunk_size, concurrency, verbose)
+
+    def subscribe(self, subscriptions=None, contact_ids=None, list_ids=None, status='normal',
+                  chunk_size=bulk.DEFAULT_CHUNK_SIZE, concurrency=4, verbose=False):
+        """Creates many subscriptions, sending them in chunks with HTTP POST method
+
+        Subscriptions are given either as (contactId, listId[, status]) tuples, or as
+        a set of contacts and a set of lists, in which case every contact is subscribed
+        to every list. Repeated (contactId, listId) pairs are sent only once.
+
+        Example: client.subscribe(contact_ids=contact_ids, list_ids=[list_a_id, list_b_id])
+
+        @type subscriptions: iterable
+        @keyword subscriptions: (optional) (contactId, listId[, status]) tuples.
+
+        @type contact_ids: list
+        @keyword contact_ids: (optional) Contact IDs, used if subscriptions isn't given.
+
+        @type list_ids: list
+        @keyword list_ids: (optional) List IDs, used if subscriptions isn't given.
+
+        @type status: str
+        @keyword status: (optional) Subscription status used if not given by a tuple.
+                         Default is 'normal'.
+
+        @type chunk_size: int
+        @keyword chunk_size: (optional) Maximum number of subscriptions sent in one call.
+                             Default is 1000.
+
+        @type concurrency: int
+        @keyword concurrency: (optional) Number of chunks sent concurrently. Default is 4.
+
+        @type verbose: bool
+        @keyword verbose: (optional) Specifies if cURL verbose mode should be used.
+                          Default is False.
+
+        @rtype: list
+        @return: List of L{BulkResult}, one per unique (contactId, listId) pair in the order
+                 of the pairs. Rows are dictionaries with 'contactId', 'listId' and 'status'.
+        """
+        return bulk.subscribe(self, subscriptions, contact_ids, list_ids, status, chunk_size,
+                              concurrency, verbose)
+
+    def import_contacts(self, source, list_ids=None, action='add', fieldnames=None, progress=None,
+                        poll_interval=1.0, max_poll_interval=30.0, timeout=24 * 60 * 60, verbose=False):
+        """Imports contacts from CSV data using the uploads resource
+
+        The upload is created, the data is streamed to it (without loading it into memory),
+        and the upload status is polled with increasing intervals until it has been processed.
+
+        @type source: str, file or iterable
+        @keyword source: Path of a CSV file, file-like object with CSV data, or iterable of
+                         rows (see L{CSVStream}). The first line of CSV data is the header
+                         with contact field names.
+
+        @type list_ids: list
+        @keyword list_ids: (optional) IDs of lists the contacts should be subscribed to.
+
+        @type action: str
+        @keyword action: (optional) Upload action, 'add' or 'update'. Default is 'add'.
+
+        @type fieldnames: list
+        @keyword fieldnames: (optional) Column names, if source is an iterable of dictionaries.
+
+        @type progress: callable
+        @keyword progress: (optional) Function called with a dictionary describing the progress:
+                           with 'status' 'uploading' and 'bytesSent' while the data is sent,
+                           then with the polled upload (including row errors reported by the API).
+
+        @type poll_interval: float
+        @keyword poll_interval: (optional) Initial number of seconds between status polls,
+                                increased 1.5 times after each poll. Default is 1.0.
+
+        @type max_poll_interval: float
+        @keyword max_poll_interval: (optional) Maximum number of seconds between status polls.
+                                    Default is 30.0.
+
+        @type timeout: float
+        @keyword timeout: (optional) Maximum number of seconds to poll the status. Default is 24 hours.
+
+        @type verbose: bool
+        @keyword verbose: (optional) Specifies if cURL verbose mode should be used.
+                          Default is False.
+
+        @rtype: dict
+        @return: Last polled upload. Its status isn't final, if the timeout has been reached.
+        """
+        return uploads.import_contacts(self, source, list_ids, action, fieldnames, progress,
+                                       poll_interval, max_poll_interval, timeout, verbose)
+
+    def _iter_prefetch(self, resource, resource_ids, params, offset, page_size, prefetch,
+                       collection_key, verbose):
+        """Helper method for iterating over collection items with read-ahead of pages
+
+        See L{IContactClient.iter} for the description of parameters.
+
+        @rtype: generator
+        @return: Collection items
+        """
+        runner = CurlMultiRunner(prefetch + 1)
+
+        # Scheduled page transfers, and responses of completed ones, by page offset
+        transfers = {}
+        pages = {}
+
+        next_offset = offset
+        end_offset = None
+
+        try:
+            while True:
+                # Keep the current page and prefetch next pages in flight
+                while (next_offset < offset + (prefetch + 1) * page_size) and \
+                        ((end_offset == None) or (next_offset < end_offset)):
+                    page_params = dict(params, offset=next_offset, limit=page_size)
+                    transfers[next_offset] = Transfer('GET', resource, resource_ids, page_params)
+                    self._start_transfer(runner, transfers[next_offset], verbose,
+                                         functools.partial(pages.__setitem__, next_offset))
+                    next_offset += page_size
+
+                while offset not in pages:
+                    runner.perform()
+
+                del transfers[offset]
+                response = pages.pop(offset)
+                if isinstance(response, IContactException):
+                    raise response
+
+                items = response.get(collection_key) or []
+                for item in items:
+                    yield item
+
+                if 'total' in response:
+                    end_offset = int(response['total'])
+
+                if (len(items) < page_size) or ((end_offset != None) and (offset + page_size >= end_offset)):
+                    break
+
+                offset += page_size
+        finally:
+            runner.close()
+
+            # Release handles of aborted page transfers
+            for (page_offset, transfer) in transfers.items():
+                if (page_offset not in pages) and (transfer.curl != None):
+                    self._pool.release(transfer.curl, reuse=False)
+
+    def _stream(self, resource, resource_ids, params, verbose, fields):
+        """Helper method for executing streamed API call
+
+        See L{IContactClient.stream} for the description of parameters.
+
+        @type fields: dict
+        @keyword fields: Dictionary updated with members of the response other than
+                         the collection (e.g. 'total'), once all items have been returned.
+
+        @rtype: generator
+        @return: Collection items
+        """
+        # Collection key is the one expected without item ID
+        collection_key = self._get_expected_response_key('GET', resource)
+
+        meta = RequestMeta('GET', resource)
+
+        try:
+            request = self._build_request('GET', resource, resource_ids, params)
+            url = meta.url = request.url
+
+            self._retry_policy.record_request()
+            started = time.time()
+            attempt = 0
+            nr_of_items = 0
+
+            while True:
+                attempt += 1
+                meta.attempts = attempt
+
+                if self._rate_limiter != None:
+                    waited = time.time()
+                    self._rate_limiter.acquire()
+                    meta.rate_limit_wait += time.time() - waited
+
+                if self._hooks[BEFORE_REQUEST]:
+                    self._run_hooks(BEFORE_REQUEST, meta)
+
+                try:
+                    response = self._transport.stream(request, meta, verbose)
+
+                    if response.code == 200:
+                        parser = JSONArrayStream(collection_key)
+                        for item in self._parse_stream(url, parser, response.body):
+                            nr_of_items += 1
+                            yield item
+                        break
+
+                    # Error responses are processed as a whole
+                    body = ''.join(response.body)
+                except TransportError:
+                    # Returned items can't be returned again, so the call isn't retried then
+                    delay = None
+                    if nr_of_items == 0:
+                        delay = self._retry_policy.get_delay('GET', attempt, time.time() - started,
+                                                             transport_error=True)
+                    if delay == None:
+                        raise
+                else:
+                    delay = self._retry_policy.get_delay('GET', attempt, time.time() - started,
+                            http_code=response.code, retry_after=response.headers.get('retry-after'))
+                    if delay == None:
+                        # Raises exception for the error response
+                        self._process_response('GET', url, resource, resource_ids, response.code, body)
+
+                meta.retry_wait += delay
+                meta.retried_codes.append(meta.http_code)
+                if self._hooks[ON_RETRY]:
+                    self._run_hooks(ON_RETRY, meta, delay)
+                time.sleep(delay)
+
+            try:
+                items = parser.close()
+            except ValueError, exc:
+                logging.exception(exc)
+                raise NoData('GET', url, message="Error parsing JSON response")
+
+            for item in items:
+                yield item
+
+            if not parser.found:
+                raise NoData('GET', url, parser.fields,
+                        "No '%s' data in response" % collection_key)
+
+            fields.update(parser.fields)
+        except IContactException, exc:
+            meta.error = exc
+            raise
+        finally:
+            meta.elapsed = time.time() - meta.started
+            self._emit_meta(meta)
+
+    def _parse_stream(self, url, parser, chunks):
+        """Helper method for decoding collection items of a streamed response body
+
+        @type url: str
+        @keyword url: Resource URL
 
-    def _request(self, http_method, resource, resource_ids=None, params=dict(), verbose=False):
+        @type parser: L{JSONArrayStream}
+        @keyword parser: Parser of the response
+
+        @type chunks: iterator
+        @keyword chunks: Body chunks, closed when the generator is closed
+
+        @rtype: generator
+        @return: Collection items
+        """
+        try:
+            for chunk in chunks:
+                try:
+                    items = parser.feed(chunk)
+                except ValueError, exc:
+                    logging.exception(exc)
+                    raise NoData('GET', url, message="Error parsing JSON response")
+
+                for item in items:
+                    yield item
+        finally:
+            # Aborts the transfer, if the body hasn't been read completely
+            close = getattr(chunks, 'close', None)
+            if close != None:
+                close()
+
+    def _request(self, http_method, resource, resource_ids=None, params=dict(), verbose=False, timeout=None,
+                 deadline=None):
         """Executes API call using
 
         @type http_method: str
@@ -197,6 +1003,7 @@ class IContactClient(object):
                            - campaigns
                            - customfields
                            - uploads
+                           - upload-data
                            - time
 
         @type resource_ids: list
@@ -212,23 +1019,463 @@ class IContactClient(object):
                           - False : cURL verbose mode is disabled
                           Default is False.
 
+        @type timeout: float
+        @keyword timeout: (optional) Maximum number of seconds of every request of the call.
+                          Default is the timeout of the client.
+
+        @type deadline: float
+        @keyword deadline: (optional) Maximum number of seconds of the whole call, including
+                           rate limit waits, retries and backoff sleeps. L{DeadlineExceeded}
+                           is raised as soon as the call can't be completed in time.
+                           By default there is no limit.
+
         @rtype: dict or list
         @return: Call response
         """
-        curl = pycurl.Curl()
+        cache_key, response = self._get_cached(http_method, resource, resource_ids, params)
+        if response != None:
+            return response
+
+        if (self._single_flight != None) and (http_method == 'GET'):
+            url = self._get_resource_url(resource, resource_ids)
+            key = self._single_flight.make_key(http_method, url, params)
 
-        if verbose != None:
-            # Set verbose output mode
-            curl.setopt(curl.VERBOSE, verbose)
+            # Waiting for the identical call in flight is limited by the deadline of this call
+            deadline_error = None
+            if deadline != None:
+                deadline_error = self._deadline_error(http_method, url, deadline)
 
+            return self._single_flight.do(key, functools.partial(self._perform, http_method, resource,
+                                                                 resource_ids, params, verbose, cache_key,
+                                                                 timeout, deadline),
+                                          deadline, deadline_error)
+
+        return self._perform(http_method, resource, resource_ids, params, verbose, cache_key, timeout, deadline)
+
+    def _perform(self, http_method, resource, resource_ids, params, verbose, cache_key, timeout=None,
+                 deadline=None):
+        """Helper method for performing API call, with retries
+
+        @type cache_key: tuple
+        @keyword cache_key: Key of the response in the response cache, or None if the response
+                            shouldn't be cached
+
+        See L{IContactClient._request} for the description of other parameters.
+
+        @rtype: dict or list
+        @return: Call response
+        """
+        meta = RequestMeta(http_method, resource)
+
+        try:
+            result = self._perform_attempts(http_method, resource, resource_ids, params, verbose, meta,
+                                            timeout, deadline)
+        except IContactException, exc:
+            meta.error = exc
+            raise
+        finally:
+            meta.elapsed = time.time() - meta.started
+            self._emit_meta(meta)
+
+        if cache_key != None:
+            self._cache.set(resource, cache_key, result)
+
+        return result
+
+    def _perform_attempts(self, http_method, resource, resource_ids, params, verbose, meta, timeout=None,
+                          deadline=None):
+        """Helper method for performing attempts of API call, see L{IContactClient._perform}
+
+        @type meta: L{RequestMeta}
+        @keyword meta: Metadata of the call, updated by every attempt
+
+        @rtype: dict or list
+        @return: Call response
+        """
+        expires = (meta.started + deadline) if (deadline != None) else None
+
+        try:
+            request = self._build_request(http_method, resource, resource_ids, params)
+            url = meta.url = request.url
+
+            self._retry_policy.record_request()
+            started = time.time()
+            attempt = 0
+
+            while True:
+                attempt += 1
+                meta.attempts = attempt
+
+                remaining = self._check_deadline(http_method, url, deadline, expires)
+
+                if self._rate_limiter != None:
+                    waited = time.time()
+                    acquired = self._rate_limiter.acquire(remaining)
+                    meta.rate_limit_wait += time.time() - waited
+
+                    if not acquired:
+                        raise self._deadline_error(http_method, url, deadline)
+                    remaining = self._check_deadline(http_method, url, deadline, expires)
+
+                request.timeout = self._get_attempt_timeout(timeout, remaining)
+
+                if self._hooks[BEFORE_REQUEST]:
+                    self._run_hooks(BEFORE_REQUEST, meta)
+
+                try:
+                    response = self._transport.perform(request, meta, verbose)
+                except TransportError:
+                    # The request may have timed out because of the deadline
+                    self._check_deadline(http_method, url, deadline, expires)
+
+                    delay = self._retry_policy.get_delay(http_method, attempt, time.time() - started,
+                                                         transport_error=True)
+                    if delay == None:
+                        raise
+                else:
+                    delay = self._retry_policy.get_delay(http_method, attempt, time.time() - started,
+                                                         http_code=response.code,
+                                                         retry_after=response.headers.get('retry-after'))
+                    if delay == None:
+                        break
+
+                # Fail now, rather than after sleeping past the deadline
+                self._check_deadline(http_method, url, deadline, expires, delay)
+
+                meta.retry_wait += delay
+                meta.retried_codes.append(meta.http_code)
+                if self._hooks[ON_RETRY]:
+                    self._run_hooks(ON_RETRY, meta, delay)
+                time.sleep(delay)
+        finally:
+            # Writes invalidate cached responses of the resource, even if they have failed
+            if (self._cache != None) and (http_method != 'GET'):
+                self._cache.invalidate(resource)
+
+        return self._process_response(http_method, url, resource, resource_ids, response.code, response.body)
+
+    def _upload(self, resource, resource_ids, read, size=None, content_type='text/csv', verbose=False):
+        """Helper method for sending raw request body with HTTP PUT method
+
+        The body is read while it is being sent, so the call isn't retried.
+
+        @type read: callable
+        @keyword read: Function returning next chunk of the body of at most given size,
+                       empty string at the end of the body (e.g. read method of a file).
+
+        @type size: int
+        @keyword size: (optional) Body size, chunked transfer encoding is used if unknown.
+
+        @type content_type: str
+        @keyword content_type: (optional) Body content type. Default is 'text/csv'.
+
+        See L{IContactClient._request} for the description of other parameters.
+
+        @rtype: dict or list
+        @return: Call response
+        """
         url = self._get_resource_url(resource, resource_ids)
+        request = HTTPRequest('PUT', url, dict(self._request_headers, **{'Content-Type': content_type}),
+                              resource=resource, resource_ids=resource_ids,
+                              connect_timeout=self._connect_timeout, timeout=self._timeout,
+                              stall_timeout=self._stall_timeout)
+
+        if self._rate_limiter != None:
+            self._rate_limiter.acquire()
+
+        response = self._transport.upload(request, read, size, RequestMeta('PUT', resource, url), verbose)
+
+        return self._process_response('PUT', url, resource, resource_ids, response.code, response.body)
+
+    def _try_request(self, transfer, verbose):
+        """Helper method for performing call of a batch through the transport
+
+        @type transfer: L{Transfer}
+        @keyword transfer: API call
+
+        @rtype: dict, list or L{IContactException}
+        @return: Call response, or the raised exception
+        """
+        try:
+            return IContactClient._request(self, transfer.http_method, transfer.resource,
+                                           transfer.resource_ids, transfer.params, verbose,
+                                           transfer.timeout, transfer.deadline)
+        except IContactException, exc:
+            return exc
+
+    def _start_transfer(self, runner, transfer, verbose, callback):
+        """Helper method for scheduling API call on a cURL multi runner
+
+        @type runner: L{CurlMultiRunner}
+        @keyword runner: Runner performing the call
+
+        @type transfer: L{Transfer}
+        @keyword transfer: API call
+
+        @type verbose: bool
+        @keyword verbose: Specifies if cURL verbose mode should be used.
+
+        @type callback: callable
+        @keyword callback: Function called with the call response, or the raised
+                           L{IContactException}, when the call has been completed.
+        """
+        if self._cache != None:
+            cache_key, response = self._get_cached(transfer.http_method, transfer.resource,
+                                                   transfer.resource_ids, transfer.params)
+            if response != None:
+                callback(response)
+                return
+
+            callback = functools.partial(self._cache_result, transfer.http_method, transfer.resource,
+                                         cache_key, callback=callback)
+
+        transfer.meta = RequestMeta(transfer.http_method, transfer.resource)
+        if transfer.deadline != None:
+            transfer.expires = transfer.meta.started + transfer.deadline
+
+        runner.add(functools.partial(self._prepare_transfer, runner, transfer, verbose, callback),
+                   functools.partial(self._complete_transfer, runner, transfer, verbose, callback))
+
+    def _get_cached(self, http_method, resource, resource_ids, params):
+        """Helper method for looking up API call response in the response cache
+
+        @rtype: tuple
+        @return: (cache key, cached response). Cache key is None if the response shouldn't
+                 be cached, cached response is None if there is no valid entry.
+        """
+        if (self._cache == None) or (http_method != 'GET') or not self._cache.get_ttl(resource):
+            return None, None
+
+        cache_key = self._cache.make_key(self._get_resource_url(resource, resource_ids), params)
+
+        return cache_key, self._cache.get(cache_key)
+
+    def _cache_result(self, http_method, resource, cache_key, result, callback):
+        """Helper method for updating the response cache with result of API call performed
+        by a cURL multi runner, before passing the result to callback
+        """
+        if http_method != 'GET':
+            self._cache.invalidate(resource)
+        elif (cache_key != None) and not isinstance(result, IContactException):
+            self._cache.set(resource, cache_key, result)
+
+        callback(result)
+
+    def _prepare_transfer(self, runner, transfer, verbose, callback):
+        """Helper method for preparing cURL handle of API call started by a cURL multi runner
+
+        See L{IContactClient._start_transfer} for the description of parameters.
+
+        @rtype: pycurl.Curl
+        @return: Prepared cURL handle, or None if the call has been postponed or has failed
+        """
+        try:
+            remaining = self._check_deadline(transfer.http_method, transfer.url, transfer.deadline,
+                                             transfer.expires)
+
+            if self._rate_limiter != None:
+                wait = self._rate_limiter.reserve()
+
+                if wait and (self._rate_limiter.mode == RateLimiter.RAISE):
+                    raise RateLimitExceeded(transfer.http_method, transfer.url,
+                            message=u"Rate limit exceeded. Retry after %.1f seconds." % wait,
+                            retry_after=wait)
+                elif wait:
+                    self._check_deadline(transfer.http_method, transfer.url, transfer.deadline,
+                                         transfer.expires, wait)
+
+                    # Queue the call until it is within the rate limits
+                    transfer.meta.rate_limit_wait += wait
+                    runner.add(functools.partial(self._prepare_transfer, runner, transfer, verbose, callback),
+                               functools.partial(self._complete_transfer, runner, transfer, verbose, callback),
+                               delay=wait)
+                    return None
+        except IContactException, exc:
+            if transfer.curl != None:
+                self._pool.release(transfer.curl)
+            self._finish_transfer(transfer, callback, exc)
+            return None
+
+        # cURL handle is already prepared, if the call is being retried after an HTTP error
+        if transfer.curl != None:
+            transfer.response_buffer.truncate(0)
+            transfer.response_headers.clear()
+        else:
+            transfer.curl = self._pool.acquire()
+
+            try:
+                transfer.url, transfer.response_buffer, transfer.response_headers = \
+                        self._prepare_curl(transfer.curl, transfer.http_method, transfer.resource,
+                                           transfer.resource_ids, transfer.params, verbose)
+            except IContactException, exc:
+                self._pool.release(transfer.curl)
+                self._finish_transfer(transfer, callback, exc)
+                return None
+
+            if not transfer.attempts:
+                transfer.meta.url = transfer.url
+                self._retry_policy.record_request()
+                transfer.started = time.time()
+
+        # Timeout of the client has been set by _prepare_curl
+        if (transfer.timeout != None) or (remaining != None):
+            set_curl_timeouts(transfer.curl, self._connect_timeout,
+                              self._get_attempt_timeout(transfer.timeout, remaining), self._stall_timeout)
+
+        transfer.meta.attempts = transfer.attempts + 1
+        if self._hooks[BEFORE_REQUEST]:
+            self._run_hooks(BEFORE_REQUEST, transfer.meta)
+
+        return transfer.curl
+
+    def _complete_transfer(self, runner, transfer, verbose, callback, curl, errno, errmsg):
+        """Helper method for processing API call performed by a cURL multi runner
+
+        See L{IContactClient._start_transfer} for the description of parameters.
+        """
+        transfer.attempts += 1
+        elapsed = time.time() - transfer.started
+
+        transfer.meta.attempts = transfer.attempts
+        transfer.meta.read_curl(curl)
+
+        if errno:
+            delay = None
+            if (transfer.expires == None) or (time.time() < transfer.expires):
+                delay = self._retry_policy.get_delay(transfer.http_method, transfer.attempts, elapsed,
+                                                     transport_error=True)
+            if delay == None:
+                # Don't reuse the handle (and its connection) after a transport error
+                self._pool.release(curl, reuse=False)
+
+                # The request may have timed out because of the deadline
+                if (transfer.expires != None) and (time.time() >= transfer.expires):
+                    error = self._deadline_error(transfer.http_method, transfer.url, transfer.deadline)
+                else:
+                    error = self._transport_error(transfer.http_method, transfer.url, errno, errmsg)
+                self._finish_transfer(transfer, callback, error)
+                return
+        else:
+            http_code = transfer.meta.http_code
+            delay = self._retry_policy.get_delay(transfer.http_method, transfer.attempts, elapsed,
+                                                 http_code=http_code,
+                                                 retry_after=transfer.response_headers.get('retry-after'))
+
+        if delay != None:
+            try:
+                self._check_deadline(transfer.http_method, transfer.url, transfer.deadline, transfer.expires,
+                                     delay)
+            except DeadlineExceeded, exc:
+                self._pool.release(curl, reuse=not errno)
+                self._finish_transfer(transfer, callback, exc)
+                return
+
+            if errno:
+                # Like CurlTransport, retry on a new handle (and connection) after a transport error
+                self._pool.release(curl, reuse=False)
+                transfer.curl = None
+
+            transfer.meta.retry_wait += delay
+            transfer.meta.retried_codes.append(transfer.meta.http_code)
+            if self._hooks[ON_RETRY]:
+                self._run_hooks(ON_RETRY, transfer.meta, delay)
+            runner.add(functools.partial(self._prepare_transfer, runner, transfer, verbose, callback),
+                       functools.partial(self._complete_transfer, runner, transfer, verbose, callback),
+                       delay=delay)
+            return
+
+        self._pool.release(curl)
+
+        response = transfer.response_buffer.getvalue()
+        transfer.response_buffer.close()
+
+        try:
+            result = self._process_response(transfer.http_method, transfer.url, transfer.resource,
+                                            transfer.resource_ids, http_code, response)
+        except IContactException, exc:
+            result = exc
+
+        self._finish_transfer(transfer, callback, result)
+
+    def _finish_transfer(self, transfer, callback, result):
+        """Helper method for completing API call performed by a cURL multi runner: reports
+        metadata of the call, and passes the result to callback
+
+        See L{IContactClient._start_transfer} for the description of parameters.
+        """
+        meta = transfer.meta
+
+        if isinstance(result, IContactException):
+            meta.error = result
+        meta.elapsed = time.time() - meta.started
+        self._emit_meta(meta)
+
+        callback(result)
+
+    def _emit_meta(self, meta):
+        """Helper method for reporting metadata of a completed API call to the listeners and hooks
+
+        @type meta: L{RequestMeta}
+        @keyword meta: Call metadata
+        """
+        self._local.last_meta = meta
+
+        for listener in self._meta_listeners:
+            try:
+                listener(meta)
+            except Exception, exc:
+                logging.exception(u"Request metadata listener failed: %s" % unicode(exc))
+
+        event = AFTER_RESPONSE if (meta.error == None) else ON_ERROR
+        if self._hooks[event]:
+            self._run_hooks(event, meta)
+
+    def _run_hooks(self, event, *args):
+        """Helper method for calling hooks of an event
+
+        @type event: str
+        @keyword event: Event name
+
+        @type args: tuple
+        @keyword args: Hook arguments
+        """
+        for hook in self._hooks[event]:
+            try:
+                hook(*args)
+            except Exception, exc:
+                logging.exception(u"Hook %s failed: %s" % (event, unicode(exc)))
+
+    def _prepare_curl(self, curl, http_method, resource, resource_ids=None, params=dict(), verbose=False):
+        """Helper method for setting request options of a cURL handle
+
+        @type curl: pycurl.Curl
+        @keyword curl: cURL handle
+
+        See L{IContactClient._request} for the description of other parameters.
+
+        @rtype: tuple
+        @return: (resource URL, response buffer, response headers dictionary)
+        """
+        request = self._build_request(http_method, resource, resource_ids, params)
+        response_buffer, response_headers = prepare_curl(curl, request, verbose)
+
+        return request.url, response_buffer, response_headers
+
+    def _build_request(self, http_method, resource, resource_ids=None, params=dict()):
+        """Helper method for building HTTP request of API call
+
+        See L{IContactClient._request} for the description of parameters.
+
+        @rtype: L{HTTPRequest}
+        @return: Request
+        """
+        url = self._get_resource_url(resource, resource_ids)
+        body = None
 
-        # Set HTTP request method and method specific options
         if http_method == 'GET':
-            curl.setopt(pycurl.HTTPGET, True)
             if params and (type(params) == type(dict())):
                 try:
-                    query = urllib.urlencode(params.copy())
+                    query = urllib.urlencode(params)
                 except UnicodeError, exc:
                     logging.exception(u"Failed to URL-encode parameters: %s. Error message: %s" \
                             % (unicode(params), unicode(exc)))
@@ -236,50 +1483,78 @@ class IContactClient(object):
                             % (unicode(params), unicode(exc)))
                 url += '?' + query
         elif http_method == 'POST':
-            curl.setopt(pycurl.POST, True)
             if params and (type(params) == type(dict())):
-                curl.setopt(pycurl.POSTFIELDS, json.dumps(params.copy()))
+                body = self._codec.encode(params)
         elif http_method == 'PUT':
-            request_body = json.dumps(params.copy())
-            curl.setopt(pycurl.PUT, True)
-            curl.setopt(pycurl.HTTPHEADER, ['Content-Length: %d' % len(request_body)])
-            request_buffer = StringIO.StringIO(request_body)
-            curl.setopt(pycurl.READFUNCTION, request_buffer.read)
-        elif http_method == 'DELETE':
-            curl.setopt(pycurl.CUSTOMREQUEST, 'DELETE')
+            body = self._codec.encode(params)
 
-        # Set required HTTP headers
-        curl.setopt(pycurl.HTTPHEADER,
-                ["%s: %s" % (k, v) for k, v in self._request_headers.items()])
+        return HTTPRequest(http_method, url, self._request_headers, body, resource, resource_ids, params,
+                           self._connect_timeout, self._timeout, self._stall_timeout)
 
-        # Set API resource URL
-        curl.setopt(pycurl.URL, str(url))
+    def _check_deadline(self, http_method, url, deadline, expires, wait=0):
+        """Helper method for checking that API call can continue within its deadline
 
-        # Write response to a string
-        response_buffer = StringIO.StringIO()
-        curl.setopt(pycurl.WRITEFUNCTION, response_buffer.write)
+        @type deadline: float
+        @keyword deadline: Deadline of the call in seconds, or None for no deadline
 
-        http_code = 503
-        retry_counter = 0
+        @type expires: float
+        @keyword expires: Time when the deadline expires, or None for no deadline
 
-        # Retry a number of times if server returns "503 Service Unavailable" status code.
-        # We probably hit the request limit (6000 requests in a 24 hour period,
-        # with a maximum of 60 requests per 60 seconds).
-        while (http_code == 503) and (retry_counter <= 3):
-            time.sleep(retry_counter)
-            retry_counter += 1
+        @type wait: float
+        @keyword wait: (optional) Number of seconds the call has to wait before continuing.
+                       Default is 0.
 
-            response_buffer.truncate(0)
-            curl.perform()
+        @raise DeadlineExceeded: Raises DeadlineExceeded if the deadline expires before the wait ends.
 
-            http_code = curl.getinfo(curl.HTTP_CODE)
+        @rtype: float
+        @return: Number of seconds left after the wait, or None for no deadline
+        """
+        if expires == None:
+            return None
+
+        remaining = expires - time.time() - wait
+        if remaining <= 0:
+            raise self._deadline_error(http_method, url, deadline)
+
+        return remaining
+
+    def _deadline_error(self, http_method, url, deadline):
+        """Helper method for creating exception of API call which couldn't be completed within its deadline
+
+        @rtype: L{DeadlineExceeded}
+        @return: Exception describing the error
+        """
+        return DeadlineExceeded(http_method, url, deadline=deadline,
+                message=u"%s call to: '%s' couldn't be completed within its deadline of %.3g seconds." \
+                        % (http_method, url, deadline))
+
+    def _get_attempt_timeout(self, timeout, remaining):
+        """Helper method for computing timeout of a request of API call
+
+        @type timeout: float
+        @keyword timeout: Timeout of the call, None for the timeout of the client
+
+        @type remaining: float
+        @keyword remaining: Number of seconds left until the deadline, or None for no deadline
+
+        @rtype: float
+        @return: Timeout in seconds, or None for no limit
+        """
+        if timeout == None:
+            timeout = self._timeout
 
-        response = response_buffer.getvalue()
+        if (remaining != None) and ((timeout == None) or (remaining < timeout)):
+            return remaining
 
-        curl.close()
-        response_buffer.close()
+        return timeout
 
-        return self._process_response(http_method, url, resource, resource_ids, http_code, response)
+    def _transport_error(self, http_method, url, errno, errmsg):
+        """Helper method for creating exception of a failed cURL transfer
+
+        @rtype: L{TransportError}
+        @return: Exception describing cURL error
+        """
+        return curl_error(http_method, url, errno, errmsg)
 
     def _get_resource_url(self, resource, resource_ids=None):
         """Helper method for constructing API resource URL
@@ -293,48 +1568,34 @@ class IContactClient(object):
         @rtype: str
         @return: Resource URL
         """
-        MAX_IDS = 2
-        ids = ['' for i in range(MAX_IDS)]
-
-        if resource_ids:
-            for (i, id) in enumerate(resource_ids):
-                if (id != None):
-                    ids[i] = id
-
-        account_folder_path = "/a/%s/c/%s" % (self._account_id, self._clientfolder_id)
-
-        resources = {
-            'accounts': '/a/%s' % ids[0],
-            'users': '/a/%s/users/%s' % (self._account_id, ids[0]),
-            'permissions': '/a/%s/users/%s/permissions' % (self._account_id, ids[0]),
-            'client-folders': '/a/%s/c/%s' % (self._account_id, ids[0]),
-            'contacts': '%s/contacts/%s' % (account_folder_path, ids[0]),
-            'contact-history': '%s/contacts/%s/actions' % (account_folder_path, ids[0]),
-            'lists': '%s/lists/%s' % (account_folder_path, ids[0]),
-            'subscriptions': '%s/subscriptions/%s' % (account_folder_path, ids[0]),
-            'messages': '%s/messages/%s' % (account_folder_path, ids[0]),
-            'message-bounces': '%s/messages/%s/bounces' % (account_folder_path, ids[0]),
-            'message-clicks': '%s/messages/%s/clicks' % (account_folder_path, ids[0]),
-            'message-opens': '%s/messages/%s/opens' % (account_folder_path, ids[0]),
-            'statistics': '%s/messages/%s/statistics' % (account_folder_path, ids[0]),
-            'unsubscribes': '%s/messages/%s/unsubscribes' % (account_folder_path, ids[0]),
-            'segments': '%s/segments/%s' % (account_folder_path, ids[0]),
-            'segment-criteria': '%s/segments/%s/criteria/%s' % (account_folder_path, ids[0], ids[1]),
-            'sends': '%s/sends/%s' % (account_folder_path, ids[0]),
-            'campaigns': '%s/campaigns/%s' % (account_folder_path, ids[0]),
-            'customfields': '%s/customfields/%s' % (account_folder_path, ids[0]),
-            'uploads': '%s/uploads/%s' % (account_folder_path, ids[0]),
-            'time': '/time',
-        }
-
-        url = self._api_base_url
+        route = self._routes.get(resource)
 
-        try:
-            url += resources[resource]
-        except KeyError:
-            url += '/' + resource
+        if route == None:
+            return self._api_base_url + '/' + resource
+
+        return route.url(resource_ids)
+
+    def _get_expected_response_key(self, http_method, resource, resource_ids=None):
+        """Helper method for getting the key of data expected in API response
+
+        @type http_method: str
+        @keyword http_method: HTTP method. One of: GET, POST, PUT or DELETE
+
+        @type resource: str
+        @keyword resource: iContact API resource name.
+
+        @type resource_ids: list
+        @keyword resource_ids: (optional) List of resource IDs used in resource URL.
+
+        @rtype: str
+        @return: Expected key, or None if no data is expected (or the resource is unknown)
+        """
+        route = self._routes.get(resource)
+
+        if route == None:
+            return None
 
-        return url
+        return route.expected_keys[http_method][1 if route.is_item(resource_ids) else 0]
 
     def _process_response(self, http_method, url, resource, resource_ids, http_code, http_response):
         """Helper method for processing API response and converting it from JSON format to dict or list.
@@ -364,75 +1625,18 @@ class IContactClient(object):
         @return: Converted API response
         """
 
-        if resource_ids != None:
-            nr_of_ids = len(resource_ids)
-        else:
-            nr_of_ids = 0
-
-        expected_response_keys = {
-            'accounts': None if (http_method not in ['GET', 'POST']) else \
-                        ('accounts' if (nr_of_ids == 0) else 'account'),
-            'users': 'users' if (nr_of_ids == 0) else 'user',
-            'permissions': 'permissions' if (nr_of_ids == 0) else 'permission',
-            'client-folders': 'clientfolders' if (nr_of_ids == 0) else 'clientfolder',
-            'contacts': None if (http_method not in ['GET', 'POST']) else \
-                        ('contacts' if (nr_of_ids == 0) else 'contact'),
-            'contact-history': 'actions' if (nr_of_ids == 0) else 'action',
-            'lists': None if (http_method not in ['GET', 'POST']) else \
-                     ('lists' if (nr_of_ids == 0) else 'list'),
-            'subscriptions': 'subscriptions' if (nr_of_ids == 0) else 'subscription',
-            'messages': 'messages' if (nr_of_ids == 0) else 'message',
-            'message-bounces': 'bounces' if (nr_of_ids == 0) else 'bounce',
-            'message-clicks': 'clicks' if (nr_of_ids == 0) else 'click',
-            'message-opens': 'opens' if (nr_of_ids == 0) else 'open',
-            'statistics': 'statistics',
-            'unsubscribes': 'unsubscribes',
-            'segments': 'segments' if (nr_of_ids == 0) else 'segment',
-            'segment-criteria': 'criteria' if (nr_of_ids == 0) else 'criterion',
-            'sends': 'sends' if (nr_of_ids == 0) else 'send',
-            'campaigns': 'campaigns' if (nr_of_ids == 0) else 'campaign',
-            'customfields': None if (http_method not in ['GET', 'POST']) else \
-                            ('customfields' if (nr_of_ids == 0) else 'customfield'),
-            'uploads': 'uploads' if (nr_of_ids == 0) else 'upload',
-            'time': 'time',
-        }
-
         try:
-            response = json.loads(http_response)
+            response = self._codec.decode(http_response)
         except Exception, e:
             logging.exception(e.message)
             raise NoData("Error parsing JSON response")
 
         if (http_code == 200):
-            expected_key = expected_response_keys[resource]
+            expected_key = self._get_expected_response_key(http_method, resource, resource_ids)
             if expected_key and (expected_key not in response):
                 raise NoData(http_method, url,
                         response, "No '%s' data in response" % expected_key)
-        elif (http_code == 400):
-            raise BadRequest(http_method, url, response)
-        elif (http_code == 401):
-            raise NotAuthorized(http_method, url, response)
-        elif (http_code == 402):
-            raise PaymentRequired(http_method, url, response)
-        elif (http_code == 403):
-            raise Forbidden(http_method, url, response)
-        elif (http_code == 404):
-            raise NotFound(http_method, url, response)
-        elif (http_code == 405):
-            raise MethodNotAllowed(http_method, url, response)
-        elif (http_code == 406):
-            raise NotAcceptable(http_method, url, response)
-        elif (http_code == 415):
-            raise UnsupportedMediaType(http_method, url, response)
-        elif (http_code == 500):
-            raise InternalServerError(http_method, url, response)
-        elif (http_code == 501):
-            raise NotImplemented(http_method, url, response)
-        elif (http_code == 503):
-            raise ServiceUnavailable(http_method, url, response)
-        elif (http_code == 507):
-            raise InsufficientSpace(http_method, url, response)
         else:
-            raise UnknownError(http_method, url, response)
+            raise STATUS_EXCEPTIONS.get(http_code, UnknownError)(http_method, url, response)
 
         return response
@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+
+"""
+iContact API Client Request Coalescing
+======================================
+Deduplication of identical concurrent calls
+"""
+
+import copy
+import sys
+import threading
+try:
+    import json
+except ImportError:
+    import simplejson as json
+
+from exceptions import DeadlineExceeded
+
+__all__ = ['SingleFlight']
+
+class _Call(object):
+    """
+    Call in flight, shared by the threads waiting for its result
+    """
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.waiters = 0
+        self.result = None
+        self.exc_info = None
+
+class SingleFlight(object):
+    """
+    Single Flight
+    =============
+    Coalesces identical calls made concurrently by several threads: the first caller
+    performs the call, and the other callers wait for its result, or its exception.
+    Waiting callers get copies of the result, so callers can modify them.
+
+    Only calls which are in flight at the same time are coalesced, results are not kept
+    after the call has completed (see L{ResponseCache}). A single flight is thread-safe
+    and can be shared between several clients of the same iContact account.
+    """
+
+    def __init__(self):
+        """Initialize single flight"""
+        self._calls = dict()
+        self._lock = threading.Lock()
+
+        self._stats = {
+            'calls': 0,
+            'coalesced': 0,
+        }
+
+    def make_key(self, http_method, url, params):
+        """Returns key identifying a call
+
+        @type http_method: str
+        @keyword http_method: HTTP method
+
+        @type url: str
+        @keyword url: Resource URL
+
+        @type params: dict
+        @keyword params: Query parameters
+
+        @rtype: tuple
+        @return: Call key
+        """
+        return (http_method, url, json.dumps(params or {}, sort_keys=True))
+
+    def do(self, key, function, timeout=None, timeout_error=None):
+        """Performs a call, or waits for the identical call in flight
+
+        @type key: tuple
+        @keyword key: Call key, see L{SingleFlight.make_key}
+
+        @type function: callable
+        @keyword function: Function performing the call
+
+        @type timeout: float
+        @keyword timeout: (optional) Maximum number of seconds to wait for the identical call
+                          in flight. By default there is no limit.
+
+        @type timeout_error: Exception
+        @keyword timeout_error: (optional) Exception raised when the wait times out.
+                                Default is L{DeadlineExceeded}.
+
+        @rtype: object
+        @return: Result of the function. Exception raised by the function is re-raised
+                 in all callers.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+
+            if call == None:
+                call = self._calls[key] = _Call()
+                leader = True
+                self._stats['calls'] += 1
+            else:
+                leader = False
+                call.waiters += 1
+                self._stats['coalesced'] += 1
+
+        if not leader:
+            if not call.done.wait(timeout):
+                with self._lock:
+                    call.waiters -= 1
+
+                if timeout_error == None:
+                    timeout_error = DeadlineExceeded(key[0], key[1], deadline=timeout)
+                raise timeout_error
+
+            if call.exc_info != None:
+                raise call.exc_info[0], call.exc_info[1], call.exc_info[2]
+
+            return copy.deepcopy(call.result)
+
+        result = None
+        try:
+            result = function()
+            return result
+        except:
+            call.exc_info = sys.exc_info()
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+                waiters = call.waiters
+
+            # Waiting callers copy the result, while the first caller may be modifying it already
+            if waiters and (call.exc_info == None):
+                call.result = copy.deepcopy(result)
+            call.done.set()
+
+    def stats(self):
+        """Returns coalescing statistics
+
+        @rtype: dict
+        @return: Dictionary with keys:
+                 - calls : number of calls performed
+                 - coalesced : number of calls which have waited for an identical call
+                 - in_flight : number of calls being performed
+        """
+        with self._lock:
+            stats = self._stats.copy()
+            stats['in_flight'] = len(self._calls)
+
+        return stats
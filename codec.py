@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+
+"""
+iContact API Client JSON Codec
+==============================
+Encoding of request bodies and decoding of responses with the fastest JSON
+library installed
+"""
+
+try:
+    import json
+except ImportError:
+    import simplejson as json
+
+from lazy import LazyModule, module_available
+
+ujson = LazyModule('ujson')
+
+
+__all__ = ['JSONCodec', 'ResponseBuffer', 'get_codec']
+
+class JSONCodec(object):
+    """
+    JSON Codec
+    ==========
+    Pair of JSON encoding and decoding functions. Any object with encode and decode
+    methods can be used as a codec of a client.
+    """
+
+    def __init__(self, name, encode, decode):
+        """Initialize codec
+
+        @type name: str
+        @keyword name: Codec name
+
+        @type encode: callable
+        @keyword encode: Function encoding an object to JSON string
+
+        @type decode: callable
+        @keyword decode: Function decoding JSON string. It should raise ValueError
+                         for invalid JSON.
+        """
+        self.name = name
+        self.encode = encode
+        self.decode = decode
+
+    def __repr__(self):
+        return '<JSONCodec %s>' % self.name
+
+def _stdlib_codec():
+    """Returns codec using json module (or simplejson)"""
+    return JSONCodec('json', json.dumps, json.loads)
+
+def _ujson_codec():
+    """Returns codec decoding with ujson module, and encoding with json module
+
+    ujson encodes floats with at most 15 significant digits, so request bodies are encoded
+    by json module. ujson can't decode some valid JSON (integers wider than 64 bits, numbers
+    out of the double range), such responses are decoded by json module.
+    """
+    def decode(data):
+        try:
+            return ujson.loads(data, precise_float=True)
+        except (ValueError, OverflowError):
+            # Invalid JSON raises ValueError again
+            return json.loads(data)
+
+    return JSONCodec('ujson', json.dumps, decode)
+
+CODECS = {
+    'json': _stdlib_codec,
+}
+if module_available('ujson'):
+    CODECS['ujson'] = _ujson_codec
+
+def get_codec(name=None):
+    """Returns JSON codec
+
+    @type name: str
+    @keyword name: (optional) Codec name, 'ujson' or 'json'. By default responses are
+                   decoded by ujson if it is installed, see L{_ujson_codec}.
+
+    @raise ValueError: Raises ValueError if the codec is not available.
+
+    @rtype: L{JSONCodec}
+    @return: JSON codec
+    """
+    if name == None:
+        name = 'ujson' if ('ujson' in CODECS) else 'json'
+
+    try:
+        return CODECS[name]()
+    except KeyError:
+        raise ValueError("JSON codec '%s' is not available" % name)
+
+class ResponseBuffer(object):
+    """
+    Response Buffer
+    ===============
+    Collects chunks of a response body written by cURL. Unlike StringIO, chunks are
+    not copied while the response is being received, and a body received in a single
+    chunk (most responses) is returned without copying at all.
+    """
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        """Appends a chunk"""
+        self._chunks.append(data)
+
+    def getvalue(self):
+        """Returns the body"""
+        chunks = self._chunks
+
+        if len(chunks) == 1:
+            return chunks[0]
+
+        value = ''.join(chunks)
+        self._chunks = [value]
+
+        return value
+
+    def truncate(self, size=0):
+        """Discards the body, only truncating to 0 is supported"""
+        if size != 0:
+            raise ValueError("Response buffer can only be truncated to 0")
+        self._chunks = []
+
+    def close(self):
+        """Discards the body"""
+        self._chunks = []
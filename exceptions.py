@@ -131,3 +131,51 @@ class UnknownError(IContactException):
                  exception defined for the returned HTTP status code
     """
     pass
+
+class TransportError(IContactException):
+    """
+    HTTP status code: none, no response has been received
+    Description: The request failed on the transport level (e.g. DNS lookup, connection
+                 or TLS handshake failed, or the connection was reset). errno is
+                 the cURL error code.
+    """
+    def __init__(self, http_method=None, url=None, response=None, message=None, errno=None):
+        IContactException.__init__(self, http_method, url, response, message)
+        self.errno = errno
+
+class RateLimitExceeded(IContactException):
+    """
+    HTTP status code: none, the request has not been sent
+    Description: Client-side rate limit has been reached. retry_after is the number
+                 of seconds after which the request can be sent.
+    """
+    def __init__(self, http_method=None, url=None, response=None, message=None, retry_after=None):
+        IContactException.__init__(self, http_method, url, response, message)
+        self.retry_after = retry_after
+
+class DeadlineExceeded(IContactException):
+    """
+    HTTP status code: none
+    Description: The call couldn't be completed within its deadline, including rate limit
+                 waits, retries and backoff sleeps. deadline is the number of seconds
+                 the call was given.
+    """
+    def __init__(self, http_method=None, url=None, response=None, message=None, deadline=None):
+        IContactException.__init__(self, http_method, url, response, message)
+        self.deadline = deadline
+
+# Exceptions raised for HTTP status codes other than 200 OK
+STATUS_EXCEPTIONS = {
+    400: BadRequest,
+    401: NotAuthorized,
+    402: PaymentRequired,
+    403: Forbidden,
+    404: NotFound,
+    405: MethodNotAllowed,
+    406: NotAcceptable,
+    415: UnsupportedMediaType,
+    500: InternalServerError,
+    501: NotImplemented,
+    503: ServiceUnavailable,
+    507: InsufficientSpace,
+}
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+
+"""
+iContact API Client Hooks
+=========================
+Request lifecycle events for tracing, profiling and logging
+"""
+
+import logging
+
+
+__all__ = ['BEFORE_REQUEST', 'AFTER_RESPONSE', 'ON_ERROR', 'ON_RETRY', 'SlowCallLog']
+
+# Hook events. Hooks are called with the L{RequestMeta} of the call, on_retry hooks
+# also with the delay before the retry in seconds.
+BEFORE_REQUEST = 'before_request'   # before every attempt, meta.attempts is the attempt number
+AFTER_RESPONSE = 'after_response'   # after the call has succeeded
+ON_ERROR = 'on_error'               # after the call has failed, meta.error is the raised exception
+ON_RETRY = 'on_retry'               # after a failed attempt which is going to be retried
+
+EVENTS = (BEFORE_REQUEST, AFTER_RESPONSE, ON_ERROR, ON_RETRY)
+
+class SlowCallLog(object):
+    """
+    Slow Call Log
+    =============
+    Hook logging a warning for every call taking longer than a threshold, with
+    the breakdown of where the time went. See L{IContactClient.log_slow_calls}.
+    """
+
+    def __init__(self, threshold=1.0, logger=None):
+        """Initialize log
+
+        @type threshold: float
+        @keyword threshold: (optional) Minimum call duration logged, in seconds. Default is 1.0.
+
+        @type logger: logging.Logger
+        @keyword logger: (optional) Logger. Default is the root logger.
+        """
+        self.threshold = threshold
+        self.logger = logger if (logger != None) else logging.getLogger()
+
+    def __call__(self, meta):
+        if meta.elapsed < self.threshold:
+            return
+
+        self.logger.warning(u"Slow %s call to '%s': %.3fs (status %s, %d attempt(s), rate limit wait %.3fs, "
+                            u"retry wait %.3fs, last attempt: DNS %.3fs, connect %.3fs, TLS %.3fs, "
+                            u"first byte %.3fs, total %.3fs, %d bytes received)",
+                            meta.http_method, meta.url, meta.elapsed, meta.http_code, meta.attempts,
+                            meta.rate_limit_wait, meta.retry_wait, meta.namelookup_time,
+                            meta.connect_time, meta.appconnect_time, meta.starttransfer_time,
+                            meta.total_time, meta.bytes_received)
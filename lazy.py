@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+
+"""
+iContact API Client Lazy Imports
+================================
+Modules imported when first used, so that importing the package stays cheap.
+
+Optional dependencies (pycurl, ujson) and standard library modules needed only by some
+features (httplib, sqlite3, csv, ...) are bound at module level as L{LazyModule} stand-ins,
+e.g. "sqlite3 = LazyModule('sqlite3')", instead of being imported. Modules used by every
+call (json, threading, time, ...) are imported as usual.
+"""
+
+import imp
+import importlib
+
+
+__all__ = []
+
+class LazyModule(object):
+    """
+    Lazy Module
+    ===========
+    Stand-in for a module, which imports the module on first attribute access.
+    """
+
+    def __init__(self, name):
+        self.__dict__['_name'] = name
+        self.__dict__['_module'] = None
+
+    def __getattr__(self, attr):
+        module = self.__dict__['_module']
+        if module == None:
+            module = self.__dict__['_module'] = importlib.import_module(self.__dict__['_name'])
+        return getattr(module, attr)
+
+    def __repr__(self):
+        return '<LazyModule %s>' % self.__dict__['_name']
+
+def module_available(name):
+    """Returns True if a top-level module can be imported, without importing it"""
+    try:
+        imp.find_module(name)
+    except ImportError:
+        return False
+    return True
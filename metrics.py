@@ -0,0 +1,287 @@
+# -*- coding: utf-8 -*-
+
+"""
+iContact API Client Metrics
+===========================
+Aggregated counters and histograms of API calls, with Prometheus text export
+"""
+
+import bisect
+import collections
+import threading
+
+
+__all__ = ['MetricsRegistry']
+
+# Upper bounds of request duration histogram buckets, in seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Metric types and descriptions by name (without prefix)
+METRICS = {
+    'requests_total': ('counter', 'API calls by resource, method and final HTTP status code'),
+    'request_duration_seconds': ('histogram', 'Wall time of API calls, including retries and waits'),
+    'errors_total': ('counter', 'Failed API calls by exception class'),
+    'retries_total': ('counter', 'Retried attempts by HTTP status code of the failed attempt'),
+    'rate_limit_wait_seconds_total': ('counter', 'Time spent waiting for the rate limiter'),
+    'bytes_received_total': ('counter', 'Response bytes received'),
+    'cache_hits_total': ('counter', 'GET calls answered from the response cache'),
+    'cache_misses_total': ('counter', 'Response cache lookups without a valid entry'),
+    'cache_size': ('gauge', 'Cached responses'),
+    'quota_remaining': ('gauge', 'Requests left in the rate limiter windows'),
+    'pool_connections': ('gauge', 'cURL handles in the pool by state'),
+}
+
+class MetricsRegistry(object):
+    """
+    Metrics Registry
+    ================
+    Counters and fixed-bucket histograms of API calls. A registry records L{RequestMeta}
+    of every call of the clients using it, and reads cache, rate limiter and pool
+    statistics from their collectors when a snapshot is taken.
+
+    A registry is thread-safe and can be shared between several clients. Collectors are
+    keyed by the object they report on, so a cache, rate limiter or transport shared
+    between clients is reported once, and samples of different objects with the same
+    labels are added up.
+    """
+
+    def __init__(self, prefix='icontact', buckets=DEFAULT_BUCKETS):
+        """Initialize registry
+
+        @type prefix: str
+        @keyword prefix: (optional) Prefix of metric names. Default is 'icontact'.
+
+        @type buckets: tuple
+        @keyword buckets: (optional) Upper bounds of request duration histogram buckets
+                          in seconds, in increasing order. Default is L{DEFAULT_BUCKETS}.
+        """
+        self.prefix = prefix
+        self.buckets = tuple(buckets)
+
+        # Counter values by (name, labels), histograms by (name, labels) as [bucket counts, sum, count]
+        self._counters = dict()
+        self._histograms = dict()
+        self._lock = threading.Lock()
+
+        # Functions returning current (name, labels, value) samples of gauges and external counters,
+        # as [collector, number of times added] by key
+        self._collectors = collections.OrderedDict()
+
+    def inc(self, name, labels=(), value=1):
+        """Increases counter
+
+        @type name: str
+        @keyword name: Metric name, without prefix
+
+        @type labels: tuple
+        @keyword labels: (optional) Label (name, value) pairs
+
+        @type value: int or float
+        @keyword value: (optional) Increment. Default is 1.
+        """
+        key = (name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, labels=()):
+        """Adds observation to histogram
+
+        @type name: str
+        @keyword name: Metric name, without prefix
+
+        @type value: float
+        @keyword value: Observed value
+
+        @type labels: tuple
+        @keyword labels: (optional) Label (name, value) pairs
+        """
+        key = (name, labels)
+        index = bisect.bisect_left(self.buckets, value)
+
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram == None:
+                histogram = self._histograms[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+
+            histogram[0][index] += 1
+            histogram[1] += value
+            histogram[2] += 1
+
+    def add_collector(self, collector, key=None):
+        """Adds function called when a snapshot is taken. Of the collectors added with
+        the same key only the first one is called, and it is kept until it has been
+        removed as many times as it has been added.
+
+        @type collector: callable
+        @keyword collector: Function returning list of (name, labels, value) samples
+
+        @type key: object
+        @keyword key: (optional) Key of the collector, e.g. the object it reports on.
+                      Default is the collector itself.
+        """
+        if key == None:
+            key = collector
+
+        with self._lock:
+            entry = self._collectors.get(key)
+            if entry == None:
+                self._collectors[key] = [collector, 1]
+            else:
+                entry[1] += 1
+
+    def remove_collector(self, key):
+        """Removes collector added with L{MetricsRegistry.add_collector}
+
+        @type key: object
+        @keyword key: Key of the collector (the collector itself if it was added without key)
+        """
+        with self._lock:
+            entry = self._collectors.get(key)
+            if entry == None:
+                return
+
+            entry[1] -= 1
+            if entry[1] <= 0:
+                del self._collectors[key]
+
+    def record_meta(self, meta):
+        """Records a completed API call, see L{IContactClient.add_meta_listener}
+
+        @type meta: L{RequestMeta}
+        @keyword meta: Call metadata
+        """
+        labels = (('resource', meta.resource), ('method', meta.http_method))
+
+        if meta.http_code != None:
+            code = str(meta.http_code)
+        else:
+            code = 'none'
+
+        self.inc('requests_total', labels + (('code', code),))
+        self.observe('request_duration_seconds', meta.elapsed, labels)
+
+        if meta.error != None:
+            self.inc('errors_total', labels + (('exception', meta.error.__class__.__name__),))
+
+        for retried_code in meta.retried_codes:
+            self.inc('retries_total', labels + (('code', str(retried_code or 'transport')),))
+
+        if meta.rate_limit_wait:
+            self.inc('rate_limit_wait_seconds_total', labels, meta.rate_limit_wait)
+
+        if meta.bytes_received:
+            self.inc('bytes_received_total', labels, meta.bytes_received)
+
+    def snapshot(self):
+        """Returns current values of all metrics
+
+        @rtype: dict
+        @return: Samples by metric name (without prefix). Samples are dictionaries with keys
+                 'labels' (dict) and 'value', or for histograms 'labels', 'buckets'
+                 (list of (upper bound, cumulative count) tuples, the last bound is
+                 float('inf')), 'sum' and 'count'.
+        """
+        with self._lock:
+            counters = self._counters.items()
+            histograms = [(key, list(counts), total, count)
+                          for (key, (counts, total, count)) in self._histograms.items()]
+            collectors = [collector for (collector, added) in self._collectors.values()]
+
+        # Samples of different objects with the same name and labels (e.g. idle connections
+        # of the transports of several clients) are added up, as series must be unique
+        collected = collections.OrderedDict()
+        for collector in collectors:
+            for (name, labels, value) in collector():
+                key = (name, tuple(labels))
+                collected[key] = collected.get(key, 0) + value
+
+        samples = list(counters) + collected.items()
+
+        snapshot = dict()
+
+        for ((name, labels), value) in samples:
+            snapshot.setdefault(name, []).append({'labels': dict(labels), 'value': value})
+
+        bounds = self.buckets + (float('inf'),)
+        for ((name, labels), counts, total, count) in histograms:
+            cumulative = 0
+            buckets = []
+            for (bound, bucket_count) in zip(bounds, counts):
+                cumulative += bucket_count
+                buckets.append((bound, cumulative))
+
+            snapshot.setdefault(name, []).append({'labels': dict(labels), 'buckets': buckets,
+                                                  'sum': total, 'count': count})
+
+        return snapshot
+
+    def render(self):
+        """Returns all metrics in Prometheus text exposition format
+
+        @rtype: str
+        @return: Metrics text
+        """
+        lines = []
+
+        for (name, samples) in sorted(self.snapshot().items()):
+            metric_type, description = METRICS.get(name, ('untyped', name))
+            full_name = '%s_%s' % (self.prefix, name)
+
+            lines.append('# HELP %s %s' % (full_name, description))
+            lines.append('# TYPE %s %s' % (full_name, metric_type))
+
+            for sample in samples:
+                labels = sample['labels']
+
+                if 'buckets' in sample:
+                    for (bound, count) in sample['buckets']:
+                        bucket_labels = dict(labels, le=_format_value(bound))
+                        lines.append('%s_bucket%s %d' % (full_name, _format_labels(bucket_labels), count))
+                    lines.append('%s_sum%s %s' % (full_name, _format_labels(labels),
+                                                  _format_value(sample['sum'])))
+                    lines.append('%s_count%s %d' % (full_name, _format_labels(labels), sample['count']))
+                else:
+                    lines.append('%s%s %s' % (full_name, _format_labels(labels),
+                                              _format_value(sample['value'])))
+
+        return '\n'.join(lines) + '\n'
+
+def cache_samples(cache):
+    """Returns samples of a L{ResponseCache}, see L{MetricsRegistry.add_collector}"""
+    stats = cache.stats()
+
+    return [('cache_hits_total', (), stats['hits']),
+            ('cache_misses_total', (), stats['misses']),
+            ('cache_size', (), stats['size'])]
+
+def quota_samples(rate_limiter):
+    """Returns samples of a L{RateLimiter}, see L{MetricsRegistry.add_collector}"""
+    return [('quota_remaining', (('bucket', bucket),), remaining['remaining'])
+            for (bucket, remaining) in sorted(rate_limiter.remaining().items())]
+
+def connection_samples(transport):
+    """Returns samples of a L{Transport}, see L{MetricsRegistry.add_collector}"""
+    stats = transport.stats()
+
+    return [('pool_connections', (('state', 'idle'),), stats['idle']),
+            ('pool_connections', (('state', 'in_use'),), stats['in_use'])]
+
+def _format_labels(labels):
+    """Formats labels as {name="value",...}"""
+    if not labels:
+        return ''
+
+    pairs = []
+    for (name, value) in sorted(labels.items()):
+        value = unicode(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append(u'%s="%s"' % (name, value))
+
+    return (u'{%s}' % u','.join(pairs)).encode('utf-8')
+
+def _format_value(value):
+    """Formats sample value"""
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
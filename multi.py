@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+
+"""
+iContact API Client Concurrent Transfers
+========================================
+Runs many cURL transfers in flight on one thread using cURL multi interface
+"""
+
+import heapq
+import itertools
+import time
+from lazy import LazyModule
+
+# pycurl is imported when first used
+pycurl = LazyModule('pycurl')
+
+
+__all__ = ['CurlMultiRunner', 'Transfer']
+
+class Transfer(object):
+    """
+    Single API call performed by L{CurlMultiRunner}
+    """
+
+    def __init__(self, http_method, resource, resource_ids=None, params=dict(), timeout=None, deadline=None):
+        self.http_method = http_method
+        self.resource = resource
+        self.resource_ids = resource_ids
+        self.params = params
+
+        # Timeout of every attempt and deadline of the whole call (seconds), and time when
+        # the deadline expires, set when the call is started
+        self.timeout = timeout
+        self.deadline = deadline
+        self.expires = None
+
+        # Set when the cURL handle is prepared
+        self.curl = None
+        self.url = None
+        self.response_buffer = None
+        self.response_headers = None
+
+        # Number of times the transfer has been performed, and time of the first attempt
+        self.attempts = 0
+        self.started = None
+
+        # Metadata of the call, set when the call is started
+        self.meta = None
+
+class CurlMultiRunner(object):
+    """
+    cURL Multi Runner
+    =================
+    Queue of cURL transfers which are performed concurrently. Transfers can be
+    scheduled with a delay (e.g. for retries). A completion callback is called for
+    each transfer, once it has been performed.
+    """
+
+    def __init__(self, max_connections=10):
+        """Initialize runner
+
+        @type max_connections: int
+        @keyword max_connections: (optional) Maximum number of transfers in flight. Default is 10.
+        """
+        self._multi = pycurl.CurlMulti()
+        self._max_connections = max_connections
+
+        # Scheduled transfers as (start time, sequence number, start function, callback) tuples
+        self._queue = []
+        self._sequence = itertools.count()
+
+        # Handles in flight and their callbacks
+        self._active = {}
+
+    def __len__(self):
+        """Returns number of scheduled and active transfers"""
+        return len(self._queue) + len(self._active)
+
+    def add(self, start, callback, delay=0):
+        """Schedules a transfer
+
+        @type start: callable
+        @keyword start: Function called without arguments when the transfer is started.
+                        Returns cURL handle with all request options set, or None if
+                        the transfer should be skipped. Handles are acquired this way
+                        only when there is a free slot.
+
+        @type callback: callable
+        @keyword callback: Function called as callback(curl, errno, errmsg) when the handle has
+                           been performed. errno is 0 if the transfer has succeeded, otherwise
+                           errno and errmsg describe the cURL error.
+
+        @type delay: int or float
+        @keyword delay: (optional) Number of seconds to wait before starting the transfer.
+                        Default is 0.
+        """
+        heapq.heappush(self._queue, (time.time() + delay, next(self._sequence), start, callback))
+
+    def perform(self, timeout=1.0):
+        """Runs transfers until at least one of them completes, or until timeout
+
+        Completion callbacks are called from this method.
+
+        @type timeout: int or float
+        @keyword timeout: (optional) Maximum number of seconds to wait for network activity.
+                          Default is 1.0.
+
+        @rtype: int
+        @return: Number of scheduled and active transfers left
+        """
+        self._start_scheduled()
+
+        if self._active:
+            self._perform()
+            if not self._read_info():
+                self._multi.select(self._get_wait_time(timeout))
+                self._perform()
+                self._read_info()
+        elif self._queue:
+            time.sleep(self._get_wait_time(timeout))
+
+        return len(self)
+
+    def run(self):
+        """Runs all transfers, including the ones scheduled by completion callbacks"""
+        while len(self):
+            self.perform()
+
+    def fdset(self):
+        """Returns file descriptors of the active transfers
+
+        @rtype: tuple
+        @return: (read, write, exceptional) lists of file descriptors
+        """
+        return self._multi.fdset()
+
+    def close(self):
+        """Closes multi handle. Active transfers are aborted."""
+        for curl in self._active.keys():
+            self._multi.remove_handle(curl)
+        self._active.clear()
+        self._multi.close()
+
+    def _start_scheduled(self):
+        """Adds scheduled handles to the multi handle"""
+        now = time.time()
+        while self._queue and (len(self._active) < self._max_connections) and \
+                (self._queue[0][0] <= now):
+            start_time, sequence, start, callback = heapq.heappop(self._queue)
+            curl = start()
+            if curl != None:
+                self._multi.add_handle(curl)
+                self._active[curl] = callback
+
+    def _perform(self):
+        """Transfers data on all ready sockets"""
+        while True:
+            ret, num_handles = self._multi.perform()
+            if ret != pycurl.E_CALL_MULTI_PERFORM:
+                break
+
+    def _read_info(self):
+        """Removes completed handles and calls their callbacks
+
+        @rtype: int
+        @return: Number of completed transfers
+        """
+        completed = []
+
+        while True:
+            num_queued, succeeded, failed = self._multi.info_read()
+
+            for curl in succeeded:
+                completed.append((curl, 0, None))
+            for curl, errno, errmsg in failed:
+                completed.append((curl, errno, errmsg))
+
+            if num_queued == 0:
+                break
+
+        for curl, errno, errmsg in completed:
+            self._multi.remove_handle(curl)
+            callback = self._active.pop(curl)
+            callback(curl, errno, errmsg)
+
+        return len(completed)
+
+    def _get_wait_time(self, timeout):
+        """Returns number of seconds to wait for network activity or next scheduled transfer"""
+        wait = timeout
+
+        if self._active:
+            multi_timeout = self._multi.timeout()
+            if multi_timeout >= 0:
+                wait = min(wait, multi_timeout / 1000.0)
+
+        if self._queue:
+            wait = min(wait, self._queue[0][0] - time.time())
+
+        return max(wait, 0)
@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+
+"""
+iContact API Client Connection Pool
+===================================
+Pool of reusable cURL handles
+"""
+
+import threading
+import time
+from lazy import LazyModule
+
+# pycurl is imported when first used
+pycurl = LazyModule('pycurl')
+
+
+__all__ = ['CurlPool']
+
+class CurlPool(object):
+    """
+    cURL Handle Pool
+    ================
+    libcurl keeps connections of an easy handle alive after a transfer has finished,
+    so reusing handles saves DNS lookups, TCP connects and TLS handshakes on
+    subsequent requests to the same host. DNS cache and TLS sessions are additionally
+    shared between all handles of the pool.
+
+    A pool is thread-safe and can be shared between several clients.
+    """
+
+    def __init__(self, max_size=10, max_idle_time=60):
+        """Initialize pool
+
+        @type max_size: int
+        @keyword max_size: (optional) Maximum number of idle handles kept in the pool.
+                           Handles released to a full pool are closed. Default is 10.
+
+        @type max_idle_time: int or float
+        @keyword max_idle_time: (optional) Number of seconds an idle handle (and its connection)
+                                is kept alive. Default is 60.
+        """
+        self._max_size = max_size
+        self._max_idle_time = max_idle_time
+
+        self._lock = threading.Lock()
+
+        # Idle handles as (handle, release time) tuples, the most recently used one is last
+        self._idle = []
+        self._in_use = 0
+
+        self._stats = {
+            'created': 0,
+            'reused': 0,
+            'expired': 0,
+            'discarded': 0,
+        }
+
+        # Created with the first handle, so that pycurl isn't imported before it is needed
+        self._share = None
+
+    def acquire(self):
+        """Takes a handle from the pool, or creates a new one if there are no idle handles
+
+        @rtype: pycurl.Curl
+        @return: cURL handle with default options
+        """
+        with self._lock:
+            self._expire(time.time())
+
+            if self._idle:
+                curl = self._idle.pop()[0]
+                self._stats['reused'] += 1
+            else:
+                curl = None
+                self._stats['created'] += 1
+
+            self._in_use += 1
+
+            if (curl == None) and (self._share == None):
+                self._share = pycurl.CurlShare()
+                self._share.setopt(pycurl.SH_SHARE, pycurl.LOCK_DATA_DNS)
+                self._share.setopt(pycurl.SH_SHARE, pycurl.LOCK_DATA_SSL_SESSION)
+
+        if curl == None:
+            curl = pycurl.Curl()
+            # The share is kept by the handle on reset
+            curl.setopt(pycurl.SHARE, self._share)
+            self._set_defaults(curl)
+
+        return curl
+
+    def release(self, curl, reuse=True):
+        """Returns a handle to the pool
+
+        Per-request options (callbacks, headers, request method, etc.) are reset,
+        while the connection of the handle is kept alive.
+
+        @type curl: pycurl.Curl
+        @keyword curl: cURL handle obtained with L{CurlPool.acquire}
+
+        @type reuse: bool
+        @keyword reuse: (optional) Specifies if the handle can be reused. Handles which
+                        failed with a transport error should be released with reuse=False,
+                        so they are closed instead. Default is True.
+        """
+        if reuse:
+            curl.reset()
+            self._set_defaults(curl)
+
+        with self._lock:
+            self._in_use -= 1
+
+            if reuse and (len(self._idle) < self._max_size):
+                self._idle.append((curl, time.time()))
+                curl = None
+            else:
+                self._stats['discarded'] += 1
+
+        if curl != None:
+            curl.close()
+
+    def clear(self):
+        """Closes all idle handles and their connections"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+
+        for curl, released_at in idle:
+            curl.close()
+
+    def stats(self):
+        """Returns pool size and reuse statistics
+
+        @rtype: dict
+        @return: Dictionary with keys:
+                 - size : number of handles owned by the pool (idle + in use)
+                 - idle : number of idle handles
+                 - in_use : number of handles currently in use
+                 - created : number of created handles
+                 - reused : number of times an idle handle has been reused
+                 - expired : number of idle handles closed after max_idle_time
+                 - discarded : number of handles closed on release
+        """
+        with self._lock:
+            self._expire(time.time())
+
+            stats = self._stats.copy()
+            stats['idle'] = len(self._idle)
+            stats['in_use'] = self._in_use
+            stats['size'] = stats['idle'] + stats['in_use']
+
+        return stats
+
+    def _expire(self, now):
+        """Closes handles idle for longer than max_idle_time. Must be called with the lock held."""
+        # Handles are ordered by release time, so expired ones are at the beginning
+        expired = 0
+        for curl, released_at in self._idle:
+            if (now - released_at) < self._max_idle_time:
+                break
+            curl.close()
+            expired += 1
+
+        if expired:
+            del self._idle[:expired]
+            self._stats['expired'] += expired
+
+    def _set_defaults(self, curl):
+        """Sets options shared by all requests"""
+        # Signals can't be used for timeouts in multi-threaded applications
+        curl.setopt(pycurl.NOSIGNAL, True)
@@ -0,0 +1,478 @@
+# -*- coding: utf-8 -*-
+
+"""
+iContact API Client Rate Limiting
+=================================
+Client-side pacing of requests within iContact API limits
+"""
+
+import math
+import os
+import threading
+import time
+try:
+    import json
+except ImportError:
+    import simplejson as json
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from exceptions import RateLimitExceeded
+
+
+# Seconds added to the periods of rate limiter windows, to cover variations of request latency
+WINDOW_MARGIN = 1.0
+
+__all__ = ['TokenBucket', 'SlidingWindow', 'RateLimiter', 'QuotaBackend', 'LocalQuotaBackend', 'FileQuotaBackend']
+
+class TokenBucket(object):
+    """
+    Token Bucket
+    ============
+    Bucket holding up to capacity tokens, which is refilled at a constant rate
+    of capacity tokens per period. The bucket is initially full.
+
+    A full bucket lets through up to 2 * capacity requests within one period (the initial
+    capacity, plus the refill), so L{RateLimiter} uses L{SlidingWindow} for API limits.
+    Token buckets are not thread-safe, see L{RateLimiter}.
+    """
+
+    def __init__(self, capacity, period):
+        """Initialize bucket
+
+        @type capacity: int
+        @keyword capacity: Maximum number of tokens
+
+        @type period: int or float
+        @keyword period: Number of seconds in which an empty bucket is refilled
+        """
+        self.capacity = capacity
+        self.period = period
+
+        self._tokens = float(capacity)
+        self._updated = time.time()
+
+    def remaining(self, now=None):
+        """Returns number of tokens left
+
+        @rtype: float
+        @return: Number of tokens
+        """
+        self._refill(now)
+
+        return self._tokens
+
+    def wait_time(self, tokens=1, now=None):
+        """Returns number of seconds until given number of tokens is available
+
+        @rtype: float
+        @return: Number of seconds, 0 if the tokens are available now
+        """
+        self._refill(now)
+
+        if self._tokens >= tokens:
+            return 0.0
+
+        return (tokens - self._tokens) * self.period / self.capacity
+
+    def get_state(self):
+        """Returns bucket state, which can be stored in a L{QuotaBackend}
+
+        @rtype: list
+        @return: [number of tokens, time of the last update]
+        """
+        return [self._tokens, self._updated]
+
+    def set_state(self, state):
+        """Restores bucket state returned by L{TokenBucket.get_state}. Bucket is reset to
+        full, if state is None."""
+        if state:
+            self._tokens, self._updated = float(state[0]), float(state[1])
+        else:
+            self._tokens, self._updated = float(self.capacity), time.time()
+
+    def take(self, tokens=1, now=None):
+        """Removes tokens from the bucket. The number of tokens may become negative,
+        if more tokens than available are taken."""
+        self._refill(now)
+
+        self._tokens -= tokens
+
+    def _refill(self, now=None):
+        """Adds tokens accumulated since the last update"""
+        if now == None:
+            now = time.time()
+
+        elapsed = max(now - self._updated, 0)
+        self._tokens = min(self._tokens + elapsed * self.capacity / self.period, self.capacity)
+        self._updated = now
+
+class SlidingWindow(object):
+    """
+    Sliding Window
+    ==============
+    Counter of requests, allowing at most capacity requests in any period.
+
+    Requests are counted in slots of resolution seconds, and each of them is counted
+    until period after the end of its slot, so the limit holds for any period, at the cost
+    of waiting up to resolution longer than necessary.
+
+    Sliding windows are not thread-safe, see L{RateLimiter}.
+    """
+
+    def __init__(self, capacity, period, resolution=None):
+        """Initialize window
+
+        @type capacity: int
+        @keyword capacity: Maximum number of requests
+
+        @type period: int or float
+        @keyword period: Number of seconds
+
+        @type resolution: float
+        @keyword resolution: (optional) Length of slots in seconds. Default is 1/600 of the period.
+        """
+        self.capacity = capacity
+        self.period = period
+        self.resolution = resolution if (resolution != None) else period / 600.0
+
+        # [slot end time, number of requests] of the slots with requests, oldest first
+        self._slots = []
+
+    def remaining(self, now=None):
+        """Returns number of requests that can be sent now
+
+        @rtype: int
+        @return: Number of requests
+        """
+        self._expire(now)
+
+        return self.capacity - sum(count for (end, count) in self._slots)
+
+    def wait_time(self, tokens=1, now=None):
+        """Returns number of seconds until given number of requests can be sent
+
+        @rtype: float
+        @return: Number of seconds, 0 if the requests can be sent now
+        """
+        now = self._expire(now)
+
+        excess = sum(count for (end, count) in self._slots) + tokens - self.capacity
+        if excess <= 0:
+            return 0.0
+
+        for (end, count) in self._slots:
+            excess -= count
+            if excess <= 0:
+                return end + self.period - now
+
+        # More requests than the capacity
+        return float(self.period)
+
+    def reset_time(self, now=None):
+        """Returns number of seconds until no requests are counted
+
+        @rtype: float
+        @return: Number of seconds
+        """
+        now = self._expire(now)
+
+        if not self._slots:
+            return 0.0
+
+        return self._slots[-1][0] + self.period - now
+
+    def get_state(self):
+        """Returns window state, which can be stored in a L{QuotaBackend}
+
+        @rtype: list
+        @return: List of [slot end time, number of requests]
+        """
+        return [list(slot) for slot in self._slots]
+
+    def set_state(self, state):
+        """Restores window state returned by L{SlidingWindow.get_state}. Window is reset to
+        empty, if state is None (or has been stored by a L{TokenBucket})."""
+        if state and isinstance(state[0], list):
+            self._slots = [list(slot) for slot in state]
+        else:
+            self._slots = []
+
+    def take(self, tokens=1, now=None):
+        """Counts requests sent now. The number of requests may exceed the capacity."""
+        now = self._expire(now)
+
+        end = (math.floor(now / self.resolution) + 1) * self.resolution
+        if self._slots and (self._slots[-1][0] >= end):
+            self._slots[-1][1] += tokens
+        else:
+            self._slots.append([end, tokens])
+
+    def _expire(self, now=None):
+        """Removes slots older than the period
+
+        @rtype: float
+        @return: Current time
+        """
+        if now == None:
+            now = time.time()
+
+        expired = 0
+        for (end, count) in self._slots:
+            if end + self.period > now:
+                break
+            expired += 1
+
+        if expired:
+            del self._slots[:expired]
+
+        return now
+
+class RateLimiter(object):
+    """
+    Rate Limiter
+    ============
+    Paces requests before they are sent, so the iContact API limits of 6000 requests
+    per 24 hours, with a maximum of 60 requests per 60 seconds, are not exceeded.
+
+    A request is sent only if it is within every limit, counted by L{SlidingWindow} over
+    any 60 seconds and any 24 hours. The windows are WINDOW_MARGIN seconds longer, as
+    the API counts requests when they arrive, and their latency varies. Depending on the mode,
+    callers that would exceed a limit either wait ('block' mode, batch and asynchronous
+    calls are queued), or L{RateLimitExceeded} is raised ('raise' mode).
+
+    Window states are kept in a L{QuotaBackend}. A rate limiter is thread-safe and should
+    be shared between all clients of the same iContact account. Clients in other processes
+    (or on other hosts) are coordinated by using a shared backend with the same key,
+    e.g. L{FileQuotaBackend}.
+    """
+
+    BLOCK = 'block'
+    RAISE = 'raise'
+
+    def __init__(self, per_minute=60, per_day=6000, mode=BLOCK, backend=None, key='default'):
+        """Initialize rate limiter
+
+        @type per_minute: int
+        @keyword per_minute: (optional) Maximum number of requests per 60 seconds. Default is 60.
+
+        @type per_day: int
+        @keyword per_day: (optional) Maximum number of requests per 24 hours. Default is 6000.
+
+        @type mode: str
+        @keyword mode: (optional) What to do when a limit is reached.
+                       Allowed values:
+                       - RateLimiter.BLOCK : wait until the request can be sent
+                       - RateLimiter.RAISE : raise L{RateLimitExceeded}
+                       Default is RateLimiter.BLOCK.
+
+        @type backend: L{QuotaBackend}
+        @keyword backend: (optional) Storage of window states. By default states are kept
+                          in memory of the rate limiter (L{LocalQuotaBackend}).
+
+        @type key: str
+        @keyword key: (optional) Key of window states in the backend, e.g. iContact account ID.
+                      Rate limiters sharing a backend and a key share their limits.
+                      Default is 'default'.
+        """
+        if mode not in (self.BLOCK, self.RAISE):
+            raise ValueError("Unsupported rate limiter mode: %r" % mode)
+
+        self.mode = mode
+
+        self._windows = {}
+        if per_minute:
+            self._windows['minute'] = SlidingWindow(per_minute, 60 + WINDOW_MARGIN)
+        if per_day:
+            self._windows['day'] = SlidingWindow(per_day, 24 * 60 * 60 + WINDOW_MARGIN)
+
+        if backend != None:
+            self._backend = backend
+        else:
+            self._backend = LocalQuotaBackend()
+        self._key = key
+
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """Counts a request in every window if it is within all limits, without waiting
+
+        @rtype: float
+        @return: 0 if the request can be sent now, otherwise number of seconds to wait
+                 before trying again (the request isn't counted in this case)
+        """
+        with self._lock:
+            return self._backend.update(self._key, self._reserve)
+
+    def acquire(self, timeout=None):
+        """Counts a request in every window, waiting until it is within all limits in 'block' mode
+
+        @type timeout: float
+        @keyword timeout: (optional) Maximum number of seconds to wait in 'block' mode.
+                          By default there is no limit.
+
+        @raise RateLimitExceeded: Raises RateLimitExceeded in 'raise' mode,
+                                  if a limit has been reached.
+
+        @rtype: bool
+        @return: True if the request has been counted, False if it wouldn't be within
+                 the limits before timeout (the request isn't counted in this case)
+        """
+        if timeout != None:
+            expires = time.time() + timeout
+
+        while True:
+            wait = self.reserve()
+            if not wait:
+                return True
+
+            if self.mode == self.RAISE:
+                raise RateLimitExceeded(message=u"Rate limit exceeded. Retry after %.1f seconds." % wait,
+                                        retry_after=wait)
+
+            if (timeout != None) and (time.time() + wait > expires):
+                return False
+
+            time.sleep(wait)
+
+    def remaining(self):
+        """Returns how much of each limit is left
+
+        @rtype: dict
+        @return: Dictionary with window names ('minute' and 'day') as keys, and dictionaries
+                 with the following keys as values:
+                 - capacity : maximum number of requests
+                 - remaining : number of requests that can be sent now
+                 - reset : number of seconds until the whole capacity is available again
+        """
+        with self._lock:
+            return self._backend.update(self._key, self._remaining)
+
+    def _load(self, states):
+        """Restores window states loaded from the backend"""
+        states = states or {}
+        for name, window in self._windows.items():
+            window.set_state(states.get(name))
+
+    def _dump(self):
+        """Returns window states to be stored in the backend"""
+        return dict((name, window.get_state()) for name, window in self._windows.items())
+
+    def _reserve(self, states):
+        """Backend update function of L{RateLimiter.reserve}"""
+        self._load(states)
+
+        now = time.time()
+
+        wait = 0.0
+        for window in self._windows.values():
+            wait = max(wait, window.wait_time(1, now))
+
+        if not wait:
+            for window in self._windows.values():
+                window.take(1, now)
+
+        return self._dump(), wait
+
+    def _remaining(self, states):
+        """Backend update function of L{RateLimiter.remaining}"""
+        self._load(states)
+
+        now = time.time()
+
+        remaining = {}
+        for name, window in self._windows.items():
+            remaining[name] = {
+                'capacity': window.capacity,
+                'remaining': max(window.remaining(now), 0),
+                'reset': window.reset_time(now),
+            }
+
+        return self._dump(), remaining
+
+class QuotaBackend(object):
+    """
+    Quota Backend
+    =============
+    Storage of rate limiter window states. Rate limiters of all clients of one iContact
+    account coordinate through the backend, so their aggregate rate stays within
+    the account limits.
+
+    Backends implement L{QuotaBackend.update}, which must be atomic across all clients
+    using the backend. A multi-host backend can be built on any store supporting atomic
+    read-modify-write, e.g. a database row lock or an optimistic transaction.
+    """
+
+    def update(self, key, function):
+        """Atomically updates state stored under the key
+
+        @type key: str
+        @keyword key: State key
+
+        @type function: callable
+        @keyword function: Function called with the stored state (None if there is no state
+                           stored yet). Returns (new state, result) tuple. States are
+                           JSON-serializable.
+
+        @return: Result returned by the function
+        """
+        raise NotImplementedError()
+
+class LocalQuotaBackend(QuotaBackend):
+    """
+    Quota backend keeping states in memory of the current process
+    """
+
+    def __init__(self):
+        self._states = {}
+        self._lock = threading.Lock()
+
+    def update(self, key, function):
+        with self._lock:
+            self._states[key], result = function(self._states.get(key))
+
+        return result
+
+class FileQuotaBackend(QuotaBackend):
+    """
+    Quota backend keeping states in a file shared by all processes on the host.
+    Updates are serialized by an exclusive lock (flock) of the file.
+    """
+
+    def __init__(self, path):
+        """Initialize backend
+
+        @type path: str
+        @keyword path: Path of the state file. The file is created if it doesn't exist.
+        """
+        if fcntl == None:
+            raise NotImplementedError("File locking is not supported on this platform")
+
+        self._path = path
+
+    def update(self, key, function):
+        fd = os.open(self._path, os.O_RDWR | os.O_CREAT, 0644)
+
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+
+            data = os.read(fd, os.fstat(fd).st_size)
+            try:
+                states = json.loads(data) if data else {}
+            except ValueError:
+                # Damaged file, e.g. written by a process killed in the middle of update
+                states = {}
+
+            states[key], result = function(states.get(key))
+
+            data = json.dumps(states)
+            os.lseek(fd, 0, os.SEEK_SET)
+            os.ftruncate(fd, 0)
+            os.write(fd, data)
+        finally:
+            # Closing the file releases the lock
+            os.close(fd)
+
+        return result
@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+
+"""
+iContact API Client Records
+===========================
+Compact read-only records for large numbers of collection items
+"""
+
+
+__all__ = ['Record', 'RecordFactory']
+
+class Record(object):
+    """
+    Record
+    ======
+    Read-only collection item (e.g. contact) storing its values in a tuple. Field names
+    and their positions are shared by all records with the same fields, so a record
+    takes a fraction of the memory of a dictionary.
+
+    Records support dictionary-like access (record['email'], record.get('email'),
+    'email' in record, record.items(), ...) and attribute access for field names
+    which are valid identifiers (record.email). L{Record.to_dict} returns a dictionary.
+    """
+    __slots__ = ('_values',)
+
+    # Field names, and their positions by name, set by record types
+    _fields = ()
+    _index = {}
+
+    def __init__(self, values):
+        self._values = values
+
+    def __getitem__(self, key):
+        return self._values[self._index[key]]
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        try:
+            return self._values[self._index[name]]
+        except KeyError:
+            raise AttributeError(name)
+
+    def __contains__(self, key):
+        return key in self._index
+
+    def __iter__(self):
+        return iter(self._fields)
+
+    def __len__(self):
+        return len(self._fields)
+
+    def __eq__(self, other):
+        if isinstance(other, Record):
+            other = other.to_dict()
+        return self.to_dict() == other
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __repr__(self):
+        return 'Record(%r)' % self.to_dict()
+
+    def __reduce__(self):
+        return (_make_record, (self._fields, self._values))
+
+    def get(self, key, default=None):
+        """Returns value of a field, or default if the record has no such field"""
+        index = self._index.get(key)
+        if index == None:
+            return default
+        return self._values[index]
+
+    def keys(self):
+        """Returns list of field names"""
+        return list(self._fields)
+
+    def values(self):
+        """Returns list of field values"""
+        return list(self._values)
+
+    def items(self):
+        """Returns list of (field name, value) tuples"""
+        return zip(self._fields, self._values)
+
+    def iteritems(self):
+        """Returns iterator of (field name, value) tuples"""
+        return iter(self.items())
+
+    def to_dict(self):
+        """Returns dictionary of the fields"""
+        return dict(zip(self._fields, self._values))
+
+# Record types by field names
+_types = dict()
+
+def _record_type(fields):
+    """Returns record type with given field names, created when first needed"""
+    record_type = _types.get(fields)
+
+    if record_type == None:
+        record_type = type('Record', (Record,), {
+            '__slots__': (),
+            '_fields': fields,
+            '_index': dict((name, index) for (index, name) in enumerate(fields)),
+        })
+        record_type = _types.setdefault(fields, record_type)
+
+    return record_type
+
+def _make_record(fields, values):
+    """Creates record, used for unpickling"""
+    return _record_type(fields)(values)
+
+class RecordFactory(object):
+    """
+    Record Factory
+    ==============
+    Converts collection items to L{Record} objects. Field names are interned, and so are
+    short string values (e.g. status, country), so repeated values are stored once.
+    """
+
+    def __init__(self, max_interned=100000, max_value_length=64):
+        """Initialize factory
+
+        @type max_interned: int
+        @keyword max_interned: (optional) Maximum number of distinct values interned by the factory.
+                               Default is 100000.
+
+        @type max_value_length: int
+        @keyword max_value_length: (optional) Maximum length of interned values. Default is 64.
+        """
+        self._max_interned = max_interned
+        self._max_value_length = max_value_length
+
+        self._interned = dict()
+
+        # Interned field names by field names of items
+        self._fields = dict()
+
+    def make(self, item):
+        """Converts collection item to record
+
+        @type item: dict
+        @keyword item: Collection item
+
+        @rtype: L{Record}
+        @return: Record with the same fields, or the item itself if it is not a dictionary
+        """
+        if not isinstance(item, dict):
+            return item
+
+        keys = tuple(item)
+        fields = self._fields.get(keys)
+        if fields == None:
+            fields = self._fields[keys] = tuple(self._intern_name(key) for key in keys)
+
+        interned = self._interned
+        values = []
+
+        for value in item.itervalues():
+            if isinstance(value, basestring) and (len(value) <= self._max_value_length):
+                shared = interned.get(value)
+                if shared != None:
+                    value = shared
+                elif len(interned) < self._max_interned:
+                    interned[value] = value
+            values.append(value)
+
+        return _record_type(fields)(tuple(values))
+
+    def iter(self, items):
+        """Converts collection items to records
+
+        @type items: iterable
+        @keyword items: Collection items
+
+        @rtype: generator
+        @return: Records
+        """
+        for item in items:
+            yield self.make(item)
+
+    def _intern_name(self, name):
+        """Interns field name, ASCII names are converted to str"""
+        try:
+            return intern(str(name))
+        except UnicodeError:
+            return name
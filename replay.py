@@ -0,0 +1,287 @@
+# -*- coding: utf-8 -*-
+
+"""
+iContact API Client Record and Replay
+=====================================
+Transports recording API traffic to a log, and serving responses from it without network
+"""
+
+import collections
+import threading
+import time
+try:
+    import json
+except ImportError:
+    import simplejson as json
+
+from exceptions import IContactException, TransportError
+from client import IContactClient
+from transport import Transport, CurlTransport, HTTPResponse
+from lazy import LazyModule
+
+gzip = LazyModule('gzip')
+hashlib = LazyModule('hashlib')
+urlparse = LazyModule('urlparse')
+
+
+__all__ = ['RecordingTransport', 'ReplayTransport', 'replay_calls']
+
+class RecordingTransport(Transport):
+    """
+    Recording Transport
+    ===================
+    Transport performing requests with another transport, and writing every exchange
+    (attempt of an API call) to a log, one JSON object per line:
+     - t : seconds from the start of the recording to the request
+     - d : seconds until the response has been received
+     - m, u : HTTP method, and URL path with query
+     - k : digest of the request body, see L{body_digest}
+     - res, ids, p : resource name, resource IDs and parameters of the API call
+     - a : attempt number of the call
+     - c, h, r : status code, 'retry-after' header (if any), and body of the response
+     - e : cURL error code and message, if no response has been received
+
+    Request headers (which include the API credentials) are not recorded. The log is
+    gzip-compressed if its path ends with '.gz'. Calls answered by the response cache
+    don't reach the transport, so disable the cache to record every call.
+    """
+
+    def __init__(self, path, transport=None):
+        """Initialize transport
+
+        @type path: str or file
+        @keyword path: Path of the log file (overwritten), or file-like object
+
+        @type transport: L{Transport}
+        @keyword transport: (optional) Transport performing the requests. Default is a new
+                            L{CurlTransport}.
+        """
+        self.transport = transport if (transport != None) else CurlTransport()
+
+        self._file = _open(path, 'wb')
+        self._owns_file = isinstance(path, basestring)
+        self._lock = threading.Lock()
+        self._started = time.time()
+
+        # Number of recorded exchanges
+        self.recorded = 0
+
+    def perform(self, request, meta, verbose=False):
+        started = time.time()
+        entry = {
+            't': round(started - self._started, 6),
+            'm': request.method,
+            'u': _path(request.url),
+            'k': body_digest(request.body),
+            'res': request.resource,
+            'ids': request.resource_ids,
+            'p': request.params,
+            'a': meta.attempts,
+        }
+
+        try:
+            response = self.transport.perform(request, meta, verbose)
+        except TransportError, exc:
+            entry['d'] = round(time.time() - started, 6)
+            entry['e'] = [exc.errno, exc.message]
+            self._write(entry)
+            raise
+
+        entry['d'] = round(time.time() - started, 6)
+        entry['c'] = response.code
+        entry['r'] = response.body.decode('utf-8', 'replace')
+        if 'retry-after' in response.headers:
+            entry['h'] = {'retry-after': response.headers['retry-after']}
+        self._write(entry)
+
+        return response
+
+    def stats(self):
+        return self.transport.stats()
+
+    def close(self):
+        """Flushes the log, and closes it if it has been opened by the transport"""
+        with self._lock:
+            if self._owns_file:
+                self._file.close()
+            else:
+                self._file.flush()
+        self.transport.close()
+
+    def _write(self, entry):
+        line = json.dumps(entry, separators=(',', ':'), default=unicode) + '\n'
+        with self._lock:
+            self._file.write(line)
+            self.recorded += 1
+
+class ReplayTransport(Transport):
+    """
+    Replay Transport
+    ================
+    Transport serving responses from a log written by L{RecordingTransport}, without network.
+
+    A request is answered by the next recorded exchange with the same method, URL path
+    and body. Exchanges of each request are served in the recorded order; when they run
+    out, the last one is served again. Requests which haven't been recorded fail with
+    L{TransportError}. Response times are reproduced, divided by speed.
+    """
+
+    def __init__(self, path, speed=1.0):
+        """Initialize transport
+
+        @type path: str or file
+        @keyword path: Path of the log file, or file-like object
+
+        @type speed: float
+        @keyword speed: (optional) Replay speed: 1.0 reproduces the recorded response times,
+                        2.0 halves them, etc. None or 0 serves responses without delay.
+                        Default is 1.0.
+        """
+        self.speed = speed
+        self.entries = load_log(path)
+
+        # Exchanges by (method, URL path, body digest), in the recorded order
+        self._exchanges = dict()
+        for entry in self.entries:
+            self._exchanges.setdefault(_key(entry), collections.deque()).append(entry)
+
+        self._lock = threading.Lock()
+
+        # Number of served and unknown requests
+        self.served = 0
+        self.missed = 0
+
+    def perform(self, request, meta, verbose=False):
+        key = (request.method, _path(request.url), body_digest(request.body))
+
+        with self._lock:
+            exchanges = self._exchanges.get(key)
+            if not exchanges:
+                self.missed += 1
+                entry = None
+            else:
+                self.served += 1
+                entry = exchanges.popleft() if (len(exchanges) > 1) else exchanges[0]
+
+        if entry == None:
+            raise TransportError(request.method, request.url,
+                    message=u"%s call to: '%s' failed. No recorded response." % (request.method, request.url))
+
+        duration = entry.get('d') or 0.0
+        if self.speed:
+            duration /= self.speed
+            time.sleep(duration)
+
+        meta.total_time = meta.starttransfer_time = duration
+        meta.bytes_sent = len(request.body or '')
+
+        if 'e' in entry:
+            meta.http_code = None
+            errno, errmsg = entry['e']
+            raise TransportError(request.method, request.url, message=errmsg, errno=errno)
+
+        body = entry.get('r', u'').encode('utf-8')
+        meta.http_code = entry['c']
+        meta.bytes_received = len(body)
+
+        return HTTPResponse(entry['c'], dict(entry.get('h') or {}), body)
+
+def replay_calls(client, path, speed=1.0):
+    """Repeats API calls of a log written by L{RecordingTransport} with a client, starting
+    them at the recorded times divided by speed. Combined with a client using L{ReplayTransport}
+    the replay is deterministic, and shows how the client configuration (cache, rate limiter,
+    retry policy, ...) changes the wall time of the recorded workload.
+
+    @type client: L{IContactClient}
+    @keyword client: Client
+
+    @type path: str or file
+    @keyword path: Path of the log file, or file-like object
+
+    @type speed: float
+    @keyword speed: (optional) Replay speed, None or 0 starts every call as soon as
+                    the previous one has been completed. Default is 1.0.
+
+    @rtype: dict
+    @return: Replay summary with keys 'calls', 'errors' and 'elapsed' (seconds)
+    """
+    # Retries are made by the client, so only first attempts are calls. Raw uploads
+    # (without parameters) can't be repeated.
+    calls = [entry for entry in load_log(path) if (entry.get('a', 1) <= 1) and (entry.get('p') != None)]
+    calls.sort(key=lambda entry: entry['t'])
+
+    errors = 0
+    started = time.time()
+
+    for entry in calls:
+        if speed:
+            delay = started + entry['t'] / speed - time.time()
+            if delay > 0:
+                time.sleep(delay)
+
+        # Calls are performed synchronously, also by clients returning futures
+        try:
+            IContactClient._request(client, entry['m'], entry['res'], entry.get('ids'),
+                                    entry.get('p') or dict())
+        except IContactException:
+            errors += 1
+
+    return {'calls': len(calls), 'errors': errors, 'elapsed': time.time() - started}
+
+def load_log(path):
+    """Reads exchanges of a log written by L{RecordingTransport}
+
+    @type path: str or file
+    @keyword path: Path of the log file, or file-like object
+
+    @rtype: list
+    @return: Exchanges (dictionaries) in the recorded order
+    """
+    log = _open(path, 'rb')
+
+    try:
+        return [json.loads(line) for line in log if line.strip()]
+    finally:
+        if isinstance(path, basestring):
+            log.close()
+
+def body_digest(body):
+    """Returns digest of a request body. JSON bodies are normalized, so that they match
+    regardless of key order and whitespace (i.e. of the JSON codec).
+
+    @type body: str
+    @keyword body: Request body, or None
+
+    @rtype: str
+    @return: Hexadecimal SHA-1 digest, or None for no body
+    """
+    if body == None:
+        return None
+
+    try:
+        body = json.dumps(json.loads(body), sort_keys=True, separators=(',', ':'))
+    except ValueError:
+        pass
+    if isinstance(body, unicode):
+        body = body.encode('utf-8')
+
+    return hashlib.sha1(body).hexdigest()
+
+def _open(path, mode):
+    """Opens log file, gzip-compressed if its name ends with '.gz'"""
+    if not isinstance(path, basestring):
+        return path
+    if path.endswith('.gz'):
+        return gzip.open(path, mode)
+    return open(path, mode)
+
+def _path(url):
+    """Returns path with query of URL, so that logs don't depend on the API host"""
+    parts = urlparse.urlsplit(url)
+    if parts.query:
+        return parts.path + '?' + parts.query
+    return parts.path
+
+def _key(entry):
+    """Returns exchange key of a log entry"""
+    return (entry['m'], entry['u'], entry.get('k'))
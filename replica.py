@@ -0,0 +1,360 @@
+# -*- coding: utf-8 -*-
+
+"""
+iContact API Client Local Replica
+=================================
+SQLite copy of contacts, lists and subscriptions answering local lookups
+"""
+
+import threading
+import time
+try:
+    import json
+except ImportError:
+    import simplejson as json
+
+from lazy import LazyModule
+
+sqlite3 = LazyModule('sqlite3')
+
+
+__all__ = ['LocalReplica']
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS contacts (
+    contactId TEXT PRIMARY KEY,
+    email TEXT,
+    status TEXT,
+    createDate TEXT,
+    data TEXT
+);
+CREATE INDEX IF NOT EXISTS contacts_email ON contacts (email);
+CREATE INDEX IF NOT EXISTS contacts_status ON contacts (status);
+
+CREATE TABLE IF NOT EXISTS lists (
+    listId TEXT PRIMARY KEY,
+    name TEXT,
+    data TEXT
+);
+
+CREATE TABLE IF NOT EXISTS subscriptions (
+    contactId TEXT,
+    listId TEXT,
+    status TEXT,
+    addDate TEXT,
+    data TEXT,
+    PRIMARY KEY (contactId, listId)
+);
+CREATE INDEX IF NOT EXISTS subscriptions_list ON subscriptions (listId, status);
+CREATE INDEX IF NOT EXISTS subscriptions_status ON subscriptions (status);
+
+CREATE TABLE IF NOT EXISTS sync_state (
+    resource TEXT PRIMARY KEY,
+    watermark TEXT,
+    synced REAL
+);
+"""
+
+# Creation date fields of the resources read newest first
+DATE_FIELDS = {
+    'contacts': 'createDate',
+    'subscriptions': 'addDate',
+}
+
+class LocalReplica(object):
+    """
+    Local Replica
+    =============
+    SQLite copy of contacts, lists and subscriptions of a client folder, which answers
+    lookups (e.g. contact ID of an email address, lists of a contact) without API calls.
+
+    The replica is seeded by paging through the collections with L{LocalReplica.seed}, and
+    kept current by L{LocalReplica.sync}, which requests only contacts created since the last
+    sync (newest first), and all lists and subscriptions, so that unsubscribes and other
+    subscription changes are picked up. Changes and deletions of existing contacts are picked
+    up by the next L{LocalReplica.seed}.
+
+    Items are read into staging tables, which replace the replica tables in one short
+    transaction, so lookups aren't blocked while a seed or sync pages through the collections
+    (they are answered from the previous copy). A replica is thread-safe.
+    """
+
+    def __init__(self, client, path=':memory:', page_size=500):
+        """Initialize replica
+
+        @type client: L{IContactClient}
+        @keyword client: Client used for seeding and syncing
+
+        @type path: str
+        @keyword path: (optional) SQLite database file. Default is ':memory:', i.e. the replica
+                       isn't kept after the process exits.
+
+        @type page_size: int
+        @keyword page_size: (optional) Number of items requested at once. Default is 500.
+        """
+        self._client = client
+        self._page_size = page_size
+
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.executescript(SCHEMA)
+
+        # Lock of the connection, and lock serializing seeds and syncs
+        self._lock = threading.RLock()
+        self._sync_lock = threading.Lock()
+
+    def close(self):
+        """Closes the database"""
+        with self._lock:
+            self._connection.close()
+
+    def seed(self, verbose=False):
+        """Replaces the replica with all contacts, lists and subscriptions
+
+        @type verbose: bool
+        @keyword verbose: (optional) Specifies if cURL verbose mode should be used.
+                          Default is False.
+
+        @rtype: dict
+        @return: Number of items stored by resource name
+        """
+        return self._sync(('contacts', 'lists', 'subscriptions'), (), verbose)
+
+    def sync(self, verbose=False):
+        """Adds contacts created since the last sync, and refreshes lists and subscriptions
+
+        @type verbose: bool
+        @keyword verbose: (optional) Specifies if cURL verbose mode should be used.
+                          Default is False.
+
+        @rtype: dict
+        @return: Number of items stored by resource name
+        """
+        return self._sync(('lists', 'subscriptions'), ('contacts',), verbose)
+
+    def synced(self, resource):
+        """Returns time of the last sync of a resource
+
+        @rtype: float
+        @return: Unix timestamp, or None if the resource hasn't been synced
+        """
+        row = self._query_one("SELECT synced FROM sync_state WHERE resource = ?", (resource,))
+        if row == None:
+            return None
+        return row[0]
+
+    def get_contact(self, contact_id):
+        """Returns contact by contact ID
+
+        @rtype: dict
+        @return: Contact, or None if it isn't in the replica
+        """
+        return self._data("SELECT data FROM contacts WHERE contactId = ?", (unicode(contact_id),))
+
+    def find_contact(self, email):
+        """Returns contact by email address (case-insensitive)
+
+        @rtype: dict
+        @return: Contact, or None if it isn't in the replica
+        """
+        return self._data("SELECT data FROM contacts WHERE email = ?", (email.lower(),))
+
+    def get_contact_id(self, email):
+        """Returns contact ID of an email address (case-insensitive)
+
+        @rtype: unicode
+        @return: Contact ID, or None if the contact isn't in the replica
+        """
+        row = self._query_one("SELECT contactId FROM contacts WHERE email = ?", (email.lower(),))
+        if row == None:
+            return None
+        return row[0]
+
+    def contacts(self, status=None):
+        """Returns contacts, optionally with given status
+
+        @rtype: list
+        @return: List of contacts
+        """
+        if status == None:
+            return self._data_list("SELECT data FROM contacts", ())
+        return self._data_list("SELECT data FROM contacts WHERE status = ?", (status,))
+
+    def get_list(self, list_id):
+        """Returns list by list ID
+
+        @rtype: dict
+        @return: List, or None if it isn't in the replica
+        """
+        return self._data("SELECT data FROM lists WHERE listId = ?", (unicode(list_id),))
+
+    def lists(self):
+        """Returns all lists
+
+        @rtype: list
+        @return: List of lists
+        """
+        return self._data_list("SELECT data FROM lists", ())
+
+    def contact_lists(self, contact_id, status='normal'):
+        """Returns IDs of the lists a contact is subscribed to
+
+        @type status: str
+        @keyword status: (optional) Subscription status, None for any status. Default is 'normal'.
+
+        @rtype: list
+        @return: List of list IDs
+        """
+        return self._ids('listId', 'contactId', contact_id, status)
+
+    def list_contacts(self, list_id, status='normal'):
+        """Returns IDs of the contacts subscribed to a list
+
+        @type status: str
+        @keyword status: (optional) Subscription status, None for any status. Default is 'normal'.
+
+        @rtype: list
+        @return: List of contact IDs
+        """
+        return self._ids('contactId', 'listId', list_id, status)
+
+    def get_subscription(self, contact_id, list_id):
+        """Returns subscription of a contact to a list
+
+        @rtype: dict
+        @return: Subscription, or None if it isn't in the replica
+        """
+        return self._data("SELECT data FROM subscriptions WHERE contactId = ? AND listId = ?",
+                          (unicode(contact_id), unicode(list_id)))
+
+    def _sync(self, replaced, added, verbose):
+        """Reads resources into staging tables, and replaces (or adds to) the replica tables with them
+
+        @type replaced: tuple
+        @keyword replaced: Names of resources read completely, replacing their tables
+
+        @type added: tuple
+        @keyword added: Names of resources read since their watermark, added to their tables
+
+        @rtype: dict
+        @return: Number of items read by resource name
+        """
+        counts = dict()
+        watermarks = dict()
+
+        with self._sync_lock:
+            try:
+                with self._lock:
+                    for resource in replaced + added:
+                        self._connection.execute("DROP TABLE IF EXISTS temp.staging_%s" % resource)
+                        self._connection.execute("CREATE TEMP TABLE staging_%s AS SELECT * FROM %s WHERE 0"
+                                                 % (resource, resource))
+
+                for resource in ('contacts', 'lists', 'subscriptions'):
+                    if resource in replaced + added:
+                        watermarks[resource], counts[resource] = self._read(resource, resource in added,
+                                                                            verbose)
+
+                with self._lock:
+                    with self._connection:
+                        for resource in replaced + added:
+                            if resource in replaced:
+                                self._connection.execute("DELETE FROM %s" % resource)
+                            self._connection.execute("INSERT OR REPLACE INTO %s SELECT * FROM staging_%s"
+                                                     % (resource, resource))
+                            self._connection.execute("INSERT OR REPLACE INTO sync_state VALUES (?, ?, ?)",
+                                                     (resource, watermarks[resource], time.time()))
+            finally:
+                with self._lock:
+                    # Discards staging rows of a failed sync
+                    self._connection.rollback()
+                    for resource in replaced + added:
+                        self._connection.execute("DROP TABLE IF EXISTS temp.staging_%s" % resource)
+
+        return counts
+
+    def _read(self, resource, since_watermark, verbose):
+        """Reads items of a resource into its staging table. Contacts and subscriptions are read
+        newest first, so that reading since the watermark can stop at the older items.
+
+        @type since_watermark: bool
+        @keyword since_watermark: Specifies if only items created since the watermark of the resource
+                                  should be read
+
+        @rtype: tuple
+        @return: (new watermark, number of items read)
+        """
+        date_field = DATE_FIELDS.get(resource)
+        params = dict()
+        if resource == 'contacts':
+            params['status'] = 'total'
+        if date_field != None:
+            params['orderby'] = '%s:desc' % date_field
+
+        watermark = None
+        if since_watermark:
+            row = self._query_one("SELECT watermark FROM sync_state WHERE resource = ?", (resource,))
+            watermark = row[0] if (row != None) else None
+
+        newest = watermark
+        count = 0
+
+        for item in self._client.iter(resource, params=params, page_size=self._page_size, verbose=verbose):
+            date = item.get(date_field) if (date_field != None) else None
+
+            # Items created at the watermark are read again, they may have been missed
+            if (watermark != None) and (date != None) and (date < watermark):
+                break
+
+            if (date != None) and ((newest == None) or (date > newest)):
+                newest = date
+
+            with self._lock:
+                self._store('staging_' + resource, item)
+            count += 1
+
+        return newest, count
+
+    def _store(self, table, item):
+        """Inserts an item to a table of contacts, lists or subscriptions"""
+        data = json.dumps(item)
+
+        if table.endswith('contacts'):
+            self._connection.execute("INSERT INTO %s VALUES (?, ?, ?, ?, ?)" % table,
+                                     (unicode(item['contactId']), (item.get('email') or u'').lower(),
+                                      item.get('status'), item.get('createDate'), data))
+        elif table.endswith('lists'):
+            self._connection.execute("INSERT INTO %s VALUES (?, ?, ?)" % table,
+                                     (unicode(item['listId']), item.get('name'), data))
+        else:
+            self._connection.execute("INSERT INTO %s VALUES (?, ?, ?, ?, ?)" % table,
+                                     (unicode(item['contactId']), unicode(item['listId']),
+                                      item.get('status'), item.get('addDate'), data))
+
+    def _ids(self, column, key_column, key, status):
+        """Returns values of column of subscriptions matching key and status"""
+        query = "SELECT %s FROM subscriptions WHERE %s = ?" % (column, key_column)
+        args = (unicode(key),)
+
+        if status != None:
+            query += " AND status = ?"
+            args += (status,)
+
+        with self._lock:
+            return [row[0] for row in self._connection.execute(query, args)]
+
+    def _query_one(self, query, args):
+        """Returns the first row of a query, or None"""
+        with self._lock:
+            return self._connection.execute(query, args).fetchone()
+
+    def _data(self, query, args):
+        """Returns item decoded from the first row of a query, or None"""
+        row = self._query_one(query, args)
+        if row == None:
+            return None
+        return json.loads(row[0])
+
+    def _data_list(self, query, args):
+        """Returns items decoded from all rows of a query"""
+        with self._lock:
+            return [json.loads(row[0]) for row in self._connection.execute(query, args)]
@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+
+"""
+iContact API Client Resources
+=============================
+Registry of API resources: URL paths and keys of the data expected in responses
+"""
+
+
+__all__ = ['Resource', 'register_resource']
+
+class Resource(object):
+    """
+    API Resource
+    ============
+    Describes an iContact API resource. URL path may contain {account} and {folder}
+    placeholders for the account and client folder IDs, and %s placeholders for
+    the resource IDs, e.g. '/a/{account}/c/{folder}/messages/%s/opens'.
+    """
+
+    def __init__(self, name, path, collection_key=None, item_key=None, methods=None):
+        """Initialize resource
+
+        @type name: str
+        @keyword name: Resource name
+
+        @type path: str
+        @keyword path: URL path relative to API base URL
+
+        @type collection_key: str
+        @keyword collection_key: (optional) Key of the data expected in responses of calls
+                                 of the collection. None if no data is expected.
+
+        @type item_key: str
+        @keyword item_key: (optional) Key of the data expected in responses of calls of
+                           a single item, whose ID ends the path. Default is collection_key.
+
+        @type methods: tuple
+        @keyword methods: (optional) HTTP methods whose responses contain the data.
+                          Default is all methods.
+        """
+        self.name = name
+        self.path = path
+        self.collection_key = collection_key
+        self.item_key = item_key if (item_key != None) else collection_key
+        self.methods = methods if (methods != None) else ('GET', 'POST', 'PUT', 'DELETE')
+
+    def compile(self, base_url, account_id, clientfolder_id):
+        """Returns route of the resource for given account and client folder
+
+        @rtype: L{Route}
+        @return: Compiled route
+        """
+        path = self.path.replace('{account}', account_id).replace('{folder}', clientfolder_id)
+        return Route(base_url.replace('%', '%%') + path, path.count('%s'), self)
+
+class Route(object):
+    """
+    Compiled route of a resource, with URL template ready for resource IDs
+    """
+    __slots__ = ('template', 'nr_of_ids', 'no_ids', 'item_path', 'expected_keys')
+
+    def __init__(self, template, nr_of_ids, resource):
+        self.template = template
+        self.nr_of_ids = nr_of_ids
+        self.no_ids = ('',) * nr_of_ids
+
+        # Paths of nested collections (e.g. messages/%s/opens) don't end with an item ID
+        self.item_path = (nr_of_ids > 0) and template.endswith('%s')
+
+        # Expected keys by HTTP method, as (collection, item) tuples
+        self.expected_keys = dict()
+        for http_method in ('GET', 'POST', 'PUT', 'DELETE'):
+            if http_method in resource.methods:
+                self.expected_keys[http_method] = (resource.collection_key, resource.item_key)
+            else:
+                self.expected_keys[http_method] = (None, None)
+
+    def is_item(self, resource_ids=None):
+        """Returns True if the resource IDs identify a single item, i.e. the last ID
+        of the path is given
+
+        @type resource_ids: list
+        @keyword resource_ids: (optional) List of resource IDs used in resource URL.
+
+        @rtype: bool
+        @return: True for an item, False for a collection
+        """
+        if not (self.item_path and resource_ids) or (len(resource_ids) < self.nr_of_ids):
+            return False
+
+        return resource_ids[self.nr_of_ids - 1] not in (None, '')
+
+    def url(self, resource_ids=None):
+        """Returns resource URL
+
+        @type resource_ids: list
+        @keyword resource_ids: (optional) List of resource IDs used in resource URL.
+                               Missing IDs are left empty.
+
+        @rtype: str
+        @return: Resource URL
+        """
+        if not resource_ids:
+            return self.template % self.no_ids
+
+        ids = [('' if (id == None) else id) for id in resource_ids[:self.nr_of_ids]]
+        ids.extend(self.no_ids[len(ids):])
+
+        return self.template % tuple(ids)
+
+def register_resource(resource):
+    """Registers API resource, or replaces a registered one. The resource is available
+    to clients created afterwards, see also L{IContactClient.register_resource}.
+
+    @type resource: L{Resource}
+    @keyword resource: Resource description
+    """
+    RESOURCES[resource.name] = resource
+
+DEFAULT_RESOURCES = [
+    Resource('accounts', '/a/%s', 'accounts', 'account', ('GET', 'POST')),
+    Resource('users', '/a/{account}/users/%s', 'users', 'user'),
+    Resource('permissions', '/a/{account}/users/%s/permissions', 'permissions', 'permission'),
+    Resource('client-folders', '/a/{account}/c/%s', 'clientfolders', 'clientfolder'),
+    Resource('contacts', '/a/{account}/c/{folder}/contacts/%s', 'contacts', 'contact', ('GET', 'POST')),
+    Resource('contact-history', '/a/{account}/c/{folder}/contacts/%s/actions', 'actions', 'action'),
+    Resource('lists', '/a/{account}/c/{folder}/lists/%s', 'lists', 'list', ('GET', 'POST')),
+    Resource('subscriptions', '/a/{account}/c/{folder}/subscriptions/%s', 'subscriptions', 'subscription'),
+    Resource('messages', '/a/{account}/c/{folder}/messages/%s', 'messages', 'message'),
+    Resource('message-bounces', '/a/{account}/c/{folder}/messages/%s/bounces', 'bounces', 'bounce'),
+    Resource('message-clicks', '/a/{account}/c/{folder}/messages/%s/clicks', 'clicks', 'click'),
+    Resource('message-opens', '/a/{account}/c/{folder}/messages/%s/opens', 'opens', 'open'),
+    Resource('statistics', '/a/{account}/c/{folder}/messages/%s/statistics', 'statistics'),
+    Resource('unsubscribes', '/a/{account}/c/{folder}/messages/%s/unsubscribes', 'unsubscribes'),
+    Resource('segments', '/a/{account}/c/{folder}/segments/%s', 'segments', 'segment'),
+    Resource('segment-criteria', '/a/{account}/c/{folder}/segments/%s/criteria/%s', 'criteria', 'criterion'),
+    Resource('sends', '/a/{account}/c/{folder}/sends/%s', 'sends', 'send'),
+    Resource('campaigns', '/a/{account}/c/{folder}/campaigns/%s', 'campaigns', 'campaign'),
+    Resource('customfields', '/a/{account}/c/{folder}/customfields/%s', 'customfields', 'customfield',
+             ('GET', 'POST')),
+    Resource('uploads', '/a/{account}/c/{folder}/uploads/%s', 'uploads', 'upload'),
+    Resource('upload-data', '/a/{account}/c/{folder}/uploads/%s/data'),
+    Resource('time', '/time', 'time'),
+]
+
+# Registered resources by name
+RESOURCES = dict((resource.name, resource) for resource in DEFAULT_RESOURCES)
@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+
+"""
+iContact API Client Retry Policy
+================================
+Decides which failed requests are retried, and when
+"""
+
+import random
+import threading
+import time
+
+from lazy import LazyModule
+
+email_utils = LazyModule('email.utils')
+
+
+__all__ = ['RetryPolicy', 'RetryBudget']
+
+class RetryBudget(object):
+    """
+    Retry Budget
+    ============
+    Limits retries to a fraction of requests, so a degraded API isn't hammered by
+    retries. Every request deposits ratio tokens (up to capacity) and every retry
+    withdraws one token. Retries are denied while the budget is empty.
+
+    A retry budget is thread-safe.
+    """
+
+    def __init__(self, ratio=0.2, capacity=10):
+        """Initialize budget
+
+        @type ratio: float
+        @keyword ratio: (optional) Number of retries allowed per request. Default is 0.2.
+
+        @type capacity: int
+        @keyword capacity: (optional) Maximum number of retries allowed in a burst, the budget
+                           is initially full. Default is 10.
+        """
+        self.ratio = ratio
+        self.capacity = capacity
+
+        self._tokens = float(capacity)
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        """Records a request"""
+        with self._lock:
+            self._tokens = min(self._tokens + self.ratio, self.capacity)
+
+    def withdraw(self):
+        """Takes a token for a retry
+
+        @rtype: bool
+        @return: True if the retry is allowed
+        """
+        with self._lock:
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+    def remaining(self):
+        """Returns number of retries left in the budget"""
+        return int(self._tokens)
+
+class RetryPolicy(object):
+    """
+    Retry Policy
+    ============
+    Retries failed requests with exponential backoff and jitter.
+
+    Status codes in statuses and transport errors (e.g. connection failures) are retried
+    for idempotent HTTP methods (GET, PUT and DELETE). Non-idempotent methods (POST) are
+    retried only on "503 Service Unavailable", which iContact API returns without
+    processing the request when the request limit has been hit.
+
+    Delay before retry N is a random number between 0 and min(backoff_max,
+    backoff_base * 2 ** (N - 1)) seconds ("full jitter"), so clients don't retry in
+    lockstep. A longer delay requested by the server with Retry-After header is respected.
+    """
+
+    IDEMPOTENT_METHODS = ('GET', 'PUT', 'DELETE')
+
+    def __init__(self, max_attempts=4, statuses=(500, 502, 503, 504), transport_errors=True,
+                 backoff_base=1.0, backoff_max=30.0, jitter=True, max_total_time=60.0,
+                 respect_retry_after=True, budget=None):
+        """Initialize policy
+
+        @type max_attempts: int
+        @keyword max_attempts: (optional) Maximum number of attempts, including the first one.
+                               Default is 4.
+
+        @type statuses: tuple
+        @keyword statuses: (optional) HTTP status codes to retry. Default is (500, 502, 503, 504).
+
+        @type transport_errors: bool
+        @keyword transport_errors: (optional) Specifies if transport errors should be retried.
+                                   Default is True.
+
+        @type backoff_base: float
+        @keyword backoff_base: (optional) Maximum delay before the first retry in seconds,
+                               doubled for every next retry. Default is 1.0.
+
+        @type backoff_max: float
+        @keyword backoff_max: (optional) Maximum delay before a retry in seconds. Default is 30.0.
+
+        @type jitter: bool
+        @keyword jitter: (optional) Specifies if delays should be randomized. Default is True.
+
+        @type max_total_time: float
+        @keyword max_total_time: (optional) Maximum number of seconds since the first attempt,
+                                 after which no retry is started. Default is 60.0.
+
+        @type respect_retry_after: bool
+        @keyword respect_retry_after: (optional) Specifies if the delay requested by the server
+                                      with Retry-After header should be used. Default is True.
+
+        @type budget: L{RetryBudget}
+        @keyword budget: (optional) Retry budget. By default each policy has its own budget.
+        """
+        self.max_attempts = max_attempts
+        self.statuses = statuses
+        self.transport_errors = transport_errors
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.jitter = jitter
+        self.max_total_time = max_total_time
+        self.respect_retry_after = respect_retry_after
+
+        if budget != None:
+            self.budget = budget
+        else:
+            self.budget = RetryBudget()
+
+    def record_request(self):
+        """Records a new request (not a retry) in the retry budget"""
+        self.budget.deposit()
+
+    def get_delay(self, http_method, attempt, elapsed, http_code=None, transport_error=False,
+                  retry_after=None):
+        """Decides if a failed attempt should be retried
+
+        @type http_method: str
+        @keyword http_method: HTTP method
+
+        @type attempt: int
+        @keyword attempt: Number of the failed attempt, starting with 1
+
+        @type elapsed: float
+        @keyword elapsed: Number of seconds since the first attempt
+
+        @type http_code: int
+        @keyword http_code: (optional) HTTP status code, if a response has been received
+
+        @type transport_error: bool
+        @keyword transport_error: (optional) True if no response has been received
+
+        @type retry_after: str
+        @keyword retry_after: (optional) Value of Retry-After response header
+
+        @rtype: float
+        @return: Number of seconds to wait before the retry, or None if the attempt
+                 shouldn't be retried
+        """
+        if attempt >= self.max_attempts:
+            return None
+
+        if transport_error:
+            if not (self.transport_errors and (http_method in self.IDEMPOTENT_METHODS)):
+                return None
+        elif http_code not in self.statuses:
+            return None
+        elif (http_code != 503) and (http_method not in self.IDEMPOTENT_METHODS):
+            return None
+
+        delay = min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1))
+        if self.jitter:
+            delay = random.uniform(0, delay)
+
+        if self.respect_retry_after and retry_after:
+            delay = max(delay, self.parse_retry_after(retry_after))
+
+        if (elapsed + delay) > self.max_total_time:
+            return None
+
+        if not self.budget.withdraw():
+            return None
+
+        return delay
+
+    @staticmethod
+    def parse_retry_after(value):
+        """Parses Retry-After header value
+
+        @type value: str
+        @keyword value: Number of seconds, or HTTP date
+
+        @rtype: float
+        @return: Number of seconds, 0 if the value can't be parsed
+        """
+        try:
+            return max(float(value), 0)
+        except ValueError:
+            pass
+
+        date = email_utils.parsedate_tz(value)
+        if date == None:
+            return 0
+
+        return max(email_utils.mktime_tz(date) - time.time(), 0)
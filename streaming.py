@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+
+"""
+iContact API Client Streaming
+=============================
+Incremental decoding of JSON responses
+"""
+
+import re
+try:
+    import json
+except ImportError:
+    import simplejson as json
+
+
+__all__ = ['JSONArrayStream']
+
+WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+class JSONArrayStream(object):
+    """
+    JSON Array Stream
+    =================
+    Incremental parser of a JSON object, which returns items of the array stored under
+    given key as soon as they have been received, e.g. contacts of
+    {"contacts": [{...}, {...}], "total": 2}. Other members of the object are collected
+    in L{JSONArrayStream.fields}.
+
+    Only the unparsed tail of the data is kept in memory, so memory use is bounded
+    by the size of a single item.
+    """
+
+    # Parser states
+    START = 0
+    MEMBER = 1
+    COLON = 2
+    VALUE = 3
+    ITEM = 4
+    END = 5
+
+    def __init__(self, key):
+        """Initialize parser
+
+        @type key: str
+        @keyword key: Key of the array
+        """
+        self.key = key
+
+        # Members of the object except the array, and flag set when the array has been found
+        self.fields = {}
+        self.found = False
+
+        self._decoder = json.JSONDecoder()
+        self._buffer = ''
+        self._state = self.START
+        self._member = None
+
+    def feed(self, data):
+        """Parses a chunk of data
+
+        @type data: str
+        @keyword data: Next chunk of JSON data
+
+        @raise ValueError: Raises ValueError if the data is not a valid JSON object.
+
+        @rtype: list
+        @return: Array items completed by the chunk
+        """
+        self._buffer += data
+
+        items = []
+        position = self._parse(items, False)
+        self._buffer = self._buffer[position:]
+
+        return items
+
+    def close(self):
+        """Parses the rest of the data, after all chunks have been fed
+
+        @raise ValueError: Raises ValueError if the data is incomplete or invalid.
+
+        @rtype: list
+        @return: Remaining array items
+        """
+        items = []
+        position = self._parse(items, True)
+        self._buffer = self._buffer[position:]
+
+        if (self._state != self.END) or self._buffer.strip():
+            raise ValueError("Incomplete JSON object")
+
+        return items
+
+    def _parse(self, items, final):
+        """Parses buffered data as far as possible
+
+        @rtype: int
+        @return: Position of the first unparsed character
+        """
+        buffer = self._buffer
+        position = 0
+
+        while True:
+            position = WHITESPACE.match(buffer, position).end()
+            if position >= len(buffer):
+                return position
+
+            char = buffer[position]
+
+            if self._state == self.START:
+                if char != '{':
+                    raise ValueError("JSON object expected")
+                position += 1
+                self._state = self.MEMBER
+            elif self._state == self.MEMBER:
+                if char == ',':
+                    position += 1
+                elif char == '}':
+                    position += 1
+                    self._state = self.END
+                else:
+                    self._member, end = self._decode(buffer, position, final)
+                    if end == None:
+                        return position
+                    position = end
+                    self._state = self.COLON
+            elif self._state == self.COLON:
+                if char != ':':
+                    raise ValueError("Colon expected after JSON object member name")
+                position += 1
+                self._state = self.VALUE
+            elif self._state == self.VALUE:
+                if (self._member == self.key) and (char == '['):
+                    position += 1
+                    self.found = True
+                    self._state = self.ITEM
+                else:
+                    value, end = self._decode(buffer, position, final)
+                    if end == None:
+                        return position
+                    self.fields[self._member] = value
+                    position = end
+                    self._state = self.MEMBER
+            elif self._state == self.ITEM:
+                if char == ',':
+                    position += 1
+                elif char == ']':
+                    position += 1
+                    self._state = self.MEMBER
+                else:
+                    item, end = self._decode(buffer, position, final)
+                    if end == None:
+                        return position
+                    items.append(item)
+                    position = end
+            else:
+                raise ValueError("Extra data after JSON object")
+
+    def _decode(self, buffer, position, final):
+        """Decodes a JSON value starting at position
+
+        @rtype: tuple
+        @return: (value, end position), or (None, None) if the value hasn't been received
+                 completely yet
+        """
+        try:
+            value, end = self._decoder.raw_decode(buffer, position)
+        except ValueError:
+            if final:
+                raise
+            return None, None
+
+        # Numbers can't be recognized as complete until the next character has been received
+        if (end >= len(buffer)) and buffer[end - 1].isdigit() and not final:
+            return None, None
+
+        return value, end
@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+
+"""
+iContact API Client Benchmarks
+==============================
+Throughput, latency and memory of the client against L{FakeIContactServer},
+which runs in a separate process so that it doesn't share the client's CPU and memory.
+
+Workloads:
+ - single : sequential GET calls of single contacts
+ - batch : the same calls made concurrently with L{IContactClient.map}
+ - paginated : all contacts read with L{IContactClient.iter}
+ - bulk-write : contacts written with L{IContactClient.upsert_contacts}
+
+For every workload calls/sec, requests/sec (including retries), items/sec, p50 and p99
+call latency and the peak growth of the resident memory are reported. Latency of concurrent
+calls includes the time they wait for a free connection. Run with:
+
+    python -m icontact.tests.benchmark [--contacts 10000] [--latency 0.01] [--transport httplib] [--json]
+"""
+
+import argparse
+import multiprocessing
+import os
+import threading
+import time
+try:
+    import json
+except ImportError:
+    import simplejson as json
+
+import icontact
+from icontact.tests.server import FakeIContactServer
+
+
+WORKLOADS = ('single', 'batch', 'paginated', 'bulk-write')
+
+def percentile(values, percent):
+    """Returns percentile of values (nearest rank), or 0.0 for no values"""
+    if not values:
+        return 0.0
+
+    values = sorted(values)
+    index = int(round(percent / 100.0 * len(values) + 0.5)) - 1
+
+    return values[min(max(index, 0), len(values) - 1)]
+
+def current_rss():
+    """Returns resident memory of the process in bytes"""
+    with open('/proc/self/statm') as statm:
+        return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+class MemorySampler(object):
+    """Samples resident memory in a background thread, keeping the peak"""
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.start_rss = self.peak_rss = current_rss()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            self.peak_rss = max(self.peak_rss, current_rss())
+
+    def stop(self):
+        """Stops sampling
+
+        @rtype: int
+        @return: Peak memory growth in bytes
+        """
+        self._stopped.set()
+        self._thread.join()
+        self.peak_rss = max(self.peak_rss, current_rss())
+
+        return self.peak_rss - self.start_rss
+
+def run_workload(client, name, function):
+    """Runs workload, recording metadata of its calls
+
+    @rtype: dict
+    @return: Results
+    """
+    metas = []
+    client.add_meta_listener(metas.append)
+
+    sampler = MemorySampler()
+    started = time.time()
+    try:
+        items = function()
+    finally:
+        elapsed = time.time() - started
+        memory = sampler.stop()
+        client.remove_meta_listener(metas.append)
+
+    latencies = [meta.elapsed for meta in metas]
+    requests = sum(meta.attempts for meta in metas)
+
+    return {
+        'workload': name,
+        'calls': len(metas),
+        'requests': requests,
+        'errors': len([meta for meta in metas if meta.error != None]),
+        'items': items,
+        'seconds': elapsed,
+        'calls_per_second': len(metas) / elapsed,
+        'requests_per_second': requests / elapsed,
+        'items_per_second': items / elapsed,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+        'memory_mb': memory / 1048576.0,
+    }
+
+def serve(queue, contacts, latency, per_minute):
+    """Runs server with seeded contacts, putting its base URL, account and client folder IDs to queue"""
+    server = FakeIContactServer(latency=latency, per_minute=per_minute)
+    server.seed('contacts', ({'email': u'contact%d@example.com' % n, 'firstName': u'Contact',
+                              'lastName': u'%d' % n, 'status': u'normal'} for n in xrange(contacts)))
+    queue.put((server.base_url, server.account_id, server.clientfolder_id))
+    server.serve_forever()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='iContact API client benchmarks against a fake server')
+    parser.add_argument('--workloads', nargs='+', choices=WORKLOADS, default=list(WORKLOADS))
+    parser.add_argument('--contacts', type=int, default=10000, help='contacts in the server')
+    parser.add_argument('--calls', type=int, default=1000, help='calls of the single and batch workloads')
+    parser.add_argument('--latency', type=float, default=0.0, help='server latency in seconds')
+    parser.add_argument('--per-minute', type=int, default=None, help='server request limit per minute')
+    parser.add_argument('--concurrency', type=int, default=10, help='concurrent calls of batch and bulk-write')
+    parser.add_argument('--page-size', type=int, default=500)
+    parser.add_argument('--prefetch', type=int, default=1)
+    parser.add_argument('--records', action='store_true', help='read pages as compact records')
+    parser.add_argument('--chunk-size', type=int, default=1000)
+    parser.add_argument('--transport', choices=sorted(icontact.transport.TRANSPORTS), default=None,
+                        help='client transport (default: curl if pycurl is installed)')
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args(argv)
+
+    queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=serve, args=(queue, args.contacts, args.latency, args.per_minute))
+    process.daemon = True
+    process.start()
+
+    try:
+        base_url, account_id, clientfolder_id = queue.get(timeout=60)
+        client = icontact.IContactClient('user', 'app', 'password', base_url=base_url,
+                                         account_id=account_id, clientfolder_id=clientfolder_id,
+                                         transport=icontact.get_transport(args.transport))
+
+        contact_ids = [contact['contactId'] for contact in client.iter('contacts', page_size=args.page_size)]
+        call_ids = [contact_ids[n % len(contact_ids)] for n in xrange(args.calls)]
+
+        def single():
+            for contact_id in call_ids:
+                client.get('contacts', [contact_id])
+            return len(call_ids)
+
+        def batch():
+            return len(client.map('GET', 'contacts', call_ids, max_connections=args.concurrency))
+
+        def paginated():
+            count = 0
+            for contact in client.iter('contacts', page_size=args.page_size, prefetch=args.prefetch,
+                                       records=args.records):
+                count += 1
+            return count
+
+        def bulk_write():
+            contacts = ({'email': u'contact%d@example.com' % n, 'firstName': u'Updated'}
+                        for n in xrange(args.contacts))
+            return len(client.upsert_contacts(contacts, chunk_size=args.chunk_size,
+                                              concurrency=args.concurrency))
+
+        functions = {'single': single, 'batch': batch, 'paginated': paginated, 'bulk-write': bulk_write}
+        results = [run_workload(client, name, functions[name]) for name in args.workloads]
+    finally:
+        process.terminate()
+
+    if args.json:
+        print json.dumps(results, indent=2)
+        return
+
+    print '%-12s %8s %8s %10s %10s %11s %9s %9s %10s' % ('workload', 'calls', 'errors', 'calls/s',
+            'requests/s', 'items/s', 'p50 ms', 'p99 ms', 'memory MB')
+    for result in results:
+        print '%(workload)-12s %(calls)8d %(errors)8d %(calls_per_second)10.1f %(requests_per_second)10.1f ' \
+              '%(items_per_second)11.1f %(p50_ms)9.2f %(p99_ms)9.2f %(memory_mb)10.1f' % result
+
+if __name__ == '__main__':
+    main()
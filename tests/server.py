@@ -0,0 +1,479 @@
+# -*- coding: utf-8 -*-
+
+"""
+Fake iContact API Server
+========================
+Local stand-in for iContact API, used by offline tests and benchmarks.
+Resources are routed like in L{IContactClient}, and responses have the shapes
+the client expects. Data is kept in memory for a single account and client folder.
+
+Run standalone with: python -m icontact.tests.server [--port 8000] [--latency 0.05]
+"""
+
+import BaseHTTPServer
+import SocketServer
+import collections
+import csv
+import re
+import socket
+import StringIO
+import threading
+import time
+import urlparse
+try:
+    import json
+except ImportError:
+    import simplejson as json
+
+import icontact
+from icontact.resources import RESOURCES
+
+
+__all__ = ['FakeIContactServer']
+
+# ID fields of items which don't follow '<item key>Id' naming
+ID_FIELDS = {
+    'client-folders': 'clientFolderId',
+    'customfields': 'customFieldId',
+    'segment-criteria': 'criterionId',
+}
+
+class FakeIContactServer(object):
+    """
+    Fake iContact API Server
+    ========================
+    Threaded HTTP server implementing iContact API resources in memory:
+     - GET, POST, PUT and DELETE of collection items, with limit/offset paging,
+       'field:asc|desc' ordering, and equality filters on item fields
+     - bulk POST of contacts (upserted by email) and subscriptions
+     - contact imports through uploads and upload-data resources
+     - request limit answered with "503 Service Unavailable", and fixed latency
+    """
+
+    def __init__(self, latency=0.0, per_minute=60, account_id='1000', clientfolder_id='2000',
+                 host='127.0.0.1', port=0):
+        """Initialize server
+
+        @type latency: float
+        @keyword latency: (optional) Seconds added to every response. Default is 0.
+
+        @type per_minute: int
+        @keyword per_minute: (optional) Requests allowed in any 60 seconds, further requests
+                             get "503 Service Unavailable". None disables the limit. Default is 60.
+
+        @type account_id: str
+        @keyword account_id: (optional) Account ID. Default is '1000'.
+
+        @type clientfolder_id: str
+        @keyword clientfolder_id: (optional) Client folder ID. Default is '2000'.
+
+        @type host: str
+        @keyword host: (optional) Listening address. Default is '127.0.0.1'.
+
+        @type port: int
+        @keyword port: (optional) Listening port, 0 picks a free port. Default is 0.
+        """
+        self.latency = latency
+        self.per_minute = per_minute
+        self.account_id = str(account_id)
+        self.clientfolder_id = str(clientfolder_id)
+
+        # Number of handled requests, and number of requests refused by the request limit
+        self.requests = 0
+        self.throttled = 0
+
+        # Number of upcoming requests which are handled, but answered by closing the connection
+        self.drop_responses = 0
+
+        self._lock = threading.Lock()
+        self._recent = collections.deque()
+        self._ids = iter(xrange(1, 2 ** 62))
+        self._collections = dict()
+
+        # Contact IDs by lowercase email address
+        self._emails = dict()
+        self._routes = self._compile_routes()
+
+        self._server = _HTTPServer((host, port), _Handler)
+        self._server.fake = self
+        self._thread = None
+
+        self.seed('accounts', [{'accountId': self.account_id, 'accountType': 1, 'enabled': 1}])
+        self.seed('client-folders', [{'clientFolderId': self.clientfolder_id, 'name': 'Default'}])
+
+    @property
+    def base_url(self):
+        """API base URL of the server"""
+        return 'http://%s:%d/icp' % self._server.server_address[:2]
+
+    def start(self):
+        """Starts serving in a background thread
+
+        @rtype: str
+        @return: API base URL
+        """
+        self._thread = threading.Thread(target=self.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+
+        return self.base_url
+
+    def serve_forever(self):
+        """Serves in the calling thread until L{FakeIContactServer.stop} is called"""
+        self._server.serve_forever(0.1)
+
+    def stop(self):
+        """Stops serving"""
+        self._server.shutdown()
+        self._server.server_close()
+        self._server.close_connections()
+
+    def client(self, **kwargs):
+        """Returns client of the server
+
+        @type kwargs: dict
+        @keyword kwargs: Other arguments of L{IContactClient}
+
+        @rtype: L{IContactClient}
+        @return: Client
+        """
+        client_class = kwargs.pop('client_class', icontact.IContactClient)
+        return client_class('user', 'app', 'password', base_url=self.base_url,
+                            account_id=self.account_id, clientfolder_id=self.clientfolder_id, **kwargs)
+
+    def seed(self, resource, items, parent_ids=()):
+        """Stores items of a resource
+
+        @type resource: str
+        @keyword resource: Resource name
+
+        @type items: list
+        @keyword items: Items, IDs are assigned to items without them
+
+        @type parent_ids: tuple
+        @keyword parent_ids: (optional) IDs of the parent items of nested resources,
+                             e.g. message ID for message-opens
+
+        @rtype: list
+        @return: Stored items
+        """
+        with self._lock:
+            return [self._store(resource, tuple(parent_ids), dict(item)) for item in items]
+
+    def items(self, resource, parent_ids=()):
+        """Returns stored items of a resource
+
+        @rtype: list
+        @return: Items
+        """
+        with self._lock:
+            return self._collection(resource, tuple(parent_ids)).values()
+
+    def handle(self, method, path, query, body):
+        """Handles a request
+
+        @rtype: tuple
+        @return: (HTTP status code, response)
+        """
+        if self.latency:
+            time.sleep(self.latency)
+
+        with self._lock:
+            self.requests += 1
+
+            if self.per_minute != None:
+                now = time.time()
+                while self._recent and (self._recent[0] <= now - 60):
+                    self._recent.popleft()
+
+                if len(self._recent) >= self.per_minute:
+                    self.throttled += 1
+                    return 503, {'errors': ['Service Unavailable. Request limit exceeded.']}
+                self._recent.append(now)
+
+            route = self._route(path)
+            if route == None:
+                return 404, {'errors': ['Resource not found']}
+
+            resource, parent_ids, item_id = route
+            params = dict((k, v[-1]) for (k, v) in urlparse.parse_qs(query).items())
+
+            try:
+                if resource == 'time':
+                    return 200, {'time': time.strftime('%Y-%m-%dT%H:%M:%S+00:00', time.gmtime()),
+                                 'timestamp': int(time.time())}
+
+                if resource == 'upload-data':
+                    return self._upload_data(method, parent_ids[0], body)
+
+                data = json.loads(body) if body else None
+
+                if item_id:
+                    return self._handle_item(method, resource, parent_ids, item_id, data)
+                return self._handle_collection(method, resource, parent_ids, params, data)
+            except ValueError, exc:
+                return 400, {'errors': [unicode(exc)]}
+
+    def _drop_response(self):
+        """Returns True if the response of a handled request is to be dropped"""
+        with self._lock:
+            if self.drop_responses > 0:
+                self.drop_responses -= 1
+                return True
+            return False
+
+    def _compile_routes(self):
+        """Returns list of (path regular expression, resource, item ID in path flag)"""
+        routes = []
+
+        for resource in RESOURCES.values():
+            path = re.escape(resource.path.replace('{account}', self.account_id) \
+                                          .replace('{folder}', self.clientfolder_id))
+            pattern = '^/icp' + path.replace(re.escape('%s'), '([^/]*)') + '$'
+            routes.append((re.compile(pattern), resource.name, resource.path.endswith('%s')))
+
+        # Longer paths are more specific
+        routes.sort(key=lambda route: -len(route[0].pattern))
+
+        return routes
+
+    def _route(self, path):
+        """Returns (resource, parent IDs, item ID) of a request path, or None"""
+        for (pattern, resource, item_in_path) in self._routes:
+            match = pattern.match(path)
+            if match == None:
+                continue
+
+            ids = match.groups()
+            if item_in_path:
+                return resource, ids[:-1], ids[-1]
+            return resource, ids, None
+
+        return None
+
+    def _id_field(self, resource):
+        """Returns name of the ID field of resource items"""
+        if resource in ID_FIELDS:
+            return ID_FIELDS[resource]
+        return '%sId' % RESOURCES[resource].item_key
+
+    def _collection(self, resource, parent_ids):
+        """Returns items of a resource by ID"""
+        return self._collections.setdefault((resource, parent_ids), collections.OrderedDict())
+
+    def _store(self, resource, parent_ids, item):
+        """Stores item, assigning ID and create date. Contacts are upserted by email."""
+        items = self._collection(resource, parent_ids)
+        id_field = self._id_field(resource)
+        now = time.strftime('%Y-%m-%d %H:%M:%S')
+
+        if resource == 'contacts' and item.get('email') and not item.get(id_field):
+            existing = items.get(self._emails.get(item['email'].lower()))
+            if (existing != None) and (existing.get('email') or '').lower() == item['email'].lower():
+                existing.update(item)
+                return existing
+
+        if resource == 'subscriptions':
+            item[id_field] = u'%s_%s' % (item.get('listId'), item.get('contactId'))
+            item.setdefault('status', u'normal')
+            item.setdefault('addDate', now)
+        elif not item.get(id_field):
+            item[id_field] = unicode(next(self._ids))
+
+        if resource == 'contacts':
+            item.setdefault('status', u'normal')
+            item.setdefault('createDate', now)
+
+        item[id_field] = unicode(item[id_field])
+        items[item[id_field]] = item
+
+        if resource == 'contacts':
+            self._index_email(item)
+
+        return item
+
+    def _index_email(self, contact):
+        """Indexes contact by email address"""
+        if contact.get('email'):
+            self._emails[contact['email'].lower()] = contact['contactId']
+
+    def _handle_collection(self, method, resource, parent_ids, params, data):
+        """Handles a call without item ID"""
+        collection_key = RESOURCES[resource].collection_key
+
+        if method == 'GET':
+            items = self._collection(resource, parent_ids).values()
+
+            for (field, value) in params.items():
+                if (field in ('limit', 'offset', 'orderby')) or (value == 'total'):
+                    continue
+                items = [item for item in items if unicode(item.get(field)) == value]
+
+            if 'orderby' in params:
+                field, _, direction = params['orderby'].partition(':')
+                items.sort(key=lambda item: item.get(field), reverse=(direction == 'desc'))
+
+            offset = int(params.get('offset', 0))
+            limit = int(params.get('limit', 20))
+
+            return 200, {collection_key: items[offset:offset + limit], 'total': len(items),
+                         'limit': limit, 'offset': offset}
+
+        if method == 'POST':
+            if isinstance(data, dict):
+                data = data.get(collection_key, data.get(RESOURCES[resource].item_key, data))
+            if isinstance(data, dict):
+                data = [data]
+            if not isinstance(data, list):
+                raise ValueError("No items in request")
+
+            stored = [dict(self._store(resource, parent_ids, dict(item))) for item in data]
+
+            return 200, {collection_key: stored, 'warnings': []}
+
+        return 405, {'errors': ['Method not allowed']}
+
+    def _handle_item(self, method, resource, parent_ids, item_id, data):
+        """Handles a call with item ID"""
+        items = self._collection(resource, parent_ids)
+        item = items.get(item_id)
+        item_key = RESOURCES[resource].item_key
+
+        if item == None:
+            return 404, {'errors': ['Item not found']}
+
+        if method == 'GET':
+            return 200, {item_key: item}
+
+        if method in ('POST', 'PUT'):
+            if isinstance(data, dict):
+                data = data.get(item_key, data)
+            if not isinstance(data, dict):
+                raise ValueError("No item in request")
+
+            if method == 'PUT':
+                item.clear()
+                item[self._id_field(resource)] = item_id
+            item.update(data)
+
+            if resource == 'contacts':
+                self._index_email(item)
+
+            return 200, {item_key: item}
+
+        del items[item_id]
+        return 200, {}
+
+    def _upload_data(self, method, upload_id, body):
+        """Imports contacts uploaded as CSV"""
+        upload = self._collection('uploads', ()).get(upload_id)
+
+        if upload == None:
+            return 404, {'errors': ['Upload not found']}
+        if method != 'PUT':
+            return 405, {'errors': ['Method not allowed']}
+
+        count = 0
+        for row in csv.DictReader(StringIO.StringIO(body)):
+            contact = self._store('contacts', (), dict((k, v.decode('utf-8')) for (k, v) in row.items()))
+            for list_id in upload.get('lists') or []:
+                self._store('subscriptions', (), {'contactId': contact['contactId'], 'listId': unicode(list_id)})
+            count += 1
+
+        upload['status'] = u'complete'
+        upload['contactsImported'] = count
+
+        return 200, {'uploadId': upload_id}
+
+class _Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+    """Request handler of L{FakeIContactServer}"""
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def handle_request(self):
+        url = urlparse.urlparse(self.path)
+
+        if not self.headers.get('API-AppId'):
+            code, response = 401, {'errors': ['Not authorized']}
+        else:
+            code, response = self.server.fake.handle(self.command, url.path, url.query, self._read_body())
+
+        if self.server.fake._drop_response():
+            self.close_connection = 1
+            return
+
+        body = json.dumps(response)
+
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = do_POST = do_PUT = do_DELETE = handle_request
+
+    def _read_body(self):
+        """Reads request body, sent with Content-Length or chunked transfer encoding"""
+        if self.headers.get('Transfer-Encoding', '').lower() == 'chunked':
+            chunks = []
+            while True:
+                size = int(self.rfile.readline().split(';')[0], 16)
+                if size == 0:
+                    # Skip trailers
+                    while self.rfile.readline().strip():
+                        pass
+                    return ''.join(chunks)
+                chunks.append(self.rfile.read(size))
+                self.rfile.readline()
+
+        length = int(self.headers.get('Content-Length') or 0)
+        if length:
+            return self.rfile.read(length)
+        return ''
+
+class _HTTPServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    request_queue_size = 128
+
+    def __init__(self, *args, **kwargs):
+        BaseHTTPServer.HTTPServer.__init__(self, *args, **kwargs)
+        self.connections = set()
+
+    def process_request(self, request, client_address):
+        self.connections.add(request)
+        SocketServer.ThreadingMixIn.process_request(self, request, client_address)
+
+    def shutdown_request(self, request):
+        self.connections.discard(request)
+        BaseHTTPServer.HTTPServer.shutdown_request(self, request)
+
+    def close_connections(self):
+        """Closes open keep-alive connections, so their handler threads end"""
+        for request in list(self.connections):
+            try:
+                request.shutdown(socket.SHUT_RDWR)
+            except socket.error:
+                pass
+
+    def handle_error(self, request, client_address):
+        # Clients drop keep-alive connections at any time
+        pass
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Fake iContact API server')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--per-minute', type=int, default=60)
+    args = parser.parse_args()
+
+    server = FakeIContactServer(latency=args.latency, per_minute=args.per_minute or None, port=args.port)
+    print "Serving iContact API at %s (account %s, client folder %s)" % (server.base_url,
+            server.account_id, server.clientfolder_id)
+    server.serve_forever()
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+
+from icontact.tests import *
+
+class ResponseCacheTests(TestCase):
+    """
+        Tests for response cache
+        ========================
+    """
+
+    def test_lru(self):
+        """
+            Test that cached responses are copied and least recently used ones are evicted
+        """
+        cache = icontact.ResponseCache(max_entries=2, ttls={'lists': 60})
+
+        keys = [cache.make_key('https://example.com/lists/%d' % i, {}) for i in range(3)]
+        cache.set('lists', keys[0], {'list': {'listId': 0}})
+        cache.set('lists', keys[1], {'list': {'listId': 1}})
+
+        response = cache.get(keys[0])
+        response['list']['listId'] = 10
+        assert_equal(cache.get(keys[0]), {'list': {'listId': 0}})
+
+        cache.set('lists', keys[2], {'list': {'listId': 2}})
+        assert_equal(cache.get(keys[1]), None)
+
+        stats = cache.stats()
+        nprint(stats)
+
+        assert_equal(stats['size'], 2)
+        assert_equal(stats['hits'], 2)
+        assert_equal(stats['misses'], 1)
+        assert_equal(stats['evictions'], 1)
+
+    def test_ttl(self):
+        """
+            Test per-resource time to live and invalidation
+        """
+        cache = icontact.ResponseCache(ttls={'lists': 60, 'customfields': -1})
+
+        lists_key = cache.make_key('https://example.com/lists', {'limit': 10, 'offset': 0})
+        assert_equal(lists_key, cache.make_key('https://example.com/lists', {'offset': 0, 'limit': 10}))
+
+        customfields_key = cache.make_key('https://example.com/customfields', {})
+        contacts_key = cache.make_key('https://example.com/contacts', {})
+
+        cache.set('lists', lists_key, {'lists': []})
+        cache.set('customfields', customfields_key, {'customfields': []})
+        cache.set('contacts', contacts_key, {'contacts': []})
+
+        assert_equal(cache.get(lists_key), {'lists': []})
+        assert_equal(cache.get(customfields_key), None)
+        assert_equal(cache.get(contacts_key), None)
+
+        cache.invalidate('lists')
+        assert_equal(cache.get(lists_key), None)
+        assert_equal(cache.stats()['invalidations'], 1)
+
+    def test_client_hit(self):
+        """
+            Test that client GET calls are answered from the cache
+        """
+        cache = icontact.ResponseCache()
+        client = icontact.IContactClient(base_url='http://127.0.0.1:9', account_id=1,
+                                         clientfolder_id=2, cache=cache)
+
+        key = cache.make_key(client._get_resource_url('lists'), {})
+        cache.set('lists', key, {'lists': [{'listId': '1'}]})
+
+        assert_equal(client.get('lists'), {'lists': [{'listId': '1'}]})
+        assert_equal(client.cache_stats()['hits'], 1)
@@ -692,6 +692,149 @@ class ClientTests(TestCase):
         for contact in response['contacts'][:300]:
             ic_client.get('contacts', [contact['contactId']])
 
+    def test_batch_call(self):
+        """
+            Test batch call
+        """
+
+        ic_client = get_ic_client()
+
+        response = ic_client.get('contacts')
+        contact_ids = [contact['contactId'] for contact in response['contacts'][:300]]
+
+        responses = ic_client.map('GET', 'contacts', contact_ids)
+
+        assert_equal(len(responses), len(contact_ids))
+        for contact_id, response in zip(contact_ids, responses):
+            assert_equal(response['contact']['contactId'], contact_id)
+
+        responses = ic_client.batch([
+            ('GET', 'time'),
+            ('GET', 'accounts', [ICONTACT_SETTINGS['account_id']]),
+            ('GET', 'subscriptions', ['0_0']),
+        ])
+        nprint(responses)
+
+        assert_true('time' in responses[0])
+        assert_equal(responses[1]['account']['accountId'], ICONTACT_SETTINGS['account_id'])
+        assert_true(isinstance(responses[2], icontact.NotFound))
+
+    def test_async_call(self):
+        """
+            Test asynchronous client calls
+        """
+
+        ic_client = icontact.AsyncIContactClient(max_concurrency=5, **ICONTACT_SETTINGS)
+
+        time_future = ic_client.get('time')
+        accounts_future = ic_client.get('accounts', [ICONTACT_SETTINGS['account_id']])
+        not_found_future = ic_client.get('subscriptions', ['0_0'])
+
+        assert_equal(ic_client.pending(), 3)
+
+        ic_client.wait([time_future, accounts_future, not_found_future])
+
+        assert_true('time' in time_future.result())
+        assert_equal(accounts_future.result()['account']['accountId'], ICONTACT_SETTINGS['account_id'])
+        assert_true(isinstance(not_found_future.exception(), icontact.NotFound))
+        assert_equal(ic_client.pending(), 0)
+
+    def test_iter_call(self):
+        """
+            Test paginated iteration
+        """
+
+        ic_client = get_ic_client()
+
+        params = {
+            'orderby': 'contactId:asc',
+            'limit': 25,
+        }
+        response = ic_client.get('contacts', params=params)
+
+        contacts = list(ic_client.iter('contacts', params={'orderby': 'contactId:asc'}, page_size=10))
+
+        assert_true(len(contacts) >= len(response['contacts']))
+        assert_equal([contact['contactId'] for contact in contacts[:25]],
+                     [contact['contactId'] for contact in response['contacts']])
+
+        prefetched_contacts = list(ic_client.iter('contacts', params={'orderby': 'contactId:asc'},
+                                                  page_size=10, prefetch=3))
+
+        assert_equal([contact['contactId'] for contact in prefetched_contacts],
+                     [contact['contactId'] for contact in contacts])
+
+        streamed_contacts = list(ic_client.iter('contacts', params={'orderby': 'contactId:asc'},
+                                                page_size=10, stream=True))
+
+        assert_equal([contact['contactId'] for contact in streamed_contacts],
+                     [contact['contactId'] for contact in contacts])
+
+        streamed_contacts = list(ic_client.stream('contacts', params=params))
+
+        assert_equal(streamed_contacts, response['contacts'])
+
+    def test_upsert_contacts_call(self):
+        """
+            Test bulk contacts upsert
+        """
+
+        ic_client = get_ic_client()
+
+        contacts = [contact.copy() for contact in test_contacts] + [{'email': u'not an email'}]
+
+        results = ic_client.upsert_contacts(iter(contacts), chunk_size=2, concurrency=2)
+        nprint(results)
+
+        assert_equal(len(results), len(contacts))
+        for index, result in enumerate(results[:-1]):
+            assert_true(result.succeeded)
+            assert_equal(result.index, index)
+            assert_equal(result.item['email'], contacts[index]['email'])
+            assert_true(result.contact_id)
+        assert_true(not results[-1].succeeded)
+
+        for result in results[:-1]:
+            response = ic_client.delete('contacts', [result.contact_id])
+            assert_true(response == [])
+
+    def test_subscribe_call(self):
+        """
+            Test bulk subscriptions
+        """
+
+        ic_client = get_ic_client()
+
+        results = ic_client.upsert_contacts([contact.copy() for contact in test_contacts])
+        contact_ids = [result.contact_id for result in results]
+
+        list_ids = []
+        for tl_id in [1, 2]:
+            params = {
+                'list': test_lists[tl_id].copy()
+            }
+            response = ic_client.post('lists', params=params)
+            list_ids.append(unicode(response['lists'][0]['listId']))
+
+        results = ic_client.subscribe(contact_ids=contact_ids + contact_ids[:1], list_ids=list_ids,
+                                      chunk_size=2)
+        nprint(results)
+
+        assert_equal(len(results), len(contact_ids) * len(list_ids))
+        for result in results:
+            assert_true(result.succeeded)
+            assert_equal(unicode(result.item['subscriptionId']),
+                         u'%s_%s' % (result.row['listId'], result.row['contactId']))
+            assert_equal(result.item['status'], u'normal')
+
+        for list_id in list_ids:
+            response = ic_client.delete('lists', [list_id])
+            assert_true(response == [])
+
+        for contact_id in contact_ids:
+            response = ic_client.delete('contacts', [contact_id])
+            assert_true(response == [])
+
 """
 iContact API calls tests status
 ===============================
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+
+import threading
+import time
+
+from icontact.tests import *
+from icontact.tests.server import FakeIContactServer
+
+class SingleFlightTests(TestCase):
+    """
+        Tests for request coalescing
+        ============================
+    """
+
+    def _run(self, single_flight, function, count=5):
+        """Calls function concurrently from count threads, returns results"""
+        results = [None] * count
+
+        def call(index):
+            try:
+                results[index] = single_flight.do(('GET', 'lists', '{}'), function)
+            except Exception, exc:
+                results[index] = exc
+
+        threads = [threading.Thread(target=call, args=(i,)) for i in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        return results
+
+    def test_coalesce(self):
+        """
+            Test that concurrent identical calls are performed once
+        """
+        single_flight = icontact.SingleFlight()
+        calls = []
+
+        def function():
+            calls.append(1)
+            time.sleep(0.2)
+            return {'lists': []}
+
+        results = self._run(single_flight, function)
+        nprint(single_flight.stats())
+
+        assert_equal(len(calls), 1)
+        assert_equal(results, [{'lists': []}] * 5)
+        assert_equal(len(set(id(result) for result in results)), 5)
+        assert_equal(single_flight.stats(), {'calls': 1, 'coalesced': 4, 'in_flight': 0})
+
+    def test_exception(self):
+        """
+            Test that exception of the call is raised in all callers
+        """
+        single_flight = icontact.SingleFlight()
+
+        def function():
+            time.sleep(0.2)
+            raise icontact.ServiceUnavailable('GET', 'lists', message='busy')
+
+        results = self._run(single_flight, function)
+
+        assert_true(all(isinstance(result, icontact.ServiceUnavailable) for result in results))
+        assert_equal(single_flight.stats()['calls'], 1)
+
+    def test_deadline(self):
+        """
+            Test that callers waiting for the call in flight give up when their deadline expires
+        """
+        server = FakeIContactServer(latency=0.5, per_minute=None)
+        server.start()
+
+        try:
+            single_flight = icontact.SingleFlight()
+            client = server.client(single_flight=single_flight)
+            leader = threading.Thread(target=client.get, args=('time',))
+            leader.start()
+            time.sleep(0.1)
+
+            start = time.time()
+            try:
+                client.get('time', deadline=0.1)
+            except icontact.DeadlineExceeded, e:
+                nprint(e.message)
+                assert_equal(e.deadline, 0.1)
+            else:
+                assert_true(False, "DeadlineExceeded not raised")
+            assert_true(time.time() - start < 0.2)
+
+            leader.join()
+            assert_equal(server.requests, 1)
+            assert_equal(single_flight.stats(), {'calls': 1, 'coalesced': 1, 'in_flight': 0})
+        finally:
+            server.stop()
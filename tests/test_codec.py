@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+
+from icontact.tests import *
+
+class JSONCodecTests(TestCase):
+    """
+        Tests for JSON codecs
+        =====================
+    """
+
+    def test_codecs(self):
+        """
+            Test that all available codecs produce the same results
+        """
+        data = {'contact': [{'email': u'jürgen@example.com', 'url': 'http://example.com/', 'score': 0.1234567891234}]}
+
+        for name in icontact.codec.CODECS:
+            codec = icontact.get_codec(name)
+            nprint(codec)
+
+            assert_equal(codec.decode(codec.encode(data)), data)
+            assert_equal(codec.decode(codec.encode(data)), icontact.get_codec('json').decode(codec.encode(data)))
+            assert_true('\\/' not in codec.encode(data))
+
+        self.assertRaises(ValueError, icontact.get_codec, 'missing')
+
+    def test_numbers(self):
+        """
+            Test that all available codecs encode and decode numbers like json module
+        """
+        data = {'ratio': 1 / 3.0, 'big': 2 ** 70, 'small': 1e-7}
+
+        for name in icontact.codec.CODECS:
+            codec = icontact.get_codec(name)
+
+            assert_equal(codec.encode(data), icontact.get_codec('json').encode(data))
+            assert_equal(codec.decode(codec.encode(data)), data)
+            assert_equal(codec.decode('[12345678901234567890123, 1e400]'), [12345678901234567890123, float('inf')])
+            self.assertRaises(ValueError, codec.decode, '{"time": ')
+
+    def test_response_buffer(self):
+        """
+            Test that response buffer joins chunks
+        """
+        response_buffer = icontact.ResponseBuffer()
+
+        response_buffer.write('{"time": ')
+        response_buffer.write('"now"}')
+        assert_equal(response_buffer.getvalue(), '{"time": "now"}')
+        assert_equal(response_buffer.getvalue(), '{"time": "now"}')
+
+        response_buffer.truncate(0)
+        assert_equal(response_buffer.getvalue(), '')
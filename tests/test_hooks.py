@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+
+import logging
+
+from icontact.tests import *
+
+class HookTests(TestCase):
+    """
+        Tests for request lifecycle hooks
+        =================================
+    """
+
+    def _client(self, events):
+        """Returns client of an unreachable API recording hook events"""
+        client = icontact.IContactClient(base_url='http://127.0.0.1:9', account_id=1, clientfolder_id=2,
+                                         retry_policy=icontact.RetryPolicy(max_attempts=2, backoff_base=0.01))
+
+        client.add_hook(icontact.BEFORE_REQUEST, lambda meta: events.append(('before', meta.attempts)))
+        client.add_hook(icontact.ON_RETRY, lambda meta, delay: events.append(('retry', meta.attempts)))
+        client.add_hook(icontact.ON_ERROR, lambda meta: events.append(('error', meta.error.__class__)))
+        client.add_hook(icontact.AFTER_RESPONSE, lambda meta: events.append(('response', meta.http_code)))
+
+        return client
+
+    def test_request_hooks(self):
+        """
+            Test hook events of a failing call
+        """
+        events = []
+        client = self._client(events)
+
+        self.assertRaises(icontact.TransportError, client.get, 'time')
+        nprint(events)
+
+        assert_equal(events, [('before', 1), ('retry', 1), ('before', 2),
+                              ('error', icontact.TransportError)])
+
+    def test_batch_hooks(self):
+        """
+            Test hook events of a failing call performed by a cURL multi runner
+        """
+        events = []
+        client = self._client(events)
+
+        client.batch([('GET', 'time')])
+
+        assert_equal(events, [('before', 1), ('retry', 1), ('before', 2),
+                              ('error', icontact.TransportError)])
+
+    def test_slow_call_log(self):
+        """
+            Test that slow calls are logged
+        """
+        records = []
+
+        class Handler(logging.Handler):
+            def emit(self, record):
+                records.append(record.getMessage())
+
+        logger = logging.getLogger('icontact.tests.slow')
+        logger.addHandler(Handler())
+
+        client = self._client([])
+        client.log_slow_calls(threshold=0, logger=logger)
+
+        self.assertRaises(icontact.TransportError, client.get, 'time')
+        nprint(records)
+
+        assert_equal(len(records), 1)
+        assert_true(records[0].startswith(u"Slow GET call to 'http://127.0.0.1:9/time'"))
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+
+from icontact.tests import *
+from icontact.tests.server import FakeIContactServer
+
+class MetricsRegistryTests(TestCase):
+    """
+        Tests for metrics registry
+        ==========================
+    """
+
+    def test_render(self):
+        """
+            Test that recorded calls are rendered in Prometheus text format
+        """
+        metrics = icontact.MetricsRegistry(buckets=(0.1, 1.0))
+
+        meta = icontact.RequestMeta('GET', 'contacts')
+        meta.http_code = 503
+        meta.attempts = 2
+        meta.retried_codes = [503]
+        meta.elapsed = 0.5
+        meta.error = icontact.ServiceUnavailable('GET', 'url')
+        metrics.record_meta(meta)
+
+        snapshot = metrics.snapshot()
+        assert_equal(snapshot['retries_total'],
+                     [{'labels': {'resource': 'contacts', 'method': 'GET', 'code': '503'}, 'value': 1}])
+
+        text = metrics.render()
+        nprint(text)
+
+        assert_true('# TYPE icontact_request_duration_seconds histogram\n' in text)
+        assert_true('icontact_request_duration_seconds_bucket{le="0.1",method="GET",resource="contacts"} 0\n' in text)
+        assert_true('icontact_request_duration_seconds_bucket{le="1.0",method="GET",resource="contacts"} 1\n' in text)
+        assert_true('icontact_request_duration_seconds_bucket{le="+Inf",method="GET",resource="contacts"} 1\n' in text)
+        assert_true('icontact_requests_total{code="503",method="GET",resource="contacts"} 1\n' in text)
+        assert_true('icontact_errors_total{exception="ServiceUnavailable",method="GET",resource="contacts"} 1\n' in text)
+
+    def test_shared_registry(self):
+        """
+            Test that objects shared by clients of a registry are reported once, and that closed
+            clients are removed from it
+        """
+        server = FakeIContactServer(per_minute=None)
+        server.start()
+
+        try:
+            metrics = icontact.MetricsRegistry()
+            cache = icontact.ResponseCache(ttls={'time': 60})
+            rate_limiter = icontact.RateLimiter()
+
+            clients = [server.client(metrics=metrics, cache=cache, rate_limiter=rate_limiter,
+                                     transport=icontact.HTTPLibTransport())
+                       for i in range(2)]
+            for client in clients:
+                client.get('time')
+
+            text = metrics.render()
+            nprint(text)
+
+            lines = text.splitlines()
+            assert_equal(len(lines), len(set(lines)))
+            assert_true('icontact_cache_hits_total 1\n' in text)
+            assert_true('icontact_cache_misses_total 1\n' in text)
+            assert_true('icontact_quota_remaining{bucket="minute"} 59\n' in text)
+            assert_true('icontact_pool_connections{state="idle"} 1\n' in text)
+
+            clients[0].close()
+            assert_true('icontact_cache_size 1\n' in metrics.render())
+
+            clients[1].close()
+            assert_true('cache_size' not in metrics.render())
+        finally:
+            server.stop()
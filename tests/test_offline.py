@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+
+from icontact.tests import *
+from icontact.tests.server import FakeIContactServer
+
+class NestedCollectionTests(TestCase):
+    """
+        Tests for calls of nested collections against the fake server
+        =============================================================
+    """
+
+    def setUp(self):
+        self.server = FakeIContactServer(per_minute=None)
+        self.server.start()
+        self.client = self.server.client()
+
+        self.opens = self.server.seed('message-opens', [{'contactId': unicode(i), 'viewCount': 1}
+                                                        for i in range(7)], ['55'])
+        self.actions = self.server.seed('contact-history', [{'actionType': u'subscribe'},
+                                                            {'actionType': u'unsubscribe'}], ['9'])
+
+    def tearDown(self):
+        self.client.close()
+        self.server.stop()
+
+    def test_get(self):
+        """
+            Test that calls of a nested collection expect the collection key
+        """
+        response = self.client.get('message-opens', ['55'])
+        assert_equal(response['opens'], self.opens)
+
+        response = self.client.get('contact-history', ['9'])
+        assert_equal(response['actions'], self.actions)
+
+        # Item of a collection whose path ends with its ID still expects the item key
+        contact = self.server.seed('contacts', [{'email': u'item@example.com'}])[0]
+        assert_equal(self.client.get('contacts', [contact['contactId']])['contact'], contact)
+
+    def test_iter(self):
+        """
+            Test iteration over pages of a nested collection
+        """
+        assert_equal(list(self.client.iter('message-opens', ['55'], page_size=3)), self.opens)
+        assert_equal(list(self.client.iter('contact-history', ['9'])), self.actions)
+        assert_equal(list(self.client.iter('message-opens', ['56'])), [])
+
+    def test_iter_prefetch(self):
+        """
+            Test iteration over pages of a nested collection read ahead concurrently
+        """
+        if not icontact.lazy.module_available('pycurl'):
+            return
+
+        items = list(self.client.iter('message-opens', ['55'], page_size=2, prefetch=2))
+        assert_equal(items, self.opens)
+        assert_equal(self.server.requests, 4)
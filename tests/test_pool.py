@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+
+from icontact.tests import *
+
+class CurlPoolTests(TestCase):
+    """
+        Tests for cURL handle pool
+        ==========================
+    """
+
+    def test_reuse(self):
+        """
+            Test that released handles are reused
+        """
+        pool = icontact.CurlPool()
+
+        curl = pool.acquire()
+        pool.release(curl)
+        assert_true(pool.acquire() is curl)
+
+        stats = pool.stats()
+        nprint(stats)
+
+        assert_equal(stats['created'], 1)
+        assert_equal(stats['reused'], 1)
+        assert_equal(stats['in_use'], 1)
+        assert_equal(stats['size'], 1)
+
+    def test_discard(self):
+        """
+            Test that failed handles and handles over max_size are closed
+        """
+        pool = icontact.CurlPool(max_size=1)
+
+        curl_a = pool.acquire()
+        curl_b = pool.acquire()
+        curl_c = pool.acquire()
+        pool.release(curl_a, reuse=False)
+        pool.release(curl_b)
+        pool.release(curl_c)
+
+        stats = pool.stats()
+        nprint(stats)
+
+        assert_equal(stats['discarded'], 2)
+        assert_equal(stats['idle'], 1)
+        assert_true(pool.acquire() is curl_b)
+
+    def test_expire(self):
+        """
+            Test that idle handles expire
+        """
+        pool = icontact.CurlPool(max_idle_time=0)
+
+        curl = pool.acquire()
+        pool.release(curl)
+
+        stats = pool.stats()
+        nprint(stats)
+
+        assert_equal(stats['expired'], 1)
+        assert_equal(stats['size'], 0)
+        assert_true(pool.acquire() is not curl)
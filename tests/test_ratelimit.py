@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+
+import os
+import tempfile
+import time
+
+from icontact.tests import *
+from icontact.tests.server import FakeIContactServer
+
+class RateLimiterTests(TestCase):
+    """
+        Tests for client-side rate limiting
+        ===================================
+    """
+
+    def test_token_bucket(self):
+        """
+            Test token bucket refill
+        """
+        now = time.time()
+
+        bucket = icontact.TokenBucket(60, 60)
+        bucket.take(60, now)
+
+        assert_equal(bucket.remaining(now), 0)
+        assert_equal(bucket.wait_time(1, now), 1.0)
+        assert_equal(bucket.remaining(now + 30), 30)
+        assert_equal(bucket.remaining(now + 3600), 60)
+
+    def test_sliding_window(self):
+        """
+            Test that a sliding window allows at most capacity requests in any period
+        """
+        now = 1000.0
+
+        window = icontact.SlidingWindow(60, 60, resolution=1)
+        window.take(30, now)
+        window.take(30, now + 30)
+
+        assert_equal(window.remaining(now + 30), 0)
+
+        # Requests are counted until period after the end of their slot
+        assert_equal(window.wait_time(1, now + 30), 31.0)
+        assert_equal(window.remaining(now + 61), 30)
+        assert_equal(window.wait_time(31, now + 61), 30.0)
+        assert_equal(window.reset_time(now + 61), 30.0)
+        assert_equal(window.remaining(now + 91), 60)
+
+    def test_raise_mode(self):
+        """
+            Test that RateLimitExceeded is raised when a limit is reached
+        """
+        rate_limiter = icontact.RateLimiter(per_minute=3, per_day=100, mode=icontact.RateLimiter.RAISE)
+
+        for i in range(3):
+            rate_limiter.acquire()
+
+        try:
+            rate_limiter.acquire()
+        except Exception, e:
+            assert_true(isinstance(e, icontact.RateLimitExceeded))
+            # The first request leaves the window after a minute
+            assert_true(60 < e.retry_after <= 60 + icontact.ratelimit.WINDOW_MARGIN + 0.2)
+        else:
+            assert_true(False, "RateLimitExceeded not raised")
+
+        remaining = rate_limiter.remaining()
+        nprint(remaining)
+
+        assert_equal(remaining['minute']['remaining'], 0)
+        assert_equal(remaining['day']['remaining'], 97)
+
+    def test_block_mode(self):
+        """
+            Test that callers wait until requests are within the limit
+        """
+        backend = icontact.LocalQuotaBackend()
+        rate_limiter = icontact.RateLimiter(per_minute=10, per_day=None, backend=backend)
+
+        # 10 requests have been sent 0.3 seconds before the window (with its margin) ends
+        sent = time.time() + 0.3 - 60 - icontact.ratelimit.WINDOW_MARGIN
+        backend.update('default', lambda states: ({'minute': [[sent, 10]]}, None))
+
+        start = time.time()
+        for i in range(10):
+            rate_limiter.acquire()
+
+        assert_true(time.time() - start >= 0.25)
+        assert_equal(rate_limiter.remaining()['minute']['remaining'], 0)
+        assert_true('day' not in rate_limiter.remaining())
+
+    def test_block_timeout(self):
+        """
+            Test that callers don't wait for a limit which wouldn't allow the request within the timeout
+        """
+        rate_limiter = icontact.RateLimiter(per_minute=2, per_day=None)
+
+        assert_true(rate_limiter.acquire(timeout=0.1))
+        assert_true(rate_limiter.acquire(timeout=0.1))
+
+        start = time.time()
+        assert_equal(rate_limiter.acquire(timeout=0.1), False)
+        assert_true(time.time() - start < 0.1)
+        assert_equal(rate_limiter.remaining()['minute']['remaining'], 0)
+
+    def test_file_backend(self):
+        """
+            Test that rate limiters sharing a file backend share their limits
+        """
+        (fd, path) = tempfile.mkstemp()
+        os.close(fd)
+
+        try:
+            backend = icontact.FileQuotaBackend(path)
+            rate_limiters = [icontact.RateLimiter(per_minute=10, mode=icontact.RateLimiter.RAISE,
+                                                  backend=backend, key='account')
+                             for i in range(3)]
+
+            sent = 0
+            for i in range(10):
+                for rate_limiter in rate_limiters:
+                    try:
+                        rate_limiter.acquire()
+                        sent += 1
+                    except icontact.RateLimitExceeded:
+                        pass
+
+            assert_equal(sent, 10)
+            assert_equal(rate_limiters[0].remaining()['day']['remaining'], 5990)
+        finally:
+            os.remove(path)
+
+    def test_request_limit(self):
+        """
+            Test that requests paced by the rate limiter don't exceed the API request limit
+        """
+        server = FakeIContactServer(per_minute=60)
+        server.start()
+
+        try:
+            client = server.client(rate_limiter=icontact.RateLimiter(mode=icontact.RateLimiter.RAISE),
+                                   retry_policy=icontact.RetryPolicy(max_attempts=1))
+
+            sent = 0
+            for i in range(66):
+                # Requests over the limit are still refused a second later
+                if i == 60:
+                    time.sleep(1.5)
+
+                try:
+                    client.get('time')
+                    sent += 1
+                except icontact.RateLimitExceeded:
+                    pass
+
+            assert_equal(sent, 60)
+            assert_equal(server.throttled, 0)
+        finally:
+            server.stop()
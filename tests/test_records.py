@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+
+import pickle
+
+from icontact.tests import *
+
+class RecordTests(TestCase):
+    """
+        Tests for compact records
+        =========================
+    """
+
+    def test_access(self):
+        """
+            Test dictionary-like access to records
+        """
+        factory = icontact.RecordFactory()
+        contact = {u'contactId': u'1', u'email': u'a@example.com', u'status': u'normal'}
+        record = factory.make(contact)
+        nprint(record)
+
+        assert_equal(record['email'], u'a@example.com')
+        assert_equal(record.email, u'a@example.com')
+        assert_equal(record.get('firstName', u''), u'')
+        assert_true('status' in record)
+        assert_equal(sorted(record.keys()), ['contactId', 'email', 'status'])
+        assert_equal(record, contact)
+        assert_equal(record.to_dict(), contact)
+        assert_equal(pickle.loads(pickle.dumps(record)), contact)
+
+        self.assertRaises(KeyError, lambda: record['firstName'])
+        self.assertRaises(AttributeError, lambda: record.firstName)
+
+    def test_interning(self):
+        """
+            Test that field names and repeated values are shared
+        """
+        factory = icontact.RecordFactory()
+        records = list(factory.iter([{u'email': u'a@example.com', u'status': u'norm' + u'al'},
+                                     {u'email': u'b@example.com', u'status': u'nor' + u'mal'}]))
+
+        assert_true(type(records[0]) is type(records[1]))
+        assert_true(records[0]['status'] is records[1]['status'])
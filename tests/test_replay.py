@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+
+import StringIO
+
+from icontact.tests import *
+from icontact.tests.server import FakeIContactServer
+
+class ReplayTests(TestCase):
+    """
+        Tests for recording and replaying API traffic
+        =============================================
+    """
+
+    def setUp(self):
+        self.server = FakeIContactServer(per_minute=None)
+        self.server.start()
+
+        self.log = StringIO.StringIO()
+        client = self.server.client(transport=icontact.RecordingTransport(self.log))
+
+        self.contact = client.post('contacts', params={'contact': {'email': u'replay@example.com'}})
+        self.contacts = list(client.iter('contacts', page_size=1, prefetch=2))
+        self.missing = client.batch([('GET', 'contacts', [self.contact['contacts'][0]['contactId']]),
+                                     ('GET', 'contacts', ['12345'])])[1]
+        client._transport.close()
+
+        self.log.seek(0)
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_replay_transport(self):
+        """
+            Test that replayed calls get the recorded responses without network
+        """
+        self.server.stop()
+        transport = icontact.ReplayTransport(self.log, speed=None)
+        nprint(transport.entries)
+
+        client = self.server.client(transport=transport)
+
+        assert_equal(client.post('contacts', params={'contact': {'email': u'replay@example.com'}}),
+                     self.contact)
+        assert_equal(list(client.iter('contacts', page_size=1)), self.contacts)
+        self.assertRaises(icontact.NotFound, client.get, 'contacts', ['12345'])
+        assert_equal(transport.missed, 0)
+
+    def test_replay_calls(self):
+        """
+            Test that recorded calls are repeated against a replay transport
+        """
+        transport = icontact.ReplayTransport(self.log, speed=None)
+        self.log.seek(0)
+
+        client = self.server.client(transport=transport)
+        summary = icontact.replay_calls(client, self.log, speed=None)
+        nprint(summary)
+
+        assert_equal(summary['calls'], len(transport.entries))
+        assert_equal(summary['errors'], 1)
+        assert_equal(transport.served, len(transport.entries))
+
+    def test_replay_calls_async(self):
+        """
+            Test that recorded calls are repeated, and their errors counted, by the asynchronous client
+        """
+        if not icontact.lazy.module_available('pycurl'):
+            return
+
+        requests = self.server.requests
+        client = self.server.client(client_class=icontact.AsyncIContactClient)
+        summary = icontact.replay_calls(client, self.log, speed=None)
+        client.close()
+        nprint(summary)
+
+        assert_equal(summary['errors'], 1)
+        assert_equal(self.server.requests - requests, summary['calls'])
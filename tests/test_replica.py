@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+
+import threading
+
+from icontact.tests import *
+
+class FakeClient(object):
+    """Client returning collections from memory, newest items first if ordered"""
+
+    def __init__(self):
+        self.contacts = [
+            {'contactId': '1', 'email': 'Alice@example.com', 'status': 'normal', 'createDate': '2014-01-01 10:00:00'},
+            {'contactId': '2', 'email': 'bob@example.com', 'status': 'unsubscribed', 'createDate': '2014-01-02 10:00:00'},
+        ]
+        self.lists = [{'listId': '10', 'name': 'News'}]
+        self.subscriptions = [
+            {'contactId': '1', 'listId': '10', 'status': 'normal', 'addDate': '2014-01-01 10:00:00'},
+            {'contactId': '2', 'listId': '10', 'status': 'unsubscribed', 'addDate': '2014-01-02 10:00:00'},
+        ]
+        # Number of returned items by resource, and function called before every item is returned
+        self.returned = dict()
+        self.on_item = None
+
+    def iter(self, resource, params=dict(), page_size=500, verbose=False):
+        items = getattr(self, resource)
+        if 'orderby' in params:
+            field = params['orderby'].split(':')[0]
+            items = sorted(items, key=lambda item: item[field], reverse=True)
+
+        for item in items:
+            if self.on_item != None:
+                self.on_item(resource, item)
+            self.returned[resource] = self.returned.get(resource, 0) + 1
+            yield item
+
+class LocalReplicaTests(TestCase):
+    """
+        Tests for local replica
+        =======================
+    """
+
+    def test_seed(self):
+        """
+            Test lookups answered from the seeded replica
+        """
+        replica = icontact.LocalReplica(FakeClient())
+
+        counts = replica.seed()
+        nprint(counts)
+        assert_equal(counts, {'contacts': 2, 'lists': 1, 'subscriptions': 2})
+
+        assert_equal(replica.get_contact_id('alice@EXAMPLE.com'), '1')
+        assert_equal(replica.find_contact('bob@example.com')['contactId'], '2')
+        assert_equal(replica.get_contact_id('carol@example.com'), None)
+        assert_equal(replica.get_list(10)['name'], 'News')
+        assert_equal(replica.contact_lists(1), ['10'])
+        assert_equal(replica.contact_lists(2), [])
+        assert_equal(sorted(replica.list_contacts(10, status=None)), ['1', '2'])
+        assert_equal(len(replica.contacts(status='normal')), 1)
+
+    def test_sync(self):
+        """
+            Test that sync requests only items created since the last sync
+        """
+        client = FakeClient()
+        replica = icontact.LocalReplica(client)
+        replica.seed()
+
+        client.contacts.append({'contactId': '3', 'email': 'carol@example.com', 'status': 'normal',
+                                'createDate': '2014-01-03 10:00:00'})
+        client.returned = dict()
+
+        counts = replica.sync()
+        nprint(counts)
+
+        assert_equal(replica.get_contact_id('carol@example.com'), '3')
+        assert_equal(counts['contacts'], 2)
+        assert_true(replica.synced('contacts') != None)
+
+        # Reading of contacts stops at the first one created before the watermark
+        assert_equal(client.returned['contacts'], 3)
+
+    def test_sync_subscriptions(self):
+        """
+            Test that sync picks up unsubscribes and removed subscriptions
+        """
+        client = FakeClient()
+        replica = icontact.LocalReplica(client)
+        replica.seed()
+
+        client.subscriptions[0] = dict(client.subscriptions[0], status='unsubscribed')
+        del client.subscriptions[1]
+        client.lists.append({'listId': '11', 'name': 'Offers'})
+
+        counts = replica.sync()
+        nprint(counts)
+
+        assert_equal(replica.contact_lists(1), [])
+        assert_equal(replica.contact_lists(1, status='unsubscribed'), ['10'])
+        assert_equal(replica.get_subscription(2, 10), None)
+        assert_equal(len(replica.lists()), 2)
+
+    def test_lookups_during_seed(self):
+        """
+            Test that lookups are answered from the previous copy while the replica is being seeded
+        """
+        client = FakeClient()
+        replica = icontact.LocalReplica(client)
+        replica.seed()
+
+        client.contacts[0] = dict(client.contacts[0], email='alice@example.org')
+        answers = []
+
+        def lookup(resource, item):
+            thread = threading.Thread(target=lambda: answers.append(replica.get_contact_id('alice@example.com')))
+            thread.start()
+            thread.join(1)
+
+        client.on_item = lookup
+        replica.seed()
+
+        assert_equal(answers, ['1'] * 5)
+        assert_equal(replica.get_contact_id('alice@example.com'), None)
+        assert_equal(replica.get_contact_id('alice@example.org'), '1')
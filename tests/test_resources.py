@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+
+from icontact.tests import *
+
+class ResourceRegistryTests(TestCase):
+    """
+        Tests for resource registry
+        ===========================
+    """
+
+    def setUp(self):
+        self.client = icontact.IContactClient(base_url='https://app.icontact.com/icp', account_id=1,
+                                              clientfolder_id=2)
+
+    def test_routes(self):
+        """
+            Test resource URLs and expected response keys
+        """
+        assert_equal(self.client._get_resource_url('contacts'),
+                     'https://app.icontact.com/icp/a/1/c/2/contacts/')
+        assert_equal(self.client._get_resource_url('segment-criteria', [3, 4]),
+                     'https://app.icontact.com/icp/a/1/c/2/segments/3/criteria/4')
+        assert_equal(self.client._get_resource_url('time'), 'https://app.icontact.com/icp/time')
+
+        assert_equal(self.client._get_expected_response_key('GET', 'contacts'), 'contacts')
+        assert_equal(self.client._get_expected_response_key('GET', 'contacts', [5]), 'contact')
+        assert_equal(self.client._get_expected_response_key('DELETE', 'contacts', [5]), None)
+
+    def test_register(self):
+        """
+            Test that registered resources are routed
+        """
+        self.client.register_resource(icontact.Resource('tags', '/a/{account}/c/{folder}/tags/%s',
+                                                        'tags', 'tag'))
+
+        assert_equal(self.client._get_resource_url('tags', [7]),
+                     'https://app.icontact.com/icp/a/1/c/2/tags/7')
+        assert_equal(self.client._get_expected_response_key('GET', 'tags', [7]), 'tag')
+
+    def test_status_exceptions(self):
+        """
+            Test that HTTP status codes are mapped to exceptions
+        """
+        self.assertRaises(icontact.NotFound, self.client._process_response,
+                          'GET', 'url', 'contacts', [5], 404, '{"errors": ["Not found"]}')
+        self.assertRaises(icontact.UnknownError, self.client._process_response,
+                          'GET', 'url', 'contacts', [5], 418, '{}')
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+
+from icontact.tests import *
+
+class RetryPolicyTests(TestCase):
+    """
+        Tests for retry policy
+        ======================
+    """
+
+    def test_backoff(self):
+        """
+            Test exponential backoff and attempt limit
+        """
+        policy = icontact.RetryPolicy(max_attempts=4, backoff_base=1.0, backoff_max=3.0, jitter=False)
+
+        assert_equal(policy.get_delay('GET', 1, 0, http_code=503), 1.0)
+        assert_equal(policy.get_delay('GET', 2, 0, http_code=503), 2.0)
+        assert_equal(policy.get_delay('GET', 3, 0, http_code=503), 3.0)
+        assert_equal(policy.get_delay('GET', 4, 0, http_code=503), None)
+
+    def test_retried_failures(self):
+        """
+            Test which failures are retried
+        """
+        policy = icontact.RetryPolicy(jitter=False)
+
+        assert_equal(policy.get_delay('GET', 1, 0, http_code=200), None)
+        assert_equal(policy.get_delay('GET', 1, 0, http_code=404), None)
+        assert_equal(policy.get_delay('GET', 1, 0, http_code=500), 1.0)
+        assert_equal(policy.get_delay('GET', 1, 0, transport_error=True), 1.0)
+        assert_equal(policy.get_delay('POST', 1, 0, http_code=503), 1.0)
+        assert_equal(policy.get_delay('POST', 1, 0, http_code=500), None)
+        assert_equal(policy.get_delay('POST', 1, 0, transport_error=True), None)
+
+    def test_limits(self):
+        """
+            Test Retry-After, total time limit and retry budget
+        """
+        policy = icontact.RetryPolicy(jitter=False, max_total_time=10,
+                                      budget=icontact.RetryBudget(ratio=0.5, capacity=1))
+
+        assert_equal(policy.get_delay('GET', 1, 9.5, http_code=503), None)
+        assert_equal(policy.get_delay('GET', 1, 0, http_code=503, retry_after='5'), 5.0)
+        assert_equal(policy.get_delay('GET', 1, 0, http_code=503), None)
+
+        policy.record_request()
+        policy.record_request()
+
+        assert_equal(policy.get_delay('GET', 1, 0, http_code=503), 1.0)
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+
+from icontact.tests import *
+from icontact.tests.server import FakeIContactServer
+
+from data import *
+
+class FakeServerTests(TestCase):
+    """
+        Tests of the client against the fake iContact API server
+        ========================================================
+    """
+
+    def setUp(self):
+        self.server = FakeIContactServer(per_minute=None)
+        self.server.start()
+        self.client = self.server.client()
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_crud(self):
+        """
+            Test adding, reading, updating and deleting a contact
+        """
+        contact = self.client.post('contacts', params={'contact': test_contacts[0]})['contacts'][0]
+        nprint(contact)
+
+        contact_id = contact['contactId']
+        assert_equal(self.client.get('contacts', [contact_id])['contact']['email'], test_contacts[0]['email'])
+
+        self.client.post('contacts', [contact_id], params={'firstName': u'Changed'})
+        assert_equal(self.client.get('contacts', [contact_id])['contact']['firstName'], u'Changed')
+
+        self.client.delete('contacts', [contact_id])
+        self.assertRaises(icontact.NotFound, self.client.get, 'contacts', [contact_id])
+
+    def test_bulk_and_paging(self):
+        """
+            Test bulk upsert of contacts and reading them page by page
+        """
+        contacts = [{'email': u'bulk%d@example.com' % n} for n in range(25)]
+
+        results = self.client.upsert_contacts(contacts, chunk_size=10, concurrency=2)
+        assert_true(all(result.succeeded for result in results))
+
+        # Contacts are matched by email address
+        self.client.upsert_contacts(contacts[:5])
+
+        emails = [contact['email'] for contact in self.client.iter('contacts', page_size=7, prefetch=1)]
+        assert_equal(sorted(emails), sorted(contact['email'] for contact in contacts))
+
+    def test_import(self):
+        """
+            Test importing contacts through an upload
+        """
+        list_id = self.client.post('lists', params={'list': test_lists[0]})['lists'][0]['listId']
+
+        upload = self.client.import_contacts(iter(test_contacts), list_ids=[list_id],
+                                             fieldnames=['email', 'firstName', 'lastName'], poll_interval=0.01)
+        nprint(upload)
+
+        assert_equal(upload['status'], 'complete')
+        assert_equal(len(self.server.items('subscriptions')), len(test_contacts))
+
+    def test_request_limit(self):
+        """
+            Test that requests over the limit get "503 Service Unavailable"
+        """
+        self.server.per_minute = 2
+        client = self.server.client(retry_policy=icontact.RetryPolicy(max_attempts=1))
+
+        client.get('time')
+        client.get('time')
+        self.assertRaises(icontact.ServiceUnavailable, client.get, 'time')
+        assert_equal(self.server.throttled, 1)
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+
+try:
+    import json
+except ImportError:
+    import simplejson as json
+
+from icontact.tests import *
+
+from data import *
+
+class JSONArrayStreamTests(TestCase):
+    """
+        Tests for incremental JSON decoding
+        ===================================
+    """
+
+    def test_chunks(self):
+        """
+            Test decoding of a response split into chunks of any size
+        """
+        response = {
+            'contacts': [dict(contact, contactId=i) for (i, contact) in enumerate(test_contacts)],
+            'limit': 20,
+            'total': len(test_contacts),
+        }
+        data = json.dumps(response, indent=1)
+
+        for chunk_size in range(1, 30):
+            parser = icontact.JSONArrayStream('contacts')
+
+            items = []
+            for i in range(0, len(data), chunk_size):
+                items.extend(parser.feed(data[i:i + chunk_size]))
+            items.extend(parser.close())
+
+            assert_true(parser.found)
+            assert_equal(items, response['contacts'])
+            assert_equal(parser.fields, {'limit': 20, 'total': len(test_contacts)})
+
+    def test_missing_key(self):
+        """
+            Test decoding of a response without the array
+        """
+        parser = icontact.JSONArrayStream('contacts')
+
+        assert_equal(parser.feed('{"errors": ["Not Found"]}'), [])
+        assert_equal(parser.close(), [])
+        assert_true(not parser.found)
+        assert_equal(parser.fields, {'errors': ['Not Found']})
+
+    def test_incomplete(self):
+        """
+            Test that incomplete response raises ValueError
+        """
+        parser = icontact.JSONArrayStream('contacts')
+
+        assert_equal(parser.feed('{"contacts": [{"contactId": 1}, {"contactId": 2'), [{'contactId': 1}])
+
+        try:
+            parser.close()
+        except ValueError:
+            pass
+        else:
+            assert_true(False, "ValueError not raised")
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+
+import time
+
+from icontact.tests import *
+from icontact.tests.server import FakeIContactServer
+
+class TimeoutTests(TestCase):
+    """
+        Tests for request timeouts and call deadlines
+        =============================================
+    """
+
+    def setUp(self):
+        self.server = FakeIContactServer(latency=0.3, per_minute=None)
+        self.server.start()
+
+    def tearDown(self):
+        self.server.stop()
+
+    def clients(self, **kwargs):
+        """Returns clients using every transport"""
+        return [self.server.client(transport=icontact.get_transport(name), **kwargs)
+                for name in sorted(icontact.transport.TRANSPORTS)
+                if icontact.lazy.module_available('pycurl') or (name != 'curl')]
+
+    def test_timeout(self):
+        """
+            Test that requests slower than the timeout fail with TransportError
+        """
+        for client in self.clients(timeout=0.1, retry_policy=icontact.RetryPolicy(max_attempts=1)):
+            start = time.time()
+            self.assertRaises(icontact.TransportError, client.get, 'time')
+            assert_true(time.time() - start < 0.25)
+
+            # Timeout of the call overrides the timeout of the client
+            assert_true('time' in client.get('time', timeout=1))
+
+    def test_deadline(self):
+        """
+            Test that calls which can't be completed in time fail with DeadlineExceeded
+        """
+        retry_policy = icontact.RetryPolicy(backoff_base=0.05, jitter=False)
+
+        for client in self.clients(retry_policy=retry_policy):
+            start = time.time()
+            try:
+                client.get('time', deadline=0.2)
+            except icontact.DeadlineExceeded, e:
+                nprint(e.message)
+                assert_equal(e.deadline, 0.2)
+            else:
+                assert_true(False, "DeadlineExceeded not raised")
+            assert_true(time.time() - start < 0.25)
+
+            assert_true('time' in client.get('time', deadline=1))
+
+            # Calls of a batch have their own deadlines
+            results = client.batch([('GET', 'time', None, dict(), None, 0.1), ('GET', 'time')])
+            assert_true(isinstance(results[0], icontact.DeadlineExceeded))
+            assert_true('time' in results[1])
+
+    def test_deadline_retries(self):
+        """
+            Test that backoff sleeps which would outlast the deadline aren't waited for
+        """
+        self.server.latency = 0.0
+        self.server.per_minute = 1
+
+        client = self.server.client(retry_policy=icontact.RetryPolicy(backoff_base=1.0, jitter=False))
+        client.get('time')
+
+        start = time.time()
+        self.assertRaises(icontact.DeadlineExceeded, client.get, 'time', deadline=0.5)
+        assert_true(time.time() - start < 0.25)
+        assert_equal(client.last_meta().attempts, 1)
+
+    def test_deadline_rate_limit(self):
+        """
+            Test that rate limit waits which would outlast the deadline aren't waited for
+        """
+        self.server.latency = 0.0
+
+        client = self.server.client(rate_limiter=icontact.RateLimiter(per_minute=1, per_day=None))
+        client.get('time')
+
+        start = time.time()
+        self.assertRaises(icontact.DeadlineExceeded, client.get, 'time', deadline=1)
+        assert_true(time.time() - start < 0.25)
+
+    def test_async_timeout(self):
+        """
+            Test that timeouts given to the asynchronous client limit its requests
+        """
+        if not icontact.lazy.module_available('pycurl'):
+            return
+
+        client = self.server.client(client_class=icontact.AsyncIContactClient, timeout=0.1,
+                                    retry_policy=icontact.RetryPolicy(max_attempts=1))
+        try:
+            start = time.time()
+            self.assertRaises(icontact.TransportError, client.get('time').result)
+            assert_true(time.time() - start < 0.25)
+
+            assert_true('time' in client.get('time', timeout=1).result())
+        finally:
+            client.close()
+
+    def test_batch_retry_handle(self):
+        """
+            Test that calls of a batch are retried on a new handle after a transport error
+        """
+        if not icontact.lazy.module_available('pycurl'):
+            return
+
+        pool = icontact.CurlPool()
+        client = self.server.client(pool=pool, timeout=0.1,
+                                    retry_policy=icontact.RetryPolicy(max_attempts=2, backoff_base=0.01,
+                                                                      jitter=False))
+
+        results = client.batch([('GET', 'time')])
+        assert_true(isinstance(results[0], icontact.TransportError))
+
+        stats = pool.stats()
+        nprint(stats)
+
+        assert_equal(stats['created'], 2)
+        assert_equal(stats['discarded'], 2)
+        assert_equal(stats['in_use'], 0)
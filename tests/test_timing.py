@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+
+from icontact.tests import *
+
+class RequestMetaTests(TestCase):
+    """
+        Tests for request timing metadata
+        =================================
+    """
+
+    def test_failed_call(self):
+        """
+            Test that metadata of a failed call is reported to listeners
+        """
+        client = icontact.IContactClient(base_url='http://127.0.0.1:9', account_id=1, clientfolder_id=2,
+                                         retry_policy=icontact.RetryPolicy(max_attempts=2, backoff_base=0.01))
+        metas = []
+        client.add_meta_listener(metas.append)
+
+        self.assertRaises(icontact.TransportError, client.get, 'time')
+
+        meta = client.last_meta()
+        nprint(meta.to_dict())
+
+        assert_equal(metas, [meta])
+        assert_equal(meta.url, 'http://127.0.0.1:9/time')
+        assert_equal(meta.attempts, 2)
+        assert_equal(meta.retries, 1)
+        assert_true(meta.retry_wait <= 0.01)
+        assert_true(meta.elapsed >= meta.retry_wait)
+        assert_true(isinstance(meta.error, icontact.TransportError))
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+
+import os
+import subprocess
+import sys
+
+from icontact.tests import *
+from icontact.tests.server import FakeIContactServer
+
+from data import *
+
+class HTTPLibTransportTests(TestCase):
+    """
+        Tests for the standard library transport
+        ========================================
+    """
+
+    def setUp(self):
+        self.server = FakeIContactServer(per_minute=None)
+        self.server.start()
+        self.transport = icontact.HTTPLibTransport()
+        self.client = self.server.client(transport=self.transport)
+
+    def tearDown(self):
+        self.transport.close()
+        self.server.stop()
+
+    def test_calls(self):
+        """
+            Test calls, streamed calls and uploads over kept-alive connections
+        """
+        contacts = self.client.post('contacts', params={'contact': test_contacts})['contacts']
+        assert_equal(len(contacts), len(test_contacts))
+
+        contact_id = contacts[0]['contactId']
+        assert_equal(self.client.get('contacts', [contact_id])['contact']['email'], test_contacts[0]['email'])
+        self.assertRaises(icontact.NotFound, self.client.get, 'contacts', ['12345'])
+
+        streamed = list(self.client.stream('contacts', params={'limit': 100}))
+        assert_equal([contact['contactId'] for contact in streamed],
+                     [contact['contactId'] for contact in contacts])
+
+        upload = self.client.import_contacts(iter([{'email': u'upload@example.com'}]), fieldnames=['email'],
+                                             poll_interval=0.01)
+        assert_equal(upload['status'], 'complete')
+
+        stats = self.client.pool_stats()
+        nprint(stats)
+
+        # Uploads are sent over new connections
+        assert_equal(stats['created'], 2)
+        assert_equal(stats['in_use'], 0)
+
+    def test_stale_connection(self):
+        """
+            Test that a request failing on a connection closed while idle is resent on a new one
+        """
+        self.client.get('time')
+        self.server.stop()
+
+        self.server = FakeIContactServer(per_minute=None, port=self.server._server.server_address[1])
+        self.server.start()
+
+        self.client.get('time')
+        assert_equal(self.client.pool_stats()['created'], 2)
+
+    def test_dropped_response(self):
+        """
+            Test that only idempotent requests are resent after a reused connection fails once sent
+        """
+        client = self.server.client(transport=self.transport, retry_policy=icontact.RetryPolicy(max_attempts=1))
+        client.get('time')
+
+        self.server.drop_responses = 1
+        assert_true('time' in client.get('time'))
+        assert_equal(self.server.requests, 3)
+
+        # The server has handled the POST, sending it again would create another contact
+        self.server.drop_responses = 1
+        self.assertRaises(icontact.TransportError, client.post, 'contacts',
+                          params={'contact': test_contacts[:1]})
+        assert_equal(self.server.requests, 4)
+        assert_equal(len(self.server.items('contacts')), 1)
+
+class LazyImportTests(TestCase):
+    """
+        =================================
+        ================================
+    """
+
+    def test_import(self):
+        """
+            Test that importing the package and creating a client doesn't import pycurl
+        """
+        path = os.path.dirname(os.path.dirname(os.path.abspath(icontact.__file__)))
+        script = "import sys, icontact; icontact.IContactClient(); print 'pycurl' in sys.modules"
+
+        output = subprocess.check_output([sys.executable, '-c', script], cwd=path)
+        assert_equal(output.strip(), 'False')
+
+    def test_import_stdlib(self):
+        """
+            Test that importing the package doesn't import modules only needed by some features
+        """
+        path = os.path.dirname(os.path.dirname(os.path.abspath(icontact.__file__)))
+        modules = ['httplib', 'email.utils', 'ujson', 'sqlite3', 'gzip', 'csv']
+        script = "import sys, icontact; print [m for m in %r if m in sys.modules]" % modules
+
+        output = subprocess.check_output([sys.executable, '-c', script], cwd=path)
+        assert_equal(output.strip(), '[]')
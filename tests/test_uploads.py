@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+
+import csv
+import StringIO
+
+from icontact.tests import *
+from icontact.tests.server import FakeIContactServer
+
+from data import *
+
+class CSVStreamTests(TestCase):
+    """
+        Tests for CSV upload stream
+        ===========================
+    """
+
+    def test_dict_rows(self):
+        """
+            Test streaming of dictionary rows in small chunks
+        """
+        fieldnames = ['email', 'firstName', 'lastName']
+        stream = icontact.CSVStream(iter(test_contacts), fieldnames)
+
+        data = ''
+        while True:
+            chunk = stream.read(7)
+            if not chunk:
+                break
+            assert_true(len(chunk) <= 7)
+            data += chunk
+
+        rows = list(csv.DictReader(StringIO.StringIO(data)))
+
+        assert_equal(len(rows), len(test_contacts))
+        for row, contact in zip(rows, test_contacts):
+            for field in fieldnames:
+                assert_equal(row[field].decode('utf-8'), contact[field])
+
+    def test_sequence_rows(self):
+        """
+            Test streaming of sequence rows
+        """
+        stream = icontact.CSVStream([['email'], [u'jos\xe9@example.com']])
+
+        assert_equal(stream.read(), 'email\r\njos\xc3\xa9@example.com\r\n')
+        assert_equal(stream.read(), '')
+
+class ImportTests(TestCase):
+    """
+        Tests for contact imports through uploads
+        =========================================
+    """
+
+    def test_async_client(self):
+        """
+            Test that the asynchronous client imports contacts with synchronous calls
+        """
+        if not icontact.lazy.module_available('pycurl'):
+            return
+
+        server = FakeIContactServer(per_minute=None)
+        server.start()
+
+        try:
+            client = server.client(client_class=icontact.AsyncIContactClient)
+            upload = client.import_contacts(iter(test_contacts), fieldnames=['email', 'firstName', 'lastName'],
+                                            poll_interval=0.01)
+            client.close()
+
+            assert_equal(upload['status'], 'complete')
+            assert_equal(len(server.items('contacts')), len(test_contacts))
+        finally:
+            server.stop()
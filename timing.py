@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+
+"""
+iContact API Client Request Timing
+==================================
+Metadata of performed API calls: where the time went, sizes and retries
+"""
+
+import time
+from lazy import LazyModule
+
+# pycurl is imported when first used
+pycurl = LazyModule('pycurl')
+
+
+__all__ = ['RequestMeta']
+
+class RequestMeta(object):
+    """
+    Request Metadata
+    ================
+    Timings and sizes of an API call. cURL timings are those of the last attempt,
+    in seconds since the start of the attempt:
+     - namelookup_time : DNS lookup completed
+     - connect_time : TCP connection established
+     - appconnect_time : TLS handshake completed (0 for plain HTTP or a reused connection)
+     - starttransfer_time : first response byte received, i.e. includes server think-time
+     - total_time : response received completely
+
+    rate_limit_wait and retry_wait are the seconds spent waiting for the rate limiter and
+    between retries over all attempts, and elapsed is the wall time of the whole call.
+    retried_codes are the HTTP status codes of the attempts which have been retried.
+    """
+    __slots__ = ('http_method', 'resource', 'url', 'http_code', 'attempts', 'started', 'elapsed',
+                 'namelookup_time', 'connect_time', 'appconnect_time', 'starttransfer_time',
+                 'total_time', 'bytes_sent', 'bytes_received', 'rate_limit_wait', 'retry_wait',
+                 'retried_codes', 'error')
+
+    def __init__(self, http_method, resource, url=None):
+        """Initialize metadata of a call started now
+
+        @type http_method: str
+        @keyword http_method: HTTP method
+
+        @type resource: str
+        @keyword resource: iContact API resource name
+
+        @type url: str
+        @keyword url: (optional) Resource URL
+        """
+        self.http_method = http_method
+        self.resource = resource
+        self.url = url
+        self.http_code = None
+        self.attempts = 0
+        self.started = time.time()
+        self.elapsed = 0.0
+
+        self.namelookup_time = 0.0
+        self.connect_time = 0.0
+        self.appconnect_time = 0.0
+        self.starttransfer_time = 0.0
+        self.total_time = 0.0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+        self.rate_limit_wait = 0.0
+        self.retry_wait = 0.0
+
+        # HTTP status codes of the retried attempts, None for transport errors
+        self.retried_codes = []
+
+        # Exception raised by the call, None if it has succeeded
+        self.error = None
+
+    @property
+    def retries(self):
+        """Number of retries"""
+        return max(self.attempts - 1, 0)
+
+    def read_curl(self, curl):
+        """Reads timings and sizes of a performed attempt from cURL handle
+
+        @type curl: pycurl.Curl
+        @keyword curl: cURL handle
+        """
+        getinfo = curl.getinfo
+
+        self.http_code = getinfo(pycurl.HTTP_CODE) or None
+        self.namelookup_time = getinfo(pycurl.NAMELOOKUP_TIME)
+        self.connect_time = getinfo(pycurl.CONNECT_TIME)
+        self.appconnect_time = getinfo(pycurl.APPCONNECT_TIME)
+        self.starttransfer_time = getinfo(pycurl.STARTTRANSFER_TIME)
+        self.total_time = getinfo(pycurl.TOTAL_TIME)
+        self.bytes_sent = int(getinfo(pycurl.SIZE_UPLOAD))
+        self.bytes_received = int(getinfo(pycurl.SIZE_DOWNLOAD))
+
+    def to_dict(self):
+        """Returns dictionary of the metadata, with 'retries' and the error message
+
+        @rtype: dict
+        @return: Metadata
+        """
+        data = dict((name, getattr(self, name)) for name in self.__slots__)
+        data['retries'] = self.retries
+        if self.error != None:
+            data['error'] = self.error.message
+
+        return data
+
+    def __repr__(self):
+        return '<RequestMeta %s %s %s: %.3fs, %d attempt(s)>' % (self.http_method, self.resource,
+                self.http_code, self.elapsed, self.attempts)
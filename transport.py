@@ -0,0 +1,759 @@
+# -*- coding: utf-8 -*-
+
+"""
+iContact API Client Transports
+==============================
+HTTP layer performing single attempts of API calls, with cURL or with the standard library
+"""
+
+import collections
+import functools
+import math
+import threading
+import time
+
+from exceptions import TransportError
+from pool import CurlPool
+from multi import CurlMultiRunner
+from codec import ResponseBuffer
+from lazy import LazyModule, module_available
+
+pycurl = LazyModule('pycurl')
+httplib = LazyModule('httplib')
+socket = LazyModule('socket')
+urlparse = LazyModule('urlparse')
+
+
+__all__ = ['HTTPRequest', 'HTTPResponse', 'Transport', 'CurlTransport', 'HTTPLibTransport',
+           'get_transport']
+
+# Maximum size of body chunks read and sent by the transports
+CHUNK_SIZE = 64 * 1024
+
+class HTTPRequest(object):
+    """
+    HTTP Request
+    ============
+    Request of an API call. Besides the HTTP method, URL, headers and body, a request
+    carries the API call it has been made for (resource name, resource IDs and parameters)
+    and timeouts of its attempt, in seconds (None for no limit):
+     - connect_timeout : maximum time of establishing the connection
+     - timeout : maximum time of the whole attempt, until the response has been received
+     - stall_timeout : maximum time without any data being sent or received
+    """
+    __slots__ = ('method', 'url', 'headers', 'body', 'resource', 'resource_ids', 'params',
+                 'connect_timeout', 'timeout', 'stall_timeout')
+
+    def __init__(self, method, url, headers, body=None, resource=None, resource_ids=None, params=None,
+                 connect_timeout=None, timeout=None, stall_timeout=None):
+        self.method = method
+        self.url = url
+        self.headers = headers
+        self.body = body
+        self.resource = resource
+        self.resource_ids = resource_ids
+        self.params = params
+        self.connect_timeout = connect_timeout
+        self.timeout = timeout
+        self.stall_timeout = stall_timeout
+
+class HTTPResponse(object):
+    """
+    HTTP Response
+    =============
+    Status code, headers (with lowercase names) and body of a received response.
+    The body of a streamed response is an iterator of body chunks.
+    """
+    __slots__ = ('code', 'headers', 'body')
+
+    def __init__(self, code, headers, body):
+        self.code = code
+        self.headers = headers
+        self.body = body
+
+class Transport(object):
+    """
+    Transport
+    =========
+    Base class of transports. A transport performs single attempts of API calls
+    (L{Transport.perform}, L{Transport.stream} and L{Transport.upload}) and manages its
+    connections (L{Transport.stats}, L{Transport.close}); retries, rate limiting, caching
+    and response processing are done by the client. Transports must be thread-safe, and
+    fail with L{TransportError} when a timeout of the request expires.
+
+    Calls of L{IContactClient.batch} and read-ahead pages of L{IContactClient.iter}
+    are performed concurrently with cURL multi interface only if the transport supports it
+    (see L{Transport.multi}), otherwise they are performed one by one through the transport.
+    """
+
+    # True if the transport performs requests with cURL handles of its pool, so that
+    # cURL multi interface can be used for concurrent calls
+    multi = False
+
+    # Pool of cURL handles, if the transport uses cURL
+    pool = None
+
+    def perform(self, request, meta, verbose=False):
+        """Performs request
+
+        @type request: L{HTTPRequest}
+        @keyword request: Request
+
+        @type meta: L{RequestMeta}
+        @keyword meta: Metadata of the call, updated with status code, timings and sizes
+
+        @type verbose: bool
+        @keyword verbose: (optional) Specifies if verbose output should be used. Default is False.
+
+        @raise TransportError: Raises TransportError if no response has been received.
+
+        @rtype: L{HTTPResponse}
+        @return: Response
+        """
+        raise NotImplementedError
+
+    def stream(self, request, meta, verbose=False):
+        """Performs request, returning the response as soon as its status and headers have
+        been received. By default the whole response is received first.
+
+        The body of the returned response is an iterator of body chunks, which must be
+        consumed or closed. It raises L{TransportError} if the transfer fails.
+
+        See L{Transport.perform} for the description of parameters.
+
+        @rtype: L{HTTPResponse}
+        @return: Response
+        """
+        response = self.perform(request, meta, verbose)
+        response.body = iter([response.body])
+
+        return response
+
+    def upload(self, request, read, size, meta, verbose=False):
+        """Performs request with body read while it is being sent. By default the whole
+        body is read first.
+
+        @type read: callable
+        @keyword read: Function returning next chunk of the body of at most given size,
+                       empty string at the end of the body (e.g. read method of a file).
+
+        @type size: int
+        @keyword size: Body size, or None if unknown (chunked transfer encoding is used then).
+
+        See L{Transport.perform} for the description of other parameters.
+
+        @rtype: L{HTTPResponse}
+        @return: Response
+        """
+        request = HTTPRequest(request.method, request.url, request.headers, ''.join(_read_chunks(read)),
+                              request.resource, request.resource_ids, request.params,
+                              request.connect_timeout, request.timeout, request.stall_timeout)
+
+        return self.perform(request, meta, verbose)
+
+    def stats(self):
+        """Returns connection statistics
+
+        @rtype: dict
+        @return: See L{CurlPool.stats}
+        """
+        return dict.fromkeys(('size', 'idle', 'in_use', 'created', 'reused', 'expired', 'discarded'), 0)
+
+    def close(self):
+        """Closes idle connections of the transport"""
+        pass
+
+class CurlTransport(Transport):
+    """
+    cURL Transport
+    ==============
+    Transport performing requests with handles of a L{CurlPool}
+    """
+
+    multi = True
+
+    def __init__(self, pool=None):
+        """Initialize transport
+
+        @type pool: L{CurlPool}
+        @keyword pool: (optional) Pool of cURL handles. By default a new pool is created.
+        """
+        self.pool = pool if (pool != None) else CurlPool()
+
+    def perform(self, request, meta, verbose=False):
+        curl = self.pool.acquire()
+        reuse = False
+
+        try:
+            response_buffer, response_headers = prepare_curl(curl, request, verbose)
+
+            try:
+                curl.perform()
+            except pycurl.error, exc:
+                # Don't reuse the handle (and its connection) after a transport error
+                meta.read_curl(curl)
+                errno, errmsg = exc.args
+                raise curl_error(request.method, request.url, errno, errmsg)
+
+            meta.read_curl(curl)
+            reuse = True
+        finally:
+            self.pool.release(curl, reuse)
+
+        response = HTTPResponse(meta.http_code, response_headers, response_buffer.getvalue())
+        response_buffer.close()
+
+        return response
+
+    def stream(self, request, meta, verbose=False):
+        curl = self.pool.acquire()
+        runner = CurlMultiRunner(1)
+
+        # Body chunks received by cURL write callback, before they are returned by the iterator
+        chunks = collections.deque()
+        state = {'status': None, 'completed': None}
+        response_headers = dict()
+
+        def header_callback(header_line):
+            if header_line.startswith('HTTP/'):
+                state['status'] = int(header_line.split()[1])
+            parse_header(response_headers, header_line)
+
+        def complete(curl, errno, errmsg):
+            state['completed'] = (errno, errmsg)
+
+        try:
+            prepare_curl(curl, request, verbose)
+            curl.setopt(pycurl.WRITEFUNCTION, chunks.append)
+            curl.setopt(pycurl.HEADERFUNCTION, header_callback)
+
+            # Wait for the first part of the body, or the end of the transfer
+            runner.add(lambda: curl, complete)
+            while (state['completed'] == None) and not chunks:
+                runner.perform()
+
+            if state['completed'] and state['completed'][0]:
+                meta.read_curl(curl)
+                errno, errmsg = state['completed']
+                raise curl_error(request.method, request.url, errno, errmsg)
+        except:
+            runner.close()
+            self.pool.release(curl, reuse=False)
+            raise
+
+        meta.http_code = state['status']
+
+        return HTTPResponse(state['status'], response_headers,
+                            self._read_stream(request, meta, curl, runner, chunks, state))
+
+    def _read_stream(self, request, meta, curl, runner, chunks, state):
+        """Returns body chunks of a streamed transfer as they are received"""
+        reuse = False
+
+        try:
+            while True:
+                while chunks:
+                    yield chunks.popleft()
+
+                if state['completed'] != None:
+                    break
+                runner.perform()
+
+            meta.read_curl(curl)
+            errno, errmsg = state['completed']
+            if errno:
+                raise curl_error(request.method, request.url, errno, errmsg)
+
+            # Handle can be reused after a completed transfer
+            reuse = True
+        finally:
+            # Aborts the transfer, if the body hasn't been read completely
+            runner.close()
+            self.pool.release(curl, reuse)
+
+    def upload(self, request, read, size, meta, verbose=False):
+        curl = self.pool.acquire()
+        reuse = False
+
+        try:
+            curl.setopt(pycurl.VERBOSE, verbose)
+            curl.setopt(pycurl.URL, str(request.url))
+            set_curl_timeouts(curl, request.connect_timeout, request.timeout, request.stall_timeout)
+
+            headers = dict(request.headers)
+            if size == None:
+                headers['Transfer-Encoding'] = 'chunked'
+            curl.setopt(pycurl.HTTPHEADER, ["%s: %s" % (k, v) for k, v in headers.items()])
+
+            curl.setopt(pycurl.UPLOAD, True)
+            curl.setopt(pycurl.READFUNCTION, read)
+            if size != None:
+                curl.setopt(pycurl.INFILESIZE_LARGE, size)
+
+            response_buffer = ResponseBuffer()
+            curl.setopt(pycurl.WRITEFUNCTION, response_buffer.write)
+
+            response_headers = dict()
+            curl.setopt(pycurl.HEADERFUNCTION, functools.partial(parse_header, response_headers))
+
+            try:
+                curl.perform()
+            except pycurl.error, exc:
+                meta.read_curl(curl)
+                errno, errmsg = exc.args
+                raise curl_error(request.method, request.url, errno, errmsg)
+
+            meta.read_curl(curl)
+            reuse = True
+        finally:
+            self.pool.release(curl, reuse)
+
+        return HTTPResponse(meta.http_code, response_headers, response_buffer.getvalue())
+
+    def stats(self):
+        return self.pool.stats()
+
+    def close(self):
+        self.pool.clear()
+
+class HTTPLibTransport(Transport):
+    """
+    httplib Transport
+    =================
+    Transport using only the standard library, for environments without libcurl.
+    Connections are kept alive and reused by subsequent requests to the same host.
+    A request failing on a reused connection (e.g. closed by the server while it was idle)
+    is resent once on a new connection, unless its body is being uploaded. A request
+    which has been completely sent is resent only if its method is idempotent, since
+    the server may have already handled it.
+
+    Connection timings are measured only for new connections, connect_time includes
+    the TLS handshake, and DNS lookup isn't measured separately. The timeout of a request
+    is checked between socket operations, each of which is limited by the time left
+    and by the stall timeout.
+    """
+
+    # Methods of requests which can be resent after the server may have received them
+    IDEMPOTENT_METHODS = ('GET', 'PUT', 'DELETE')
+
+    def __init__(self, max_size=10, max_idle_time=60):
+        """Initialize transport
+
+        @type max_size: int
+        @keyword max_size: (optional) Maximum number of idle connections kept alive.
+                           Default is 10.
+
+        @type max_idle_time: int or float
+        @keyword max_idle_time: (optional) Number of seconds an idle connection is kept alive.
+                                Default is 60.
+        """
+        self._max_size = max_size
+        self._max_idle_time = max_idle_time
+
+        self._lock = threading.Lock()
+
+        # Idle connections as (host key, connection, release time) tuples, the most recently used one is last
+        self._idle = []
+        self._in_use = 0
+
+        self._stats = {
+            'created': 0,
+            'reused': 0,
+            'expired': 0,
+            'discarded': 0,
+        }
+
+    def perform(self, request, meta, verbose=False):
+        return self._receive(request, meta, *self._open(request, meta, verbose))
+
+    def stream(self, request, meta, verbose=False):
+        key, connection, response, started = self._open(request, meta, verbose)
+
+        return HTTPResponse(response.status, dict(response.getheaders()),
+                            self._read_stream(request, meta, key, connection, response, started))
+
+    def _read_stream(self, request, meta, key, connection, response, started):
+        """Returns body chunks of a streamed response as they are received"""
+        reuse = False
+        meta.bytes_received = 0
+
+        try:
+            while True:
+                try:
+                    chunk = self._read(request, connection, response, started)
+                except (socket.error, httplib.HTTPException), exc:
+                    raise self._error(request, exc)
+
+                if not chunk:
+                    break
+
+                meta.bytes_received += len(chunk)
+                yield chunk
+
+            reuse = not response.will_close
+        finally:
+            # Connection with a partially read response can't be reused
+            meta.total_time = time.time() - started
+            self._release(key, connection, reuse)
+
+    def upload(self, request, read, size, meta, verbose=False):
+        return self._receive(request, meta, *self._open(request, meta, verbose, read, size))
+
+    def stats(self):
+        with self._lock:
+            self._expire(time.time())
+
+            stats = self._stats.copy()
+            stats['idle'] = len(self._idle)
+            stats['in_use'] = self._in_use
+            stats['size'] = stats['idle'] + stats['in_use']
+
+        return stats
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+
+        for key, connection, released_at in idle:
+            connection.close()
+
+    def _open(self, request, meta, verbose, read=None, size=None):
+        """Sends request and receives status and headers of the response
+
+        @rtype: tuple
+        @return: (host key, connection, httplib.HTTPResponse, start time)
+        """
+        parts = urlparse.urlsplit(request.url)
+        key = (parts.scheme, parts.hostname, parts.port)
+        path = parts.path + ('?' + parts.query if parts.query else '')
+
+        # Upload bodies can't be resent, so they aren't sent over possibly stale connections
+        fresh = (read != None)
+
+        while True:
+            connection, reused = self._acquire(key, fresh)
+            started = time.time()
+
+            meta.namelookup_time = meta.connect_time = meta.appconnect_time = 0.0
+            meta.http_code = None
+            sent = False
+
+            try:
+                connection.set_debuglevel(1 if verbose else 0)
+
+                if not reused:
+                    timeout = request.connect_timeout
+                    if (request.timeout != None) and ((timeout == None) or (request.timeout < timeout)):
+                        timeout = request.timeout
+                    if timeout != None:
+                        connection.timeout = timeout
+                    connection.connect()
+                    meta.connect_time = time.time() - started
+                    if parts.scheme == 'https':
+                        meta.appconnect_time = meta.connect_time
+
+                self._set_timeout(request, connection.sock, started)
+
+                if read == None:
+                    connection.request(request.method, path, request.body, request.headers)
+                    meta.bytes_sent = len(request.body or '')
+                else:
+                    meta.bytes_sent = self._send_body(connection, request, path, read, size)
+
+                sent = True
+                response = connection.getresponse()
+            except (socket.error, httplib.HTTPException), exc:
+                self._release(key, connection, False)
+
+                if (reused and not isinstance(exc, socket.timeout)
+                    and (not sent or (request.method in self.IDEMPOTENT_METHODS))):
+                    # The server may have closed the idle connection, retry on a new one
+                    fresh = True
+                    continue
+
+                meta.total_time = time.time() - started
+                raise self._error(request, exc)
+
+            meta.starttransfer_time = time.time() - started
+            meta.http_code = response.status
+
+            return key, connection, response, started
+
+    def _receive(self, request, meta, key, connection, response, started):
+        """Receives body of a response opened by L{HTTPLibTransport._open}
+
+        @rtype: L{HTTPResponse}
+        @return: Response
+        """
+        chunks = []
+
+        try:
+            while True:
+                chunk = self._read(request, connection, response, started)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+        except (socket.error, httplib.HTTPException), exc:
+            self._release(key, connection, False)
+            raise self._error(request, exc)
+
+        body = ''.join(chunks)
+
+        self._release(key, connection, not response.will_close)
+
+        meta.total_time = time.time() - started
+        meta.bytes_received = len(body)
+
+        return HTTPResponse(response.status, dict(response.getheaders()), body)
+
+    def _read(self, request, connection, response, started):
+        """Reads next chunk of a response body, within the timeouts of the request
+
+        @raise socket.timeout: Raises socket.timeout if the request has timed out.
+
+        @rtype: str
+        @return: Body chunk, empty string at the end of the body
+        """
+        # The connection is closed (and its socket is owned by the response) if it can't be kept alive
+        if connection.sock != None:
+            self._set_timeout(request, connection.sock, started)
+        elif (request.timeout != None) and (time.time() - started >= request.timeout):
+            raise socket.timeout('timed out')
+
+        return response.read(CHUNK_SIZE)
+
+    def _set_timeout(self, request, sock, started):
+        """Limits the next socket operations to the time left of the request timeout,
+        and to the stall timeout
+
+        @raise socket.timeout: Raises socket.timeout if the request has timed out.
+        """
+        timeout = request.stall_timeout
+
+        if request.timeout != None:
+            left = started + request.timeout - time.time()
+            if left <= 0:
+                raise socket.timeout('timed out')
+            if (timeout == None) or (left < timeout):
+                timeout = left
+
+        sock.settimeout(timeout)
+
+    def _send_body(self, connection, request, path, read, size):
+        """Sends request with body read while it is being sent
+
+        @rtype: int
+        @return: Number of body bytes sent
+        """
+        connection.putrequest(request.method, path, skip_accept_encoding=True)
+        for (name, value) in request.headers.items():
+            connection.putheader(name, value)
+
+        if size == None:
+            connection.putheader('Transfer-Encoding', 'chunked')
+        else:
+            connection.putheader('Content-Length', str(size))
+        connection.endheaders()
+
+        sent = 0
+        for chunk in _read_chunks(read):
+            if size == None:
+                connection.send('%x\r\n%s\r\n' % (len(chunk), chunk))
+            else:
+                connection.send(chunk)
+            sent += len(chunk)
+
+        if size == None:
+            connection.send('0\r\n\r\n')
+
+        return sent
+
+    def _acquire(self, key, fresh=False):
+        """Takes an idle connection to a host, or creates a new one
+
+        @rtype: tuple
+        @return: (connection, True if the connection has been used before)
+        """
+        connection = None
+
+        with self._lock:
+            self._expire(time.time())
+
+            if not fresh:
+                for index in xrange(len(self._idle) - 1, -1, -1):
+                    if self._idle[index][0] == key:
+                        connection = self._idle.pop(index)[1]
+                        break
+
+            if connection != None:
+                self._stats['reused'] += 1
+            else:
+                self._stats['created'] += 1
+
+            self._in_use += 1
+
+        if connection != None:
+            return connection, True
+
+        scheme, host, port = key
+        if scheme == 'https':
+            return httplib.HTTPSConnection(host, port), False
+        return httplib.HTTPConnection(host, port), False
+
+    def _release(self, key, connection, reuse=True):
+        """Returns a connection, which is kept alive if it can be reused"""
+        with self._lock:
+            self._in_use -= 1
+
+            if reuse and (len(self._idle) < self._max_size):
+                self._idle.append((key, connection, time.time()))
+                connection = None
+            else:
+                self._stats['discarded'] += 1
+
+        if connection != None:
+            connection.close()
+
+    def _expire(self, now):
+        """Closes connections idle for longer than max_idle_time. Must be called with the lock held."""
+        # Connections are ordered by release time, so expired ones are at the beginning
+        expired = 0
+        for key, connection, released_at in self._idle:
+            if (now - released_at) < self._max_idle_time:
+                break
+            connection.close()
+            expired += 1
+
+        if expired:
+            del self._idle[:expired]
+            self._stats['expired'] += expired
+
+    def _error(self, request, exc):
+        """Creates exception of a failed request
+
+        @rtype: L{TransportError}
+        @return: Exception describing the error
+        """
+        return TransportError(request.method, request.url, errno=getattr(exc, 'errno', None),
+                message=u"%s call to: '%s' failed. %s: %s" % (request.method, request.url,
+                                                              exc.__class__.__name__, exc))
+
+# Transport classes by name
+TRANSPORTS = {
+    'curl': CurlTransport,
+    'httplib': HTTPLibTransport,
+}
+
+def get_transport(name=None):
+    """Returns new transport
+
+    @type name: str
+    @keyword name: (optional) Transport name, 'curl' or 'httplib'. By default cURL
+                   is used if pycurl is installed, otherwise httplib.
+
+    @rtype: L{Transport}
+    @return: Transport
+    """
+    if name == None:
+        name = 'curl' if module_available('pycurl') else 'httplib'
+
+    if name not in TRANSPORTS:
+        raise ValueError("Unknown transport: %s" % name)
+
+    return TRANSPORTS[name]()
+
+def prepare_curl(curl, request, verbose=False):
+    """Sets request options of a cURL handle
+
+    @type curl: pycurl.Curl
+    @keyword curl: cURL handle
+
+    @type request: L{HTTPRequest}
+    @keyword request: Request
+
+    @type verbose: bool
+    @keyword verbose: (optional) Specifies if cURL verbose mode should be used. Default is False.
+
+    @rtype: tuple
+    @return: (response buffer, response headers dictionary)
+    """
+    if verbose != None:
+        # Set verbose output mode
+        curl.setopt(pycurl.VERBOSE, verbose)
+
+    # Set HTTP request method and method specific options
+    if request.method == 'GET':
+        curl.setopt(pycurl.HTTPGET, True)
+    elif request.method == 'POST':
+        curl.setopt(pycurl.POST, True)
+        if request.body != None:
+            curl.setopt(pycurl.POSTFIELDS, request.body)
+    elif request.method == 'PUT':
+        # The body is sent as POST data with PUT method, so it can be resent on retries
+        curl.setopt(pycurl.CUSTOMREQUEST, 'PUT')
+        curl.setopt(pycurl.POSTFIELDS, request.body or '')
+    elif request.method == 'DELETE':
+        curl.setopt(pycurl.CUSTOMREQUEST, 'DELETE')
+
+    # Set HTTP headers and URL
+    curl.setopt(pycurl.HTTPHEADER, ["%s: %s" % (k, v) for k, v in request.headers.items()])
+    curl.setopt(pycurl.URL, str(request.url))
+
+    set_curl_timeouts(curl, request.connect_timeout, request.timeout, request.stall_timeout)
+
+    # Write response to a buffer
+    response_buffer = ResponseBuffer()
+    curl.setopt(pycurl.WRITEFUNCTION, response_buffer.write)
+
+    # Collect response headers, names are lowercased
+    response_headers = dict()
+    curl.setopt(pycurl.HEADERFUNCTION, functools.partial(parse_header, response_headers))
+
+    return response_buffer, response_headers
+
+def set_curl_timeouts(curl, connect_timeout=None, timeout=None, stall_timeout=None):
+    """Sets timeouts of a cURL handle, see L{HTTPRequest}
+
+    @type curl: pycurl.Curl
+    @keyword curl: cURL handle
+
+    @type connect_timeout: float
+    @keyword connect_timeout: (optional) Connection timeout in seconds, None for no limit
+
+    @type timeout: float
+    @keyword timeout: (optional) Transfer timeout in seconds, None for no limit
+
+    @type stall_timeout: float
+    @keyword stall_timeout: (optional) Number of seconds without any data transferred
+                            after which the transfer is aborted, None for no limit
+    """
+    # Timeouts are rounded up, as 0 disables them
+    curl.setopt(pycurl.CONNECTTIMEOUT_MS, int(math.ceil(connect_timeout * 1000)) if connect_timeout else 0)
+    curl.setopt(pycurl.TIMEOUT_MS, int(math.ceil(timeout * 1000)) if timeout else 0)
+
+    # Transfer is aborted if less than 1 byte per second is transferred for stall_timeout seconds
+    curl.setopt(pycurl.LOW_SPEED_LIMIT, 1 if stall_timeout else 0)
+    curl.setopt(pycurl.LOW_SPEED_TIME, int(math.ceil(stall_timeout)) if stall_timeout else 0)
+
+def parse_header(response_headers, header_line):
+    """Collects response header received by cURL to dictionary, with lowercase name"""
+    if ':' in header_line:
+        name, value = header_line.split(':', 1)
+        response_headers[name.strip().lower()] = value.strip()
+
+def curl_error(http_method, url, errno, errmsg):
+    """Creates exception of a failed cURL transfer
+
+    @rtype: L{TransportError}
+    @return: Exception describing cURL error
+    """
+    return TransportError(http_method, url, errno=errno,
+            message=u"%s call to: '%s' failed. cURL error %d: %s" % (http_method, url, errno, errmsg))
+
+def _read_chunks(read):
+    """Returns chunks of a body read with read function"""
+    while True:
+        chunk = read(CHUNK_SIZE)
+        if not chunk:
+            break
+        yield chunk
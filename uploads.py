@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+
+"""
+iContact API Client Uploads
+===========================
+Streaming import of contacts through the uploads resource
+"""
+
+import os
+import StringIO
+import time
+
+from lazy import LazyModule
+
+csv = LazyModule('csv')
+
+__all__ = ['CSVStream']
+
+# Upload statuses after which the upload isn't processed any more
+FINAL_STATUSES = ('complete', 'completed', 'failed', 'error', 'cancelled')
+
+class CSVStream(object):
+    """
+    CSV Stream
+    ==========
+    File-like object producing CSV data from rows (dictionaries or sequences) on demand,
+    so a generator of contacts can be uploaded without writing the whole file first.
+    """
+
+    def __init__(self, rows, fieldnames=None):
+        """Initialize stream
+
+        @type rows: iterable
+        @keyword rows: Rows of dictionaries (fieldnames are required then), or sequences
+                       (the first row should be the header then)
+
+        @type fieldnames: list
+        @keyword fieldnames: (optional) Column names of dictionary rows. A header row
+                             is written first.
+        """
+        self._rows = iter(rows)
+        self._buffer = StringIO.StringIO()
+        self._data = ''
+
+        if fieldnames != None:
+            self._writer = csv.DictWriter(self._buffer, fieldnames, extrasaction='ignore')
+            self._writer.writerow(dict(zip(fieldnames, fieldnames)))
+        else:
+            self._writer = csv.writer(self._buffer)
+
+    def read(self, size=-1):
+        """Returns up to size bytes of CSV data, empty string at the end of data"""
+        while ((size < 0) or (len(self._data) < size)) and (self._rows != None):
+            try:
+                row = next(self._rows)
+            except StopIteration:
+                self._rows = None
+                break
+
+            if isinstance(row, dict):
+                row = dict((k, self._encode(v)) for (k, v) in row.items())
+            else:
+                row = [self._encode(v) for v in row]
+
+            self._writer.writerow(row)
+            self._data += self._buffer.getvalue()
+            self._buffer.truncate(0)
+
+        if size < 0:
+            data, self._data = self._data, ''
+        else:
+            data, self._data = self._data[:size], self._data[size:]
+
+        return data
+
+    def _encode(self, value):
+        """Encodes unicode values, csv module writes only byte strings"""
+        if isinstance(value, unicode):
+            return value.encode('utf-8')
+        return value
+
+def import_contacts(client, source, list_ids=None, action='add', fieldnames=None, progress=None,
+                    poll_interval=1.0, max_poll_interval=30.0, timeout=24 * 60 * 60, verbose=False):
+    """Imports contacts through an upload. See L{IContactClient.import_contacts}."""
+    if isinstance(source, basestring):
+        body = open(source, 'rb')
+        size = os.path.getsize(source)
+    elif hasattr(source, 'read'):
+        body = source
+        size = None
+    else:
+        body = CSVStream(source, fieldnames)
+        size = None
+
+    # Report number of bytes sent
+    sent = [0]
+    def read(length):
+        data = body.read(length)
+        sent[0] += len(data)
+        if progress != None:
+            progress({'status': 'uploading', 'bytesSent': sent[0]})
+        return data
+
+    try:
+        params = {'action': action}
+        if list_ids:
+            params['lists'] = list(list_ids)
+
+        response = _call(client, 'POST', 'uploads', params=params)
+        upload_id = _get_upload_id(response)
+
+        client._upload('upload-data', [upload_id], read, size, 'text/csv', verbose)
+    finally:
+        if isinstance(source, basestring):
+            body.close()
+
+    # Poll upload status with backoff until it has been processed
+    started = time.time()
+    while True:
+        upload = _call(client, 'GET', 'uploads', [upload_id])['upload']
+        upload['bytesSent'] = sent[0]
+
+        if progress != None:
+            progress(upload)
+
+        if (unicode(upload.get('status')).lower() in FINAL_STATUSES) or \
+                (time.time() - started + poll_interval > timeout):
+            return upload
+
+        time.sleep(poll_interval)
+        poll_interval = min(poll_interval * 1.5, max_poll_interval)
+
+def _call(client, http_method, resource, resource_ids=None, params=dict(), verbose=False):
+    """Performs API call synchronously, also with clients returning futures"""
+    # The client module imports this one, so it can't be imported before the call
+    from client import IContactClient
+
+    return IContactClient._request(client, http_method, resource, resource_ids, params, verbose)
+
+def _get_upload_id(response):
+    """Returns ID of a created upload"""
+    if 'uploadId' in response:
+        return response['uploadId']
+
+    return response['uploads'][0]['uploadId']